@@ -0,0 +1,76 @@
+"""Measures how long kbb takes to open a board
+
+Every run starts a fresh interpreter, imports kbb, opens a board from the
+local database and lists its tasks, which is what the GUI does before it
+first draws. No network access is needed.
+
+Usage: python3 -m benchmarks.bench_startup [number of tasks] [number of runs]
+"""
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import statistics
+
+import kbb
+
+
+CONFIG = """[General]
+SyncRate = 60
+
+[Stages]
+Todo = True
+Doing = True
+Done = True
+"""
+
+STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+import kbb
+k = kbb.Kbb({kbb_dir!r})
+k.get_task_list()
+print(time.perf_counter() - start)
+"""
+
+
+def create_board(kbb_dir, num_tasks):
+    """Creates a board holding :param:`num_tasks` local tasks"""
+    with open(os.path.join(kbb_dir, 'config'), 'w') as f:
+        f.write(CONFIG)
+
+    k = kbb.Kbb(kbb_dir)
+    for idx in range(num_tasks):
+        k.new_task('benchmark task {0}'.format(idx), cloud_sync=False)
+
+
+def time_startup(kbb_dir):
+    """Returns the number of seconds a fresh interpreter takes to open the board"""
+    snippet = STARTUP_SNIPPET.format(kbb_dir=kbb_dir)
+    output = subprocess.check_output([sys.executable, '-c', snippet],
+                                     cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return float(output)
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    num_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    kbb_dir = tempfile.mkdtemp(prefix='kbb-bench-')
+    try:
+        create_board(kbb_dir, num_tasks)
+        timings = [time_startup(kbb_dir) for _ in range(num_runs)]
+    finally:
+        shutil.rmtree(kbb_dir)
+
+    print('startup with {0} tasks over {1} runs: median {2:.1f} ms, min {3:.1f} ms, max {4:.1f} ms'.format(
+          num_tasks,
+          num_runs,
+          statistics.median(timings) * 1000,
+          min(timings) * 1000,
+          max(timings) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Measures how long kbb takes to sync a large board
+
+The board syncs with the in-process fake of GTasks, so no network access is
+needed. Every HTTP round trip (a single request or a whole batch) costs the
+given latency, and the given fraction of requests fail with a transient error.
+
+Usage: python3 -m benchmarks.bench_sync [number of tasks] [latency in ms] [fault rate]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+from datetime import datetime
+
+import kbb
+from kbb.task import Task
+from kbb.action import Action
+from kbb.backend import FakeBackend
+
+
+CONFIG = """[General]
+SyncRate = 60
+Backend = fake
+SyncMode = {sync_mode}
+SyncWorkers = 4
+
+[Stages]
+Todo = True
+Doing = True
+Done = True
+"""
+
+CHUNK_SIZE = 100
+
+
+def open_board(kbb_dir, backend, sync_mode):
+    """Opens a board synced with :param:`backend`"""
+    with open(os.path.join(kbb_dir, 'config'), 'w') as f:
+        f.write(CONFIG.format(sync_mode=sync_mode))
+
+    return kbb.Kbb(kbb_dir, backend=backend)
+
+
+def queue_new_tasks(k, num_tasks):
+    """Creates :param:`num_tasks` local tasks waiting to be pushed
+
+    Going through :func:`Kbb.new_task` would sync after every task.
+    """
+    due = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
+    task_ids = [k._generate_uuid(Task.UUID_LENGTH) for _ in range(num_tasks)]
+
+    for start in range(0, num_tasks, CHUNK_SIZE):
+        chunk = task_ids[start:start + CHUNK_SIZE]
+        Task.insert_many([{'title': 'benchmark task {0}'.format(task_id),
+                           'stage': 'todo',
+                           'due': due,
+                           'notes': '',
+                           'status': Task.NOTDONE,
+                           'task_id': task_id,
+                           'deleted': False} for task_id in chunk]).execute()
+        Action.insert_many([{'task_ident': task_id,
+                             'task_action': Action.TASKADD,
+                             'start_stage': 'None',
+                             'end_stage': 'todo'} for task_id in chunk]).execute()
+
+
+def sync_until_drained(k):
+    """Syncs until every queued action is pushed, skipping retry delays"""
+    k.sync()
+    while Action.select().count():
+        Action.update(next_retry=None).execute()
+        k.sync()
+
+
+def run_timed(label, service, fn):
+    """Runs :param:`fn` and prints how long it took and the API traffic it caused"""
+    calls_before = service.total_calls()
+    round_trips_before = service.round_trips
+
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+
+    print('{0:<28} {1:8.2f} s {2:8d} calls {3:6d} round trips'.format(
+          label,
+          elapsed,
+          service.total_calls() - calls_before,
+          service.round_trips - round_trips_before))
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    fault_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    print('{0} tasks, {1:.0f} ms latency, {2:.0%} faults'.format(num_tasks, latency * 1000, fault_rate))
+
+    for sync_mode in (kbb.Kbb.SYNC_MODE_BATCH, kbb.Kbb.SYNC_MODE_PARALLEL):
+        backend = FakeBackend(latency=latency, fault_rate=fault_rate, seed=0)
+        push_dir = tempfile.mkdtemp(prefix='kbb-bench-')
+        pull_dir = tempfile.mkdtemp(prefix='kbb-bench-')
+        try:
+            k = open_board(push_dir, backend, sync_mode)
+            queue_new_tasks(k, num_tasks)
+            run_timed('push ({0})'.format(sync_mode), backend.service, lambda: sync_until_drained(k))
+
+            # a second board pulls everything the first one pushed
+            k = open_board(pull_dir, backend, sync_mode)
+            run_timed('full pull ({0})'.format(sync_mode), backend.service, k.sync)
+            run_timed('incremental pull ({0})'.format(sync_mode), backend.service, k.sync)
+        finally:
+            shutil.rmtree(push_dir)
+            shutil.rmtree(pull_dir)
+
+
+if __name__ == '__main__':
+    main()
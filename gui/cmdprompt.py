@@ -8,6 +8,13 @@ class CmdPrompt(Drawable):
 
     DEFAULT_CMD_PROMPT = ">> "
     CMD_ERROR = '(Previous command invalid) >> '
+    CMD_MESSAGE = '({0}) >> '
+    MESSAGE_ELLIPSIS = '...'
+    INPUT_WIDTH = 20  # cells kept free for typing after a message
+    FOUND_TASK = '{0} [{1}, due {2:%Y-%m-%d}]'
+    FOUND_SEPARATOR = '; '
+    FIND_LIMIT = 5  # max number of tasks /find shows, as many as fit in the prompt
+    ARCHIVED_STAGE = 'archived'  # stage /find shows archived tasks in
 
     CMD_ACTION_QUIT = 0
     CMD_ACTION_ERROR = 1
@@ -19,10 +26,41 @@ class CmdPrompt(Drawable):
         Returns:
             Error code (CmdPrompt constant)
         """
-        self._buffer = CmdPrompt.CMD_ERROR
+        self._prompt = CmdPrompt.CMD_ERROR
+        self._buffer = self._prompt
+        self.mark_dirty()
         return CmdPrompt.CMD_ACTION_ERROR
 
 
+    def _get_display_width(self):
+        """Returns how many characters of the buffer fit in the prompt"""
+        return (self.screen_area.bottom_right_x - self.screen_area.upper_left_x) - 2  # 2 for the 2 ends of the border
+
+
+    def _get_message_width(self):
+        """Returns how many characters of a message fit in the prompt, leaving room for typing"""
+        return self._get_display_width() - len(CmdPrompt.CMD_MESSAGE.format('')) - CmdPrompt.INPUT_WIDTH
+
+
+    def _buffer_message(self, message):
+        """Set the buffer to a prompt showing :param:`message`
+
+        The end of a message too long for the prompt is cut, so its start
+        and the typing after it stay visible.
+
+        Returns:
+            Action code (CmdPrompt constant)
+        """
+        message_width = self._get_message_width()
+        if len(message) > message_width:
+            message = message[:max(0, message_width - len(CmdPrompt.MESSAGE_ELLIPSIS))] + CmdPrompt.MESSAGE_ELLIPSIS
+
+        self._prompt = CmdPrompt.CMD_MESSAGE.format(message)
+        self._buffer = self._prompt
+        self.mark_dirty()
+        return CmdPrompt.CMD_ACTION_OK
+
+
     def receive_input(self, char):
         """Recieve one character of input into the internal buffer
 
@@ -30,6 +68,7 @@ class CmdPrompt(Drawable):
             char: one unicode character
         """
         self._buffer += char
+        self.mark_dirty()
 
 
     def receive_backspace(self):
@@ -39,6 +78,7 @@ class CmdPrompt(Drawable):
         """
         # remove the last character in the buffer
         self._buffer = self._buffer[:-1]
+        self.mark_dirty()
 
 
     def receive_space(self):
@@ -47,6 +87,7 @@ class CmdPrompt(Drawable):
         Manipulates the buffer accordingly
         """
         self._buffer += " "
+        self.mark_dirty()
 
 
     def evaluate_buffer(self):
@@ -60,10 +101,8 @@ class CmdPrompt(Drawable):
         buf = self._buffer
 
         # strip the command prompt if it exists
-        if buf.startswith(CmdPrompt.DEFAULT_CMD_PROMPT):
-            buf = buf[len(CmdPrompt.DEFAULT_CMD_PROMPT):]
-        elif buf.startswith(CmdPrompt.CMD_ERROR):
-            buf = buf[len(CmdPrompt.CMD_ERROR):]
+        if buf.startswith(self._prompt):
+            buf = buf[len(self._prompt):]
 
 
         command_tokens = [tok.lower() for tok in buf.split(' ')]
@@ -71,6 +110,58 @@ class CmdPrompt(Drawable):
         if len(command_tokens) == 1 and command_tokens[0] == '/sync':
             self.kb_board.sync()
 
+        elif len(command_tokens) == 2 and command_tokens[0] == '/sync' and command_tokens[1] == 'full':
+            self.kb_board.sync(full_resync=True)
+
+        elif len(command_tokens) == 1 and command_tokens[0] == '/stats':
+            sync_stats = self.kb_board.get_sync_stats()
+            if sync_stats and sync_stats[-1].error:
+                return self._buffer_message('last sync failed: ' + sync_stats[-1].error)
+            elif sync_stats:
+                return self._buffer_message('last sync: ' + sync_stats[-1].summary())
+            else:
+                return self._buffer_message('no sync yet')
+
+        elif len(command_tokens) == 1 and command_tokens[0] == '/gc':
+            purged, freed = self.kb_board.collect_garbage()
+            return self._buffer_message('purged {0} tasks, freed {1} KB'.format(purged, freed // 1024))
+
+        elif len(command_tokens) == 1 and command_tokens[0] == '/requeue':
+            requeued = self.kb_board.requeue_dead_actions()
+            if requeued:
+                self.kb_board.sync()
+            return self._buffer_message('requeued {0} actions'.format(requeued))
+
+        elif len(command_tokens) >= 2 and command_tokens[0] == '/find':
+            text = ' '.join(command_tokens[1:])
+            found = [(t, t.stage) for t in self.kb_board.search(text, limit=CmdPrompt.FIND_LIMIT)]
+
+            # archived tasks fill up what's left
+            if len(found) < CmdPrompt.FIND_LIMIT:
+                found.extend((t, CmdPrompt.ARCHIVED_STAGE) for t in
+                             self.kb_board.search(text, limit=CmdPrompt.FIND_LIMIT - len(found), archived=True))
+
+            if not found:
+                return self._buffer_message('nothing found')
+
+            # best matches come first, so only the worst ones are left out
+            matches = [CmdPrompt.FOUND_TASK.format(t.title, stage, t.due) for t, stage in found]
+            shown = matches[:1]
+            for match in matches[1:]:
+                if len(CmdPrompt.FOUND_SEPARATOR.join(shown + [match])) > self._get_message_width():
+                    break
+                shown.append(match)
+
+            return self._buffer_message(CmdPrompt.FOUND_SEPARATOR.join(shown))
+
+        elif len(command_tokens) >= 2 and command_tokens[0] == '/restore':
+            found = self.kb_board.search(' '.join(command_tokens[1:]), limit=1, archived=True)
+            if found:
+                task = self.kb_board.restore_task(found[0].task_id)
+                return self._buffer_message('restored ' + task.title)
+            else:
+                return self._buffer_message('nothing found')
+
         elif len(command_tokens) >= 1 and command_tokens[0] == '/new':
             self.kb_board.new_task(' '.join(command_tokens[1:]))
 
@@ -98,7 +189,9 @@ class CmdPrompt(Drawable):
             return self._buffer_error()
 
         # empty/reset the buffer
-        self._buffer = CmdPrompt.DEFAULT_CMD_PROMPT
+        self._prompt = CmdPrompt.DEFAULT_CMD_PROMPT
+        self._buffer = self._prompt
+        self.mark_dirty()
 
 
     def draw(self):
@@ -119,7 +212,7 @@ class CmdPrompt(Drawable):
         # draw buffer
         #
         # we first want to remove any characters in the beginning that can't be displayed
-        display_width = (brx - tlx) - 2  # 2 for the 2 ends of the border
+        display_width = self._get_display_width()
         if len(self._buffer) > display_width:
             display_buffer = self._buffer[-display_width:]
         else:
@@ -138,11 +231,9 @@ class CmdPrompt(Drawable):
         self.display.set_cursor(x_curs_coord ,y_coord)
 
 
-        self.display.present()
-
-
     def __init__(self, kb_board, display, screen_area, task_id_map):
         super().__init__(kb_board, display, screen_area)
-        self._buffer = CmdPrompt.DEFAULT_CMD_PROMPT
+        self._prompt = CmdPrompt.DEFAULT_CMD_PROMPT
+        self._buffer = self._prompt
         self._task_id_map = task_id_map
 
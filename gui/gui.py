@@ -1,6 +1,7 @@
 import time
 import math
 import sys
+from datetime import date
 
 import termbox
 
@@ -18,6 +19,7 @@ class GUI(object):
     WINDOW_EDGE_LEEWAY = 1
     CMD_PROMPT_HEIGHT = 2
     LOOKAHEAD_DAYS = 7
+    REFRESH_INTERVAL = 1000  # milliseconds between checks for board changes while idle
 
 
     def _create_stages(self):
@@ -48,21 +50,42 @@ class GUI(object):
         return ret_stages
 
     
+    def _get_cmd_prompt_area(self):
+        """Returns the :class:`ScreenArea` of the command prompt"""
+        upper_left_x = GUI.WINDOW_EDGE_LEEWAY
+        upper_left_y = self.display.height() - GUI.CMD_PROMPT_HEIGHT - 1
+        bottom_right_x = self.display.width() - GUI.WINDOW_EDGE_LEEWAY
+        bottom_right_y = self.display.height() - GUI.WINDOW_EDGE_LEEWAY
+
+        return ScreenArea(upper_left_x, upper_left_y, bottom_right_x, bottom_right_y)
+
+
     def _create_cmd_prompt(self):
         """Inits the command prompt
 
         Returns:
             :class:`CmdPrompt` object
         """
-        upper_left_x = GUI.WINDOW_EDGE_LEEWAY
-        upper_left_y = self.display.height() - GUI.CMD_PROMPT_HEIGHT - 1
-        bottom_right_x = self.display.width() - GUI.WINDOW_EDGE_LEEWAY
-        bottom_right_y = self.display.height() - GUI.WINDOW_EDGE_LEEWAY
+        return CmdPrompt(self.kb_board, self.display, self._get_cmd_prompt_area(), self._task_id_map)
 
-        screen_area = ScreenArea(upper_left_x, upper_left_y, bottom_right_x, bottom_right_y)
-        cmd_prompt = CmdPrompt(self.kb_board, self.display, screen_area, self._task_id_map)
 
-        return cmd_prompt
+    def _check_board(self):
+        """Marks the stages whose tasks changed as dirty
+
+        The tasks are only looked at once the board version moved (see
+        :func:`Kbb.changes_since`) or the day changed, which moves the
+        lookahead range. Otherwise this is a single lookup, whatever the
+        size of the board.
+        """
+        board_version = self.kb_board.get_board_version()
+        today = date.today()
+        if board_version == self._board_version and today == self._today:
+            return
+
+        self._board_version = board_version
+        self._today = today
+        for stage in self._stages:
+            stage.check_tasks()
 
     
     def receive_input(self, char):
@@ -94,19 +117,32 @@ class GUI(object):
         return self._cmd_prompt.evaluate_buffer()
 
 
-    def draw(self):
-        """Overriden draw() method from superclass"""
-        # as a precondition to drawing, we need to clear the cell bufffer
+    def resize(self):
+        """Lays the stages and the command prompt out again for the new window size"""
         self.display.clear()
 
-        # we have to clear out the "global" _task_id_map because the mappings might
-        # change if the window resizes or tasks get moved around
+        # we have to clear out the "global" _task_id_map because every stage is new
         self._task_id_map.clear()
+        self._stages = self._create_stages()
+        self._cmd_prompt.resize(self._get_cmd_prompt_area())
+
+
+    def draw(self):
+        """Repaints the parts of the screen that changed since they were last drawn
+
+        Typing only repaints the command prompt. Stages are only repainted
+        when the tasks they display or the layout changed.
+        """
+        self._check_board()
 
-        # now we can draw all our objects
-        [stage.draw() for stage in self._stages]
-        self._cmd_prompt.draw()
-        self.display.present()
+        repainted = [stage.repaint() for stage in self._stages]
+
+        # the command prompt borders overlap the bottom of the stages, so they go on top
+        if any(repainted):
+            self._cmd_prompt.mark_dirty()
+
+        if self._cmd_prompt.repaint() or any(repainted):
+            self.display.present()
                 
 
     def __init__(self):
@@ -117,10 +153,21 @@ class GUI(object):
         It's 50% a hack so TODO: fix this
         """
         self.kb_board = kbb.Kbb()
+
+        # the OAuth2 flow needs the terminal, so it has to run before termbox
+        # takes over the screen instead of during the first background sync
+        if not self.kb_board.has_credentials():
+            self.kb_board.authorize()
+
+        self.kb_board.start_background_sync()
         self.display = termbox.Termbox()
         self._task_id_map = dict()
         self._stages = self._create_stages()
         self._cmd_prompt = self._create_cmd_prompt()
+
+        # what the stages were last checked against, see _check_board()
+        self._board_version = None
+        self._today = None
         self.draw()
 
 
@@ -128,11 +175,20 @@ def main():
     g = GUI()
 
     while True:
-        e_type, unicode_key, key, _, _, _, _, _ = g.display.poll_event()
+        # wake up now and then, so changes pulled by the background sync get drawn
+        event = g.display.peek_event(GUI.REFRESH_INTERVAL)
+        if event:
+            e_type, unicode_key, key, _, _, _, _, _ = event
+        else:
+            e_type = None
+
+        if e_type == termbox.EVENT_RESIZE:
+            g.resize()
 
-        if e_type == termbox.EVENT_KEY:
+        elif e_type == termbox.EVENT_KEY:
             # quit conditions
             if key == termbox.KEY_CTRL_C:
+                g.kb_board.close()
                 g.display.close()
                 break
 
@@ -154,10 +210,11 @@ def main():
                 ret = g.evaluate_buffer()
 
                 if ret == CmdPrompt.CMD_ACTION_QUIT:
+                    g.kb_board.close()
                     g.display.close()
                     break
 
-        # enabling this will resolve some bugs (if any) at the cost of decreasing draw performance
+        # only what changed is drawn again
         g.draw()
         
 
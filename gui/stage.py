@@ -31,8 +31,6 @@ class Task(Drawable):
         for cell_x, title_idx in zip(range(tlx + 1, brx), range(len(disp_task_title))):
             self.display.change_cell(cell_x, y, ord(disp_task_title[title_idx]), termbox.DEFAULT, termbox.DEFAULT)
 
-        self.display.present()
-
 
     def __init__(self, kb_board, display, screen_area, task, vertical_padding, id_num):
         super().__init__(kb_board, display, screen_area)
@@ -69,6 +67,43 @@ class Stage(Drawable):
                 lowest += 1
 
 
+    def _get_max_num_tasks(self):
+        """Returns how many tasks fit in the stage"""
+        # the tasks go below the stage title
+        tly = self.screen_area.upper_left_y + 1
+        bry = self.screen_area.bottom_right_y
+
+        total_task_height = 1 + (2 * Stage.TASK_VERTICAL_PADDING)
+        account_for_borders = 2
+        return math.floor((bry - tly - account_for_borders) / total_task_height)
+
+
+    def _get_tasks_to_display(self):
+        """Returns the :class:`TaskSnapshot` of every task the stage displays
+
+        Only tasks in our lookahead range are drawn, and we may only be able to
+        display a certain number of tasks, so only keep the latest number of tasks
+        """
+        today = datetime.today()
+        today = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        date_range = timedelta(days=self._lookahead_days)
+
+        return self.kb_board.get_task_snapshots(self._stage_name,
+                                                due_from=today,
+                                                due_to=today + date_range,
+                                                limit=self._get_max_num_tasks())
+
+
+    def check_tasks(self):
+        """Mark the stage dirty if the tasks it displays changed since it was drawn
+
+        Snapshots compare by value, so tasks changed in ways the stage
+        doesn't show don't cause a repaint
+        """
+        if self._get_tasks_to_display() != self._displayed_tasks:
+            self.mark_dirty()
+
+
     def draw(self):
         tlx = self.screen_area.upper_left_x
         tly = self.screen_area.upper_left_y
@@ -101,24 +136,17 @@ class Stage(Drawable):
 
 
         # draw tasks
-        tasks_in_stage = [t for t in self.kb_board.get_task_list() if t.stage == self._stage_name]
-        
-        # now filter out all tasks that aren't in our lookahead range
-        today = datetime.today()
-        today = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        date_range = timedelta(days=self._lookahead_days)
-        # Note: timedelta() == 0
-        tasks_in_due_range = [t for t in tasks_in_stage if ((t.due - today) <= date_range) and ((t.due - today) >= timedelta())]
+        #
+        # the display ids of our previous draw are free again
+        for id_num in self._display_ids:
+            self._task_id_map.pop(id_num, None)
+        self._display_ids = list()
 
-        # we may only be able to display a certain number of tasks, so only keep the latest 
-        # number of tasks
-        total_task_height = 1 + (2 * Stage.TASK_VERTICAL_PADDING)
-        account_for_borders = 2
-        max_num_tasks = math.floor((bry - tly - account_for_borders) / total_task_height) 
-        tasks_to_display = tasks_in_due_range[:max_num_tasks]
+        max_num_tasks = self._get_max_num_tasks()
+        self._displayed_tasks = self._get_tasks_to_display()
 
         # now we can draw all the tasks to the screen
-        for idx, task in enumerate(tasks_to_display):
+        for idx, task in enumerate(self._displayed_tasks):
             task_tlx = tlx + 1
             task_tly = math.floor((idx / max_num_tasks) * (bry - tly)) + 2 # +2 at the end b/c of top border & stage title
             task_brx = brx - 1
@@ -128,12 +156,11 @@ class Stage(Drawable):
             # set the id->task mapping
             lowest_id_num = Stage._get_lowest_unused_display_id(self._task_id_map)
             self._task_id_map[lowest_id_num] = task
+            self._display_ids.append(lowest_id_num)
 
             # create & display task
             disp_task = Task(self.kb_board, self.display, disp_area, task, Stage.TASK_VERTICAL_PADDING, lowest_id_num)
             disp_task.draw()
-            
-        self.display.present()
 
 
     def __init__(self, kb_board, display, screen_area, stage_name, lookahead_days, task_id_map):
@@ -141,3 +168,5 @@ class Stage(Drawable):
         self._stage_name = stage_name
         self._lookahead_days = lookahead_days
         self._task_id_map = task_id_map
+        self._display_ids = list()  # display ids of the tasks we drew
+        self._displayed_tasks = list()
@@ -1,3 +1,6 @@
+import termbox
+
+
 class ScreenArea(object):
     """Struct class for representing a rectangular section of the screen
 
@@ -26,10 +29,14 @@ class Drawable(object):
     Provided base class functions are:
         - __init__
         - resize
+        - mark_dirty
+        - repaint
+        - clear
         - draw
 
     Note that before :func:`draw` is called, the internal cell buffer for the
-    entire :var:`display` must be cleared
+    area of this object must be cleared. :func:`repaint` takes care of that,
+    and only draws the object again once it was marked dirty
     """
 
     def resize(self, new_screen_area):
@@ -38,14 +45,45 @@ class Drawable(object):
         Args:
             new_screen_area: the new screen area of type :class:`ScreenArea`
         """
-        self.screen_area = screen_area
+        self.screen_area = new_screen_area
+        self.mark_dirty()
+
+
+    def mark_dirty(self):
+        """Mark the area of this object as needing to be drawn again"""
+        self._dirty = True
+
+
+    def repaint(self):
+        """Draw this object again if it was marked dirty since it was last drawn
+
+        Only the area of this object is cleared, the rest of :var:`display`
+        is left as is.
+
+        Returns:
+            Whether anything was drawn
+        """
+        if not self._dirty:
+            return False
+
+        self.clear()
+        self.draw()
+        self._dirty = False
+        return True
+
+
+    def clear(self):
+        """Clear the cells of the area belonging to this object"""
+        for y in range(self.screen_area.upper_left_y, self.screen_area.bottom_right_y + 1):
+            for x in range(self.screen_area.upper_left_x, self.screen_area.bottom_right_x + 1):
+                self.display.change_cell(x, y, ord(' '), termbox.DEFAULT, termbox.DEFAULT)
 
 
     def draw(self):
         """Draw the contents of the area belonging to this object
 
-        Precondition: the internal cell buffer for :var:`display` must be
-        cleared before this funciton is called
+        Precondition: the internal cell buffer for the area of this object
+        must be cleared before this funciton is called
         """
         raise NotImplementedError('draw() not implemented')
 
@@ -54,4 +92,4 @@ class Drawable(object):
         self.kb_board = kb_board
         self.display = display
         self.screen_area = screen_area
-
+        self._dirty = True
@@ -0,0 +1,50 @@
+"""Command line access to a kbb board
+
+Usage:
+    python3 -m kbb import [--offline] FILE
+    python3 -m kbb export [--stage STAGE] FILE
+
+FILE is a JSON Lines (.jsonl) or CSV (.csv) file, see :mod:`kbb.taskio`.
+"""
+import sys
+import argparse
+
+from kbb.kbb import Kbb
+import kbb.taskio as taskio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='kbb', description='Bulk import and export of kbb tasks')
+    parser.add_argument('--dir', help='root directory of kbb files (defaults to ~/.kbb)')
+    parser.add_argument('--format', choices=taskio.FORMATS,
+                        help='file format (defaults to guessing from the file extension)')
+    subparsers = parser.add_subparsers(dest='command')
+
+    import_parser = subparsers.add_parser('import', help='add the tasks of a file into the board')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--offline', action='store_true',
+                               help="don't sync the imported tasks with the cloud")
+
+    export_parser = subparsers.add_parser('export', help='write the tasks of the board into a file')
+    export_parser.add_argument('file')
+    export_parser.add_argument('--stage', help='only export the tasks of this stage')
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_usage()
+        return 2
+
+    k = Kbb(args.dir)
+
+    if args.command == 'import':
+        count = k.import_tasks(args.file, args.format, cloud_sync=not args.offline)
+        print('Imported {0} tasks from {1}'.format(count, args.file))
+    else:
+        count = k.export_tasks(args.file, args.format, args.stage)
+        print('Exported {0} tasks to {1}'.format(count, args.file))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
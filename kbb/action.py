@@ -1,8 +1,8 @@
+from collections import OrderedDict
+
 import peewee
 
-# This un-initialized database should be initialized before
-# any instance Task is created
-database = peewee.SqliteDatabase(None) 
+from kbb.database import database as database
 
 class Action(peewee.Model):
     """Class representation of a single action
@@ -18,13 +18,98 @@ class Action(peewee.Model):
     TASKADD = "taskadd"  # add a new task
     TASKDEL = "taskdel"  # delete a task
     TASKMOV = "taskmov"  # move a task between stages
+    ACTIONS = (TASKADD, TASKDEL, TASKMOV)
 
 
-    task_ident = peewee.TextField()
+    task_ident = peewee.TextField(index=True)
     task_action = peewee.CharField()
     start_stage = peewee.CharField()
     end_stage = peewee.CharField()
 
+    # retry bookkeeping, see :class:`kbb.outbox.Outbox`
+    attempts = peewee.IntegerField(default=0)
+    next_retry = peewee.DateTimeField(null=True)
+    last_error = peewee.TextField(null=True)
+
+
+    @staticmethod
+    def coalesce(action_list):
+        """Folds a queue of actions into its minimal equivalent
+
+        The actions of each task are folded independently:
+            - an add that is later deleted cancels out entirely
+            - moves following an add are folded into the add
+            - moves followed by a delete are dropped
+            - consecutive moves collapse into one move, which is dropped
+              if the task ends up in the stage it started in
+
+        Args:
+            action_list: :type:`list` of :class:`Action` in queue order
+
+        Returns:
+            (kept, removed) tuple of :type:`list` of :class:`Action`. kept holds
+            the actions left to replay in queue order; their stages may have
+            been rewritten. removed holds the redundant actions.
+        """
+        actions_by_ident = OrderedDict()
+        for act in action_list:
+            actions_by_ident.setdefault(act.task_ident, list()).append(act)
+
+        kept = list()
+        removed = list()
+        for acts in actions_by_ident.values():
+            adds = [a for a in acts if a.task_action == Action.TASKADD]
+            dels = [a for a in acts if a.task_action == Action.TASKDEL]
+            moves = [a for a in acts if a.task_action == Action.TASKMOV]
+            others = [a for a in acts if a.task_action not in Action.ACTIONS]
+
+            survivor = None
+            if adds and dels:
+                pass
+            elif adds:
+                survivor = adds[0]
+                if moves:
+                    survivor.end_stage = moves[-1].end_stage
+            elif dels:
+                survivor = dels[-1]
+            elif moves:
+                survivor = moves[-1]
+                survivor.start_stage = moves[0].start_stage
+                if survivor.start_stage == survivor.end_stage:
+                    survivor = None
+
+            for act in adds + dels + moves:
+                if act is survivor:
+                    kept.append(act)
+                else:
+                    removed.append(act)
+            kept.extend(others)
+
+        queue_position = {id(act): idx for idx, act in enumerate(action_list)}
+        kept.sort(key=lambda act: queue_position[id(act)])
+        return kept, removed
+
 
     class Meta:
         database = database # This model uses the "people.db" database.
+
+
+class DeadAction(peewee.Model):
+    """Class representation of an action that could not be replayed
+
+    Actions land here once the cloud has permanently rejected them, or once
+    they failed too many times in a row. They are not retried unless
+    explicitly requeued.
+    """
+
+    task_ident = peewee.TextField(index=True)
+    task_action = peewee.CharField()
+    start_stage = peewee.CharField()
+    end_stage = peewee.CharField()
+    attempts = peewee.IntegerField()
+    last_error = peewee.TextField(null=True)
+    failed_at = peewee.DateTimeField()
+
+
+    class Meta:
+        database = database
@@ -0,0 +1,115 @@
+"""Archive of completed tasks
+
+Completed tasks are moved out of the task table once they are old enough
+(see the ArchiveAge config option), so the task table stays bounded by
+active work rather than by history. Archived tasks keep every field, and
+can still be searched and restored.
+
+Rows are moved with INSERT ... SELECT statements, so archiving a lot of
+history doesn't build a model instance per task.
+"""
+from datetime import datetime
+
+import peewee
+
+from kbb.task import Task as Task
+
+# columns moved between the task and archivedtask tables
+TASK_COLUMNS = ('title', 'stage', 'due', 'notes', 'status', 'task_id', 'deleted', 'tasklist', 'completed')
+
+CHUNK_SIZE = 100  # max number of tasks moved by one statement
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # how peewee stores datetimes
+
+
+class ArchivedTask(Task):
+    """Class representation of an archived :class:`Task`
+
+    archived_at is when the task was moved to the archive.
+    """
+
+    archived_at = peewee.DateTimeField()
+
+
+def _move_tasks(database, source, destination, where, params, extra_columns=''):
+    """Moves the rows of :param:`source` matching :param:`where` to :param:`destination`"""
+    columns = ', '.join(TASK_COLUMNS)
+
+    database.execute_sql('INSERT INTO {0} ({1}{2}) SELECT {1}{3} FROM {4} WHERE {5}'.format(
+                         destination,
+                         columns,
+                         ', archived_at' if extra_columns else '',
+                         extra_columns,
+                         source,
+                         where),
+                         params)
+    database.execute_sql('DELETE FROM {0} WHERE {1}'.format(source, where), params[1:] if extra_columns else params)
+
+
+def archive_tasks(database, completed_before):
+    """Moves the tasks completed before :param:`completed_before` to the archive
+
+    Tasks completed by older versions of kbb are aged by their due date.
+    Tasks that still have queued or dead actions stay, since replaying
+    those actions needs the task.
+
+    Note: must be called inside a transaction.
+
+    Returns:
+        :type:`list` of the ids of the archived tasks
+    """
+    where = ("status = ? AND deleted = 0 AND COALESCE(completed, due) < ? "
+             "AND task_id NOT IN (SELECT task_ident FROM action) "
+             "AND task_id NOT IN (SELECT task_ident FROM deadaction)")
+    params = (Task.DONE, completed_before.strftime(DATETIME_FORMAT))
+
+    task_ids = [row[0] for row in
+                database.execute_sql('SELECT task_id FROM task WHERE ' + where, params).fetchall()]
+
+    if task_ids:
+        _move_tasks(database, 'task', 'archivedtask', where,
+                    (datetime.now().strftime(DATETIME_FORMAT),) + params, extra_columns=', ?')
+
+    return task_ids
+
+
+def restore_tasks(database, task_ids):
+    """Moves the given tasks back from the archive to the task table
+
+    Note: must be called inside a transaction.
+
+    Returns:
+        :type:`list` of the ids of the restored tasks, those of
+        :param:`task_ids` found in the archive
+    """
+    restored = find_archived(task_ids)
+
+    restored_list = list(restored)
+    for start in range(0, len(restored_list), CHUNK_SIZE):
+        chunk = tuple(restored_list[start:start + CHUNK_SIZE])
+        where = 'task_id IN ({0})'.format(', '.join('?' * len(chunk)))
+        _move_tasks(database, 'archivedtask', 'task', where, chunk)
+
+    return [task_id for task_id in task_ids if task_id in restored]
+
+
+def find_archived(task_ids):
+    """Returns the :type:`set` of the ids of :param:`task_ids` found in the archive"""
+    task_ids = list(task_ids)
+    archived = set()
+
+    for start in range(0, len(task_ids), CHUNK_SIZE):
+        chunk = task_ids[start:start + CHUNK_SIZE]
+        query = ArchivedTask.select(ArchivedTask.task_id).where(ArchivedTask.task_id.in_(chunk)).tuples()
+        archived.update(task_id for task_id, in query)
+
+    return archived
+
+
+def forget_archived(task_ids):
+    """Deletes the given tasks from the archive"""
+    task_ids = list(task_ids)
+
+    for start in range(0, len(task_ids), CHUNK_SIZE):
+        chunk = task_ids[start:start + CHUNK_SIZE]
+        ArchivedTask.delete().where(ArchivedTask.task_id.in_(chunk)).execute()
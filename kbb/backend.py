@@ -0,0 +1,219 @@
+"""Backends kbb syncs tasks with
+
+A backend hands :class:`kbb.Kbb` a client shaped like the discovery built
+GTasks API client, plus the HTTP clients its requests are executed with.
+The sync code only talks to the cloud through these.
+"""
+import os
+import json
+import time
+
+
+class Backend(object):
+    """Interface of a backend"""
+
+    def has_credentials(self):
+        """Whether :func:`authorize` can run without user interaction"""
+        raise NotImplementedError
+
+
+    def authorize(self):
+        """Loads the credentials needed to talk to the backend"""
+        raise NotImplementedError
+
+
+    def new_http(self):
+        """Returns a new HTTP client requests are executed with
+
+        HTTP clients aren't thread safe, so every thread gets its own.
+        """
+        raise NotImplementedError
+
+
+    def build_service(self, http):
+        """Returns the GTasks API client
+
+        Args:
+            http: HTTP client of the calling thread, see :func:`new_http`
+        """
+        raise NotImplementedError
+
+
+class GTasksBackend(Backend):
+    """The Google Tasks cloud"""
+
+    # If modifying these scopes, delete these previously saved credentials
+    SCOPES = 'https://www.googleapis.com/auth/tasks'
+    APPLICATION_NAME = 'KanBanBoard'
+    DISCOVERY_URI = 'https://tasks.googleapis.com/$discovery/rest?version=v1'
+    DISCOVERY_MAX_AGE = 30 * 24 * 60 * 60  # seconds before refreshing the cached discovery document
+
+
+    def _get_credential_path(self):
+        """Returns the path credentials are stored at"""
+        return os.path.join(self._kbb_dir, 'credentials/kbb-credentials.json')
+
+
+    def _get_credentials(self):
+        """Gets valid user credentials from storage.
+
+        If nothing has been stored, or if the stored credentials are invalid,
+        the OAuth2 flow is completed to obtain the new credentials.
+
+        Returns:
+            Credentials, the obtained credential.
+        """
+        # oauth2client is only needed once we talk to the cloud, so
+        # don't pay for importing it on startup
+        from oauth2client import client
+        from oauth2client import file
+        from oauth2client import tools
+
+        credential_path = self._get_credential_path()
+        credential_dir = os.path.dirname(credential_path)
+        client_secret_file = os.path.join(self._kbb_dir, 'secrets/client_secret.json')
+
+        # create directory if it doesn't exist yet
+        if not os.path.exists(credential_dir):
+            os.makedirs(credential_dir)
+
+        # extract credentials
+        store = file.Storage(credential_path)
+        credentials = store.get()
+
+        # handle missing or invalid credentials
+        if not credentials or credentials.invalid:
+            flow = client.flow_from_clientsecrets(client_secret_file, GTasksBackend.SCOPES)
+            flow.user_agent = GTasksBackend.APPLICATION_NAME
+            credentials = tools.run_flow(flow, store, None)
+            print('Storing credentials to ' + credential_path)
+
+        return credentials
+
+
+    def _get_discovery_document(self):
+        """Gets the GTasks API discovery document
+
+        The document is cached on disk, so building the API client doesn't
+        cost a round trip. A stale cached copy is refreshed, but still used if
+        we're offline. Without any cached copy, we fall back to the copy
+        bundled with newer versions of the API client library.
+
+        Returns:
+            :type:`str` JSON discovery document
+        """
+        import httplib2
+
+        cache_path = os.path.join(self._kbb_dir, 'cache/tasks-v1-discovery.json')
+
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                document = f.read()
+
+            if time.time() - os.path.getmtime(cache_path) < GTasksBackend.DISCOVERY_MAX_AGE:
+                return document
+        else:
+            document = None
+
+        try:
+            resp, content = httplib2.Http().request(GTasksBackend.DISCOVERY_URI)
+            if resp.status != 200:
+                raise httplib2.HttpLib2Error('discovery document fetch failed: {0}'.format(resp.status))
+
+            fresh_document = content.decode('utf-8')
+            json.loads(fresh_document)  # make sure we don't cache garbage
+
+        except Exception as e:
+            if not document:
+                document = self._get_bundled_discovery_document()
+            if document:
+                return document
+            raise e
+
+        # create directory if it doesn't exist yet
+        if not os.path.exists(os.path.dirname(cache_path)):
+            os.makedirs(os.path.dirname(cache_path))
+
+        # write then rename so a crash can't leave a truncated cache behind
+        with open(cache_path + '.tmp', 'w') as f:
+            f.write(fresh_document)
+        os.replace(cache_path + '.tmp', cache_path)
+
+        return fresh_document
+
+
+    def _get_bundled_discovery_document(self):
+        """Returns the discovery document bundled with the API client, or None"""
+        try:
+            from googleapiclient import discovery_cache
+            return discovery_cache.get_static_doc('tasks', 'v1')
+        except (ImportError, AttributeError):
+            return None
+
+
+    def has_credentials(self):
+        return os.path.exists(self._get_credential_path())
+
+
+    def authorize(self):
+        if self._credentials is None:
+            self._credentials = self._get_credentials()
+
+
+    def new_http(self):
+        import httplib2
+        return self._credentials.authorize(httplib2.Http())
+
+
+    def build_service(self, http):
+        from apiclient import discovery
+
+        document = self._get_discovery_document()
+        return discovery.build_from_document(document, http=http)
+
+
+    def __init__(self, kbb_dir):
+        """Init
+
+        Args:
+            kbb_dir: root directory of kbb files, holding the credentials
+                and the discovery document cache
+        """
+        self._kbb_dir = kbb_dir
+        self._credentials = None
+
+
+class FakeBackend(Backend):
+    """In-process fake of the Google Tasks cloud, see :class:`FakeGTasksService`
+
+    Nothing leaves the process, so this backend needs neither credentials
+    nor network access. Its tasks are lost once the process exits.
+    """
+
+    def has_credentials(self):
+        return True
+
+
+    def authorize(self):
+        pass
+
+
+    def new_http(self):
+        return None
+
+
+    def build_service(self, http):
+        return self.service
+
+
+    def __init__(self, service=None, **service_args):
+        """Init
+
+        Args:
+            service: the :class:`FakeGTasksService` to use (optional)
+            service_args: arguments of a new :class:`FakeGTasksService`, used
+                if :param:`service` isn't given. See its constructor.
+        """
+        from kbb.fakegtasks import FakeGTasksService
+
+        self.service = service if service is not None else FakeGTasksService(**service_args)
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+import peewee
+
+from kbb.database import database as database
+
+class TaskChange(peewee.Model):
+    """Class representation of one change made to the task table
+
+    Every transaction writing to the task table through :class:`Kbb` takes
+    the next board version, and records here which tasks it inserted,
+    updated or deleted under that version. Only the latest MAX_ROWS
+    changes are kept.
+    """
+
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+    MAX_ROWS = 10000
+    CHUNK_SIZE = 100  # max number of rows recorded by one statement
+
+
+    version = peewee.IntegerField(index=True)
+    task_id = peewee.TextField()
+    change = peewee.CharField()
+
+
+    @staticmethod
+    def _prune():
+        """Drops the changes beyond the latest MAX_ROWS"""
+        # ids only grow, so the oldest changes have the smallest ids
+        newest = TaskChange.select(peewee.fn.MAX(TaskChange.id)).scalar() or 0
+        TaskChange.delete().where(TaskChange.id <= newest - TaskChange.MAX_ROWS).execute()
+
+
+    @staticmethod
+    def record(version, changes):
+        """Records the changes made by the transaction of board :param:`version`
+
+        Note: must be called inside that transaction.
+
+        Args:
+            version: the board version the changes were made in
+            changes: iterable of (task_id, INSERT, UPDATE or DELETE) tuples
+        """
+        rows = [{'version': version, 'task_id': task_id, 'change': change}
+                for task_id, change in changes]
+
+        for start in range(0, len(rows), TaskChange.CHUNK_SIZE):
+            TaskChange.insert_many(rows[start:start + TaskChange.CHUNK_SIZE]).execute()
+
+        TaskChange._prune()
+
+
+    @staticmethod
+    def record_newest_tasks(version, count):
+        """Records the insert of the :param:`count` newest rows of the task table
+
+        A single statement, for bulk inserts too large to list one by one.
+
+        Note: must be called inside the transaction that inserted the rows,
+        which holds the write lock so no one else can have inserted since.
+        """
+        database.execute_sql('INSERT INTO taskchange (version, task_id, change) '
+                             'SELECT ?, task_id, ? FROM '
+                             '(SELECT id, task_id FROM task ORDER BY id DESC LIMIT ?) ORDER BY id',
+                             (version, TaskChange.INSERT, count))
+
+        TaskChange._prune()
+
+
+    @staticmethod
+    def since(version):
+        """Returns the tasks changed after board :param:`version`
+
+        Several changes of a task are folded into one: an insert followed
+        by updates is still an insert, otherwise the latest change wins.
+
+        Returns:
+            :class:`OrderedDict` mapping task_id -> change, in the order the
+            tasks were last changed. None if some of the changes were
+            already dropped from the log, in which case every task must be
+            read again.
+        """
+        oldest = TaskChange.select().order_by(TaskChange.id).first()
+
+        # the changes of the oldest version left may only be partly kept
+        if oldest and oldest.id > 1 and version < oldest.version:
+            return None
+
+        changes = OrderedDict()
+        query = (TaskChange.select(TaskChange.task_id, TaskChange.change)
+                           .where(TaskChange.version > version)
+                           .order_by(TaskChange.id)
+                           .tuples())
+
+        for task_id, change in query:
+            previous = changes.pop(task_id, None)
+            if previous == TaskChange.INSERT and change == TaskChange.UPDATE:
+                change = TaskChange.INSERT
+            changes[task_id] = change
+
+        return changes
+
+
+    class Meta:
+        database = database
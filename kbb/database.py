@@ -0,0 +1,77 @@
+"""The SQLite database every kbb model lives in
+
+All models share the one :attr:`database` handle, so a single transaction
+can span tasks, queued actions and sync bookkeeping alike.
+"""
+import re
+from collections import OrderedDict
+
+import peewee
+
+
+DEFAULT_PRAGMAS = OrderedDict([
+    ('auto_vacuum', 'incremental'),  # free pages are only released on demand, see kbb.garbage
+    ('journal_mode', 'wal'),  # readers and the writer don't block each other
+    ('synchronous', 'normal'),  # with WAL, commits don't wait for fsync
+    ('mmap_size', 64 * 1024 * 1024),  # bytes of the file read through mmap
+    ('cache_size', -16000),  # negative means KiB, so a 16 MB page cache
+])
+
+
+class KbbDatabase(peewee.SqliteDatabase):
+    """:class:`peewee.SqliteDatabase` setting kbb's pragmas on every connection
+
+    peewee opens a connection per thread, so the pragmas are applied as each
+    connection is opened rather than once. Pragmas stored in the database
+    file are only applied by the first connection to it.
+    """
+
+    PRAGMA_PATTERN = re.compile(r'^[\w.-]+$')
+
+    # pragmas stored in the database file itself rather than in the connection
+    FILE_PRAGMAS = ('auto_vacuum', 'journal_mode')
+
+
+    def _add_conn_hooks(self, conn):
+        super()._add_conn_hooks(conn)
+
+        # setting a file pragma may need a lock on the database, which a
+        # worker opening its connection mid-transaction would wait on
+        for name, value in self.kbb_pragmas.items():
+            if name in self.FILE_PRAGMAS and self._file_pragmas_set:
+                continue
+            conn.execute('PRAGMA {0} = {1}'.format(name, value))
+
+        self._file_pragmas_set = True
+
+
+    def set_pragmas(self, pragmas):
+        """Sets the pragmas connections opened from now on get
+
+        Args:
+            pragmas: :type:`dict` mapping pragma name -> value
+
+        Raises:
+            ValueError: if a name or value isn't a plain word or number
+        """
+        for name, value in pragmas.items():
+            if not self.PRAGMA_PATTERN.match(name) or not self.PRAGMA_PATTERN.match(str(value)):
+                raise ValueError('invalid pragma {0} = {1}'.format(name, value))
+
+        self.kbb_pragmas = OrderedDict(pragmas)
+        self._file_pragmas_set = False
+
+
+    def init(self, database, *args, **kwargs):
+        self._file_pragmas_set = False
+        super().init(database, *args, **kwargs)
+
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.kbb_pragmas = OrderedDict(DEFAULT_PRAGMAS)
+
+
+# This un-initialized database should be initialized before
+# any model instance is created
+database = KbbDatabase(None)
@@ -0,0 +1,355 @@
+"""In-process fake of the Google Tasks API, used by :class:`kbb.backend.FakeBackend`
+
+Only the parts of the API kbb uses are implemented, with the same request
+objects, responses and HTTP errors as the discovery built client.
+"""
+import copy
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+
+
+class FakeGTasksService(object):
+    """In-process stand-in for the discovery built GTasks API client
+
+    Implements the subset of the tasks and tasklists resources kbb uses,
+    including pagination, id assignment, tombstones, field projection and
+    batch requests, all held in memory. Latency and faults can be injected
+    to benchmark and load test syncing without network access.
+    """
+
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+
+    def _now(self):
+        """Returns a strictly increasing RFC 3339 timestamp"""
+        now = max(datetime.utcnow(), self._last_timestamp + timedelta(milliseconds=1))
+        self._last_timestamp = now
+        return now.strftime('%Y-%m-%dT%H:%M:%S.') + '{0:03d}Z'.format(now.microsecond // 1000)
+
+
+    def _new_id(self):
+        self._next_id += 1
+        return 'fake{0:018d}'.format(self._next_id)
+
+
+    def _error(self, status):
+        """Builds the exception the real client raises for an HTTP error"""
+        import httplib2
+        from apiclient.errors import HttpError
+
+        content = json.dumps({'error': {'code': status}}).encode('utf-8')
+        return HttpError(httplib2.Response({'status': status}), content)
+
+
+    def _get_list(self, tasklist):
+        if tasklist not in self._lists:
+            raise self._error(404)
+
+        return self._lists[tasklist]
+
+
+    def _get_task(self, tasklist, task):
+        tasks = self._get_list(tasklist)
+        if task not in tasks or tasks[task].get('deleted'):
+            raise self._error(404)
+
+        return tasks[task]
+
+
+    def _maybe_fail(self):
+        """Raises an injected fault, if one is due"""
+        if self._pending_faults:
+            raise self._error(self._pending_faults.pop(0))
+
+        if self.fault_rate and self._random.random() < self.fault_rate:
+            raise self._error(self.fault_status)
+
+
+    def _run(self, verb, fn):
+        """Runs one API call against the store
+
+        Args:
+            verb: name of the API method, for accounting
+            fn: function doing the call, must be run with the store locked
+
+        Returns:
+            A deep copy of the response
+        """
+        with self._lock:
+            self.calls[verb] = self.calls.get(verb, 0) + 1
+            self._maybe_fail()
+            response = copy.deepcopy(fn())
+            self.bytes_sent += len(json.dumps(response))
+
+        return response
+
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+    def fail_next(self, count=1, status=503):
+        """Makes the next :param:`count` calls fail with HTTP :param:`status`"""
+        with self._lock:
+            self._pending_faults.extend([status] * count)
+
+
+    def total_calls(self):
+        """Returns the number of API calls made so far, batched or not"""
+        return sum(self.calls.values())
+
+
+    def tasks(self):
+        return _TasksResource(self)
+
+
+    def tasklists(self):
+        return _TaskListsResource(self)
+
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatchRequest(self, callback)
+
+
+    def __init__(self, latency=0, fault_rate=0, fault_status=503, seed=None):
+        """Init
+
+        Args:
+            latency: seconds every HTTP round trip takes (a batch is one round trip)
+            fault_rate: probability of any single call failing
+            fault_status: HTTP status of the randomly injected faults
+            seed: seed of the fault injection randomness (optional)
+        """
+        self.latency = latency
+        self.fault_rate = fault_rate
+        self.fault_status = fault_status
+        self.calls = dict()
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._pending_faults = list()
+        self._lock = threading.RLock()
+        self._next_id = 0
+        self._last_timestamp = datetime.utcnow()
+        self._lists = OrderedDict([('@default', OrderedDict())])
+
+
+class _FakeRequest(object):
+    """Unexecuted API call, like :class:`googleapiclient.http.HttpRequest`"""
+
+    def execute(self, http=None, num_retries=0):
+        with self._service._lock:
+            self._service.round_trips += 1
+        self._service._sleep()
+        return self._service._run(self._verb, self._fn)
+
+
+    def __init__(self, service, verb, fn):
+        self._service = service
+        self._verb = verb
+        self._fn = fn
+        self.methodId = 'tasks.' + verb
+
+
+class _FakeBatchRequest(object):
+    """Batch of API calls, like :class:`googleapiclient.http.BatchHttpRequest`"""
+
+    def add(self, request, callback=None, request_id=None):
+        if request_id is None:
+            request_id = str(len(self._requests))
+        self._requests.append((request_id, request, callback))
+
+
+    def execute(self, http=None):
+        with self._service._lock:
+            self._service.round_trips += 1
+        self._service._sleep()
+
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = self._service._run(request._verb, request._fn), None
+            except Exception as e:
+                response, exception = None, e
+
+            for cb in (callback, self._callback):
+                if cb:
+                    cb(request_id, response, exception)
+
+
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = list()
+
+
+class _TaskListsResource(object):
+
+    def list(self, **kwargs):
+        def fn():
+            return {'items': [{'id': tasklist, 'title': tasklist}
+                              for tasklist in self._service._lists]}
+        return _FakeRequest(self._service, 'tasklists.list', fn)
+
+
+    def insert(self, body, **kwargs):
+        def fn():
+            tasklist = self._service._new_id()
+            self._service._lists[tasklist] = OrderedDict()
+            return {'id': tasklist, 'title': body.get('title', '')}
+        return _FakeRequest(self._service, 'tasklists.insert', fn)
+
+
+    def __init__(self, service):
+        self._service = service
+
+
+class _TasksResource(object):
+
+    def _set_status_fields(self, task):
+        """Keeps the completed timestamp in line with the status"""
+        if task.get('status') == 'completed':
+            task.setdefault('completed', self._service._now())
+        else:
+            task['status'] = 'needsAction'
+            task.pop('completed', None)
+            task.pop('hidden', None)
+
+
+    def _normalize_due(self, task):
+        # the API only keeps the date of the due time
+        if 'due' in task:
+            task['due'] = task['due'][:10] + 'T00:00:00.000Z'
+
+
+    def _project(self, response, fields):
+        """Applies a 'fields' projection like 'nextPageToken,items(id,title)'"""
+        if not fields:
+            return response
+
+        projected = dict()
+        for name, subfields in re.findall(r'(\w+)(?:\(([^)]*)\))?', fields):
+            if name not in response:
+                continue
+            if subfields and name == 'items':
+                keep = subfields.split(',')
+                projected[name] = [{k: v for k, v in t.items() if k in keep}
+                                   for t in response[name]]
+            else:
+                projected[name] = response[name]
+
+        return projected
+
+
+    def list(self, tasklist, maxResults=None, pageToken=None, updatedMin=None,
+             showCompleted=True, showDeleted=False, showHidden=False, fields=None, **kwargs):
+        def fn():
+            page_size = min(maxResults or FakeGTasksService.DEFAULT_PAGE_SIZE,
+                            FakeGTasksService.MAX_PAGE_SIZE)
+            tasks = [t for t in self._service._get_list(tasklist).values()
+                     if (showDeleted or not t.get('deleted'))
+                     and (showHidden or not t.get('hidden'))
+                     and (showCompleted or t['status'] != 'completed')
+                     and (not updatedMin or t['updated'] >= updatedMin)]
+
+            start = int(pageToken or 0)
+            response = {'kind': 'tasks#tasks',
+                        'items': tasks[start:start + page_size]}
+            if start + page_size < len(tasks):
+                response['nextPageToken'] = str(start + page_size)
+
+            return self._project(response, fields)
+        return _FakeRequest(self._service, 'tasks.list', fn)
+
+
+    def get(self, tasklist, task, **kwargs):
+        def fn():
+            return self._service._get_task(tasklist, task)
+        return _FakeRequest(self._service, 'tasks.get', fn)
+
+
+    def insert(self, tasklist, body, **kwargs):
+        def fn():
+            tasks = self._service._get_list(tasklist)
+            new_task = dict(body)
+            new_task['kind'] = 'tasks#task'
+            new_task['id'] = self._service._new_id()
+            new_task['updated'] = self._service._now()
+            self._normalize_due(new_task)
+            self._set_status_fields(new_task)
+            tasks[new_task['id']] = new_task
+            return new_task
+        return _FakeRequest(self._service, 'tasks.insert', fn)
+
+
+    def update(self, tasklist, task, body, **kwargs):
+        def fn():
+            self._service._get_task(tasklist, task)
+            updated_task = dict(body)
+            updated_task['id'] = task
+            updated_task['updated'] = self._service._now()
+            self._normalize_due(updated_task)
+            self._set_status_fields(updated_task)
+            self._service._get_list(tasklist)[task] = updated_task
+            return updated_task
+        return _FakeRequest(self._service, 'tasks.update', fn)
+
+
+    def patch(self, tasklist, task, body, **kwargs):
+        def fn():
+            patched_task = self._service._get_task(tasklist, task)
+            for key, value in body.items():
+                if value is None:
+                    patched_task.pop(key, None)
+                else:
+                    patched_task[key] = value
+            patched_task['updated'] = self._service._now()
+            self._normalize_due(patched_task)
+            self._set_status_fields(patched_task)
+            return patched_task
+        return _FakeRequest(self._service, 'tasks.patch', fn)
+
+
+    def delete(self, tasklist, task, **kwargs):
+        def fn():
+            deleted_task = self._service._get_task(tasklist, task)
+            deleted_task['deleted'] = True
+            deleted_task['updated'] = self._service._now()
+            return ''
+        return _FakeRequest(self._service, 'tasks.delete', fn)
+
+
+    def move(self, tasklist, task, destinationTasklist=None, **kwargs):
+        def fn():
+            moved_task = self._service._get_task(tasklist, task)
+            moved_task['updated'] = self._service._now()
+
+            if destinationTasklist and destinationTasklist != tasklist:
+                tasks = self._service._get_list(tasklist)
+                self._service._get_list(destinationTasklist)[task] = moved_task
+                # the source list keeps a tombstone
+                tasks[task] = {'id': task, 'deleted': True, 'updated': moved_task['updated']}
+
+            return moved_task
+        return _FakeRequest(self._service, 'tasks.move', fn)
+
+
+    def clear(self, tasklist, **kwargs):
+        def fn():
+            for t in self._service._get_list(tasklist).values():
+                if t.get('status') == 'completed':
+                    t['hidden'] = True
+                    t['updated'] = self._service._now()
+            return ''
+        return _FakeRequest(self._service, 'tasks.clear', fn)
+
+
+    def __init__(self, service):
+        self._service = service
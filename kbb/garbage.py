@@ -0,0 +1,64 @@
+"""Garbage collection of the local database
+
+Deleting a task only marks its row as deleted, so that the deletion can
+still be pushed to the cloud. Once no queued action refers to the task the
+row is dead weight: it is purged here, and the pages it took up are given
+back to the file system by an incremental vacuum.
+"""
+from kbb.task import Task as Task
+from kbb.action import Action as Action
+from kbb.action import DeadAction as DeadAction
+
+
+AUTO_VACUUM_NONE = 0
+AUTO_VACUUM_FULL = 1
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def purge_deleted_tasks():
+    """Deletes the rows of deleted tasks no queued or dead action refers to
+
+    A task whose deletion hasn't reached the cloud yet keeps its row, since
+    its queued TASKDEL action still needs it.
+
+    Returns:
+        Number of purged tasks
+    """
+    queued_idents = Action.select(Action.task_ident)
+    dead_idents = DeadAction.select(DeadAction.task_ident)
+
+    return (Task.delete()
+                .where((Task.deleted == True) &
+                       (Task.task_id.not_in(queued_idents)) &
+                       (Task.task_id.not_in(dead_idents)))
+                .execute())
+
+
+def _pragma(database, name):
+    return database.execute_sql('PRAGMA {0}'.format(name)).fetchone()[0]
+
+
+def vacuum(database):
+    """Gives the free pages of the database file back to the file system
+
+    With auto_vacuum = incremental (the default, see :mod:`kbb.database`)
+    the free pages are simply released. A database file created without
+    it is rebuilt once by a full VACUUM, which also switches it over to the
+    configured auto_vacuum mode.
+
+    Note: must not be called inside a transaction.
+
+    Returns:
+        Number of bytes the database file shrank by
+    """
+    page_size = _pragma(database, 'page_size')
+    pages_before = _pragma(database, 'page_count')
+    mode = _pragma(database, 'auto_vacuum')
+
+    if mode == AUTO_VACUUM_INCREMENTAL:
+        # every step of the pragma releases a page, so run it to the end
+        database.execute_sql('PRAGMA incremental_vacuum').fetchall()
+    elif mode == AUTO_VACUUM_NONE and _pragma(database, 'freelist_count'):
+        database.execute_sql('VACUUM')
+
+    return (pages_before - _pragma(database, 'page_count')) * page_size
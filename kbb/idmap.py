@@ -0,0 +1,47 @@
+from datetime import datetime
+from datetime import timedelta
+
+import peewee
+
+from kbb.database import database as database
+
+class IdMapping(peewee.Model):
+    """Class representation of the cloud id assigned to a locally created task
+
+    The GTasks API doesn't take ids for new tasks, so a task created locally
+    gets a new id once it is uploaded. Callers may still hold the local id,
+    so we remember which cloud id it turned into.
+    """
+
+    local_id = peewee.TextField(unique=True)
+    cloud_id = peewee.TextField()
+    mapped_at = peewee.DateTimeField()
+
+
+    @staticmethod
+    def record(local_id, cloud_id):
+        """Records that the task created as :param:`local_id` is now :param:`cloud_id`"""
+        IdMapping.delete().where(IdMapping.local_id == local_id).execute()
+        IdMapping.create(local_id=local_id, cloud_id=cloud_id, mapped_at=datetime.now())
+
+
+    @staticmethod
+    def resolve(local_id):
+        """Returns the cloud id of the task created as :param:`local_id`, or None"""
+        result = IdMapping.select().where(IdMapping.local_id == local_id)
+
+        if not result:
+            return None
+
+        return result[0].cloud_id
+
+
+    @staticmethod
+    def prune(max_age_days):
+        """Forgets mappings older than :param:`max_age_days` days"""
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        IdMapping.delete().where(IdMapping.mapped_at < cutoff).execute()
+
+
+    class Meta:
+        database = database
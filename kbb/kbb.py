@@ -1,29 +1,60 @@
-import httplib2
 import os
 import configparser
 import uuid
 import time
 import binascii
+import threading
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime
+from datetime import timedelta
 
-from apiclient import discovery
-import oauth2client
-from oauth2client import client
-from oauth2client import tools
 import peewee
 
-import kbb.task as task
+from kbb.database import database as database
+from kbb.database import DEFAULT_PRAGMAS as DEFAULT_PRAGMAS
 from  kbb.task import Task as Task
-import kbb.action as action
 from kbb.action import Action as Action
+from kbb.action import DeadAction as DeadAction
+from kbb.outbox import Outbox as Outbox
+from kbb.outbox import RoundTripError as RoundTripError
+from kbb.migrations import upgrade_schema as upgrade_schema
+from kbb.idmap import IdMapping as IdMapping
+from kbb.syncstate import SyncState as SyncState
+from kbb.taskrepo import TaskRepository as TaskRepository
+from kbb.changelog import TaskChange as TaskChange
+from kbb.archive import ArchivedTask as ArchivedTask
+from kbb.reconcile import reconcile as reconcile
+from kbb.scheduler import SyncScheduler as SyncScheduler
+from kbb.backend import GTasksBackend as GTasksBackend
+from kbb.backend import FakeBackend as FakeBackend
+from kbb.stats import SyncStats as SyncStats
+from kbb.stats import append_metrics as append_metrics
+import kbb.archive as archive
+import kbb.garbage as garbage
+import kbb.search as search
+import kbb.taskio as taskio
 
 
 class Kbb(object):
 
-    # If modifying these scopes, delete these previously saved credentials
-    SCOPES = 'https://www.googleapis.com/auth/tasks'
-    APPLICATION_NAME = 'KanBanBoard'
     DEFAULT_TASK_LIST = '@default'
+    BACKEND_GTASKS = 'gtasks'  # sync with the Google Tasks cloud
+    BACKEND_FAKE = 'fake'  # sync with an in-process fake of the cloud, for testing
+    SYNC_HISTORY = 50  # number of syncs whose stats are kept in memory
+    BATCH_SIZE = 50  # max number of requests sent in one HTTP batch request
+    DB_CHUNK_SIZE = 100  # max number of rows touched by one bulk statement
+    CHECKPOINT_SIZE = 500  # max number of replayed actions committed at once
+    SYNC_DEBOUNCE = 2  # seconds to wait for more changes before a background sync
+    SYNC_MODE_BATCH = 'batch'  # replay actions through HTTP batch requests
+    SYNC_MODE_PARALLEL = 'parallel'  # replay actions through concurrent requests
+    ID_MAPPING_MAX_AGE = 30  # days a local task id keeps resolving after upload
+    LIST_PAGE_SIZE = 100  # max number of tasks the GTasks API returns per page
+    LIST_FIELDS = 'nextPageToken,items(id,title,status,due,notes,updated,deleted,completed)'  # fields pulls use
+    TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'  # how local times are stored in SyncState
+    SEARCH_LIMIT = 20  # default max number of tasks a search returns
 
     
     def _convert_str_to_iso3339(self, timestamp):
@@ -65,35 +96,38 @@ class Kbb(object):
         return uuid
 
 
-    def _get_credentials(self, kbb_dir):
-        """Gets valid user credentials from storage.
+    def _create_backend(self):
+        """Creates the backend selected by the Backend config option"""
+        if self.config['Backend'] == self.BACKEND_FAKE:
+            return FakeBackend()
+        elif self.config['Backend'] == self.BACKEND_GTASKS:
+            return GTasksBackend(self._kbb_dir)
+        else:
+            raise ValueError('unknown backend {0}'.format(self.config['Backend']))
 
-        If nothing has been stored, or if the stored credentials are invalid,
-        the OAuth2 flow is completed to obtain the new credentials.
 
-        Returns:
-            Credentials, the obtained credential.
-        """
-        credential_dir = os.path.join(kbb_dir, 'credentials/')
-        client_secret_file = os.path.join(kbb_dir, 'secrets/client_secret.json')
+    def _authorize(self):
+        """Authorizes with the backend and builds the GTasks API client, once"""
+        with self._service_lock:
+            if self._service is not None:
+                return
+
+            self.backend.authorize()
+            self._authorized = True
+            self._service = self.backend.build_service(self._get_http())
 
-        # create directory if it doesn't exist yet
-        if not os.path.exists(credential_dir):
-            os.makedirs(credential_dir)
 
-        # extract credentials
-        credential_path = os.path.join(credential_dir, 'kbb-credentials.json')
-        store = oauth2client.file.Storage(credential_path)
-        credentials = store.get()
+    @property
+    def service(self):
+        """GTasks API client
 
-        # handle missing or invalid credentials
-        if not credentials or credentials.invalid:
-            flow = client.flow_from_clientsecrets(client_secret_file, Kbb.SCOPES)
-            flow.user_agent = Kbb.APPLICATION_NAME
-            credentials = tools.run_flow(flow, store, None)
-            print('Storing credentials to ' + credential_path)
+        Building it needs credentials and the discovery document, so that
+        is deferred until we first talk to the cloud.
+        """
+        if self._service is None:
+            self._authorize()
 
-        return credentials
+        return self._service
 
 
     def _load_config(self, kbb_dir, config, config_fname):
@@ -105,7 +139,8 @@ class Kbb(object):
             config_fname: file name of the configuration file
                 
                 {'CapitalizedTopLevelConfig: 'True',
-                 'lowercaseListConfig: [1,2,3,4]'}
+                 'lowercaseListConfig: [1,2,3,4]',
+                 'lowercaseDictConfig: {'a': 'b'}'}
                 
         Returns:
             :type:`None`
@@ -120,6 +155,19 @@ class Kbb(object):
 
             # first load general options
             config['SyncRate'] = general.getint('SyncRate', fallback=60)
+            config['Backend'] = general.get('Backend', fallback=Kbb.BACKEND_GTASKS).lower()
+            config['SyncMode'] = general.get('SyncMode', fallback=Kbb.SYNC_MODE_BATCH).lower()
+            config['SyncWorkers'] = max(1, general.getint('SyncWorkers', fallback=1))
+            config['MaxAttempts'] = max(1, general.getint('MaxAttempts', fallback=8))
+            config['MetricsFile'] = general.get('MetricsFile', fallback='')
+            config['GcRate'] = max(0, general.getint('GcRate', fallback=24))
+            config['ArchiveAge'] = max(0, general.getint('ArchiveAge', fallback=30))
+
+            # load the optional database pragmas, see kbb.database
+            config['pragmas'] = OrderedDict(DEFAULT_PRAGMAS)
+            if config_parser.has_section('Database'):
+                for key, value in config_parser['Database'].items():
+                    config['pragmas'][key.lower()] = value
 
             # load stage options
             config['stages'] = list()
@@ -127,6 +175,13 @@ class Kbb(object):
                 if stages.getboolean(key):
                     config['stages'].append(key.lower())
 
+            # load the optional stage -> GTasks list mapping
+            config['tasklists'] = dict()
+            if config_parser.has_section('TaskLists'):
+                for key, tasklist in config_parser['TaskLists'].items():
+                    if key.lower() in config['stages'] and tasklist:
+                        config['tasklists'][key.lower()] = tasklist
+
         except configparser.ParsingError as e:
             print('Error parsing config file. Aborting.')
             raise e
@@ -139,9 +194,28 @@ class Kbb(object):
 
 
     def _locate_task(self, task_id):
-        """Find a task by its task_id"""
+        """Find a task by its task_id
+
+        The local id a task was created with also finds the task after the
+        cloud has assigned it a new id.
+        """
+        task = self._task_repo.get(task_id)
+        if task is None:
+            cloud_id = IdMapping.resolve(task_id)
+            if cloud_id:
+                task = self._task_repo.get(cloud_id)
+
+        if task is not None:
+            return task
+
+        # deleted tasks are only found in the database
         result_tasks = Task.select().where(Task.task_id == task_id)
 
+        if not result_tasks:
+            cloud_id = IdMapping.resolve(task_id)
+            if cloud_id:
+                result_tasks = Task.select().where(Task.task_id == cloud_id)
+
         if not result_tasks:
             raise Exception('task_id not found')
 
@@ -151,6 +225,162 @@ class Kbb(object):
         return result_tasks[0]
 
 
+    def _get_stage_tasklist(self, stage):
+        """Returns the GTasks list holding the tasks of :param:`stage`
+
+        Stages not mapped in the TaskLists section of the config file
+        share the default list.
+        """
+        return self.config['tasklists'].get(stage.lower(), self.DEFAULT_TASK_LIST)
+
+
+    def _get_tasklist_stage(self, tasklist):
+        """Returns the first stage mapped to :param:`tasklist`, or None"""
+        for stage in self.get_stage_names():
+            if self.config['tasklists'].get(stage) == tasklist:
+                return stage
+
+        return None
+
+
+    def _get_board_tasklists(self):
+        """Returns the list of every GTasks list the board spans"""
+        tasklists = [self.DEFAULT_TASK_LIST]
+        for stage in self.get_stage_names():
+            tasklist = self._get_stage_tasklist(stage)
+            if tasklist not in tasklists:
+                tasklists.append(tasklist)
+
+        return tasklists
+
+
+    def _get_task_tasklist(self, task_id):
+        """Returns the GTasks list the given task lives in
+
+        Tasks we no longer have a local copy of are looked for in the default list.
+        """
+        task = self._task_repo.get(task_id)
+        if task is not None:
+            return task.tasklist
+
+        result = Task.select(Task.tasklist).where(Task.task_id == task_id).tuples().first()
+        return result[0] if result else self.DEFAULT_TASK_LIST
+
+
+    def _insert_task_request(self, task_id, tasklist=None):
+        """Builds a request inserting the given task into the cloud
+
+        Args:
+            task_id: ID of the task to be inserted
+            tasklist: list to insert the task into (optional, defaults to
+                the list of the task's stage)
+
+        Returns:
+            Unexecuted :class:`HttpRequest`
+        """
+        new_task = self._locate_task(task_id)
+        new_task_dict = Task.to_gtask_dict(new_task)
+
+        if not tasklist:
+            tasklist = self._get_stage_tasklist(new_task.stage)
+
+        return self.service.tasks().insert(tasklist=tasklist,
+                                           body=new_task_dict)
+
+
+    def _delete_task_request(self, task_id):
+        """Builds a request deleting the given task from the cloud
+
+        Args:
+            task_id: ID of the task to be deleted
+
+        Returns:
+            Unexecuted :class:`HttpRequest`
+        """
+        return self.service.tasks().delete(tasklist=self._get_task_tasklist(task_id),
+                                           task=task_id)
+
+
+    def _status_task_request(self, task_id, status):
+        """Builds a request changing the status of the given task in the cloud
+
+        The task is patched in place, so its id doesn't change.
+
+        Args:
+            task_id: ID of the task to be updated
+            status: new status of the task. Either DONE or NOTDONE
+
+        Returns:
+            Unexecuted :class:`HttpRequest`
+        """
+        body = {'status': status}
+
+        # GTasks keeps a task completed as long as it has a completion date
+        if status == Task.NOTDONE:
+            body['completed'] = None
+
+        return self.service.tasks().patch(tasklist=self._get_task_tasklist(task_id),
+                                          task=task_id,
+                                          body=body)
+
+
+    def _move_task_request(self, task_id, dest_tasklist):
+        """Builds a request moving the given task into another list in the cloud
+
+        Args:
+            task_id: ID of the task to be moved
+            dest_tasklist: list to move the task into
+
+        Returns:
+            Unexecuted :class:`HttpRequest`
+        """
+        return self.service.tasks().move(tasklist=self._get_task_tasklist(task_id),
+                                         task=task_id,
+                                         destinationTasklist=dest_tasklist)
+
+
+    def _action_requests(self, act):
+        """Builds the requests replaying :param:`act`, in the order they must run
+
+        Args:
+            act: the :class:`Action` to replay
+
+        Returns:
+            :type:`list` of unexecuted :class:`HttpRequest`. Empty for
+            unknown actions.
+        """
+        final_stage = self.get_stage_names()[-1]
+
+        if act.task_action == Action.TASKADD:
+            return [self._insert_task_request(act.task_ident,
+                                              self._get_stage_tasklist(act.end_stage))]
+
+        elif act.task_action == Action.TASKDEL:
+            return [self._delete_task_request(act.task_ident)]
+
+        elif act.task_action == Action.TASKMOV:
+            # we only mark the task as completed in GTasks if the
+            # destination stage is the final (right most) stage, else
+            # we mark the task as not completed
+            if act.end_stage == final_stage:
+                status_request = self._status_task_request(act.task_ident, Task.DONE)
+            else:
+                status_request = self._status_task_request(act.task_ident, Task.NOTDONE)
+
+            dest_tasklist = self._get_stage_tasklist(act.end_stage)
+            if dest_tasklist == self._get_task_tasklist(act.task_ident):
+                return [status_request]
+
+            # moving between lists keeps the status, so only patch it if it changes
+            move_request = self._move_task_request(act.task_ident, dest_tasklist)
+            if (act.start_stage == final_stage) != (act.end_stage == final_stage):
+                return [status_request, move_request]
+            else:
+                return [move_request]
+
+        return list()
+
+
     def _insert_task_to_gtasks(self, task_id):
         """Inserts the given task into the cloud
 
@@ -158,11 +388,11 @@ class Kbb(object):
         
         Args:
             task_id: ID of the task to be inserted
+
+        Returns:
+            The task dictionary created in the cloud
         """
-        new_task = self._locate_task(task_id)
-        new_task_dict = Task.to_gtask_dict(new_task)
-        result = self.service.tasks().insert(tasklist=self.DEFAULT_TASK_LIST, 
-                                             body=new_task_dict).execute()
+        return self._execute_request(self._insert_task_request(task_id))
 
 
     def _delete_task_from_gtasks(self, task_id):
@@ -171,8 +401,7 @@ class Kbb(object):
         Args:
             task_id: ID of the task to be deleted
         """
-        self.service.tasks().delete(tasklist=self.DEFAULT_TASK_LIST, 
-                                    task=task_id).execute()
+        self._execute_request(self._delete_task_request(task_id))
 
 
     def _update_task_to_done(self, task_id):
@@ -181,383 +410,1657 @@ class Kbb(object):
         Args:
             task_id: ID of the task to be marked as done
         """
-        # grab & update the existing task from the cloud
-        updated_task = self.service.tasks().get(tasklist=self.DEFAULT_TASK_LIST, 
-                                                task=task_id).execute()
-        updated_task['status'] = Task.DONE
-
-        # push the updated task back into the cloud
-        result = self.service.tasks().update(tasklist=self.DEFAULT_TASK_LIST, 
-                                             task=updated_task['id'], 
-                                             body=updated_task).execute()
+        self._execute_request(self._status_task_request(task_id, Task.DONE))
 
 
     def _update_task_to_notdone(self, task_id):
         """Updates the given task to not done in the cloud.
 
-        NOTE: our local task_id is changed after this function executes
-
         Args:
             task_id: ID of the task to be marked as not done
         """
-        # grab the existing task from the cloud
-        updated_task = self.service.tasks().get(tasklist=self.DEFAULT_TASK_LIST, 
-                                                task=task_id).execute()
-        # task on disk
-        task = self._locate_task(task_id)
+        self._execute_request(self._status_task_request(task_id, Task.NOTDONE))
+
+
+    def _get_http(self):
+        """Returns the authorized HTTP client of the calling thread
+
+        HTTP clients aren't thread safe, so every thread that talks to
+        the cloud gets a client of its own.
+        """
+        if not self._authorized:
+            self._authorize()
+
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = self.backend.new_http()
+            self._thread_local.http = http
+
+        return http
+
+
+    def _count_call(self, request, response, batched=False):
+        """Records an API call in the stats of the running sync, if any"""
+        if self._stats:
+            # method ids look like 'tasks.tasks.insert', drop the API name
+            method = getattr(request, 'methodId', None) or 'unknown'
+            self._stats.count_call(method.split('.', 1)[-1], response, batched)
+
+
+    def _execute_request(self, request):
+        """Executes a single request on the HTTP client of the calling thread
+
+        Returns:
+            The response to the request
+        """
+        try:
+            response = request.execute(http=self._get_http())
+        except Exception as e:
+            self._count_call(request, None)
+            raise e
+
+        self._count_call(request, response)
+        return response
+
+
+    def _get_executor(self):
+        """Returns the worker pool used to talk to the cloud concurrently
+
+        The pool holds at most SyncWorkers threads (see the config file).
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.config['SyncWorkers'])
+
+        return self._executor
+
+
+    def _get_page_executor(self):
+        """Returns the worker pool prefetching pages of cloud task listings
+
+        Listings themselves run on the pool of :func:`_get_executor`, so
+        their prefetches get a pool of their own rather than waiting on it.
+        """
+        with self._executor_lock:
+            if self._page_executor is None:
+                self._page_executor = ThreadPoolExecutor(max_workers=self.config['SyncWorkers'])
+
+        return self._page_executor
+
+
+    def _execute_batch(self, requests):
+        """Executes requests through the GTasks HTTP batch endpoint
 
-        if updated_task['status'] == Task.DONE:
-            updated_task['status'] = Task.NOTDONE
+        The requests are split into batches of at most :attr:`BATCH_SIZE`
+        requests, so each batch costs a single HTTP round trip. If more than
+        one sync worker is configured, the batches are sent concurrently.
 
-            # delete the old task and insert new task
-            # Note: for whatever reason using the update() function doesn't work,
-            #       so we're left with this option
-            self.service.tasks().delete(tasklist=self.DEFAULT_TASK_LIST,
-                                        task=task.task_id).execute()
-            task_dict = Task.to_gtask_dict(task)
-            result = self.service.tasks().insert(tasklist=self.DEFAULT_TASK_LIST, 
-                                                 body=task_dict).execute()
+        Args:
+            requests: :type:`list` of (request_id, :class:`HttpRequest`) tuples.
+                request_id must be a unique string.
+
+        Returns:
+            :type:`dict` mapping each request_id to a (response, exception)
+            tuple. exception is None if the request succeeded.
+        """
+        results = dict()
+        requests_by_id = dict(requests)
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+            self._count_call(requests_by_id[request_id], response, batched=True)
+
+        def execute_chunk(chunk):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for request_id, request in chunk:
+                batch.add(request, request_id=request_id)
+
+            if self._stats:
+                self._stats.count_round_trip()
+
+            try:
+                batch.execute(http=self._get_http())
+            except Exception as e:
+                # the batch round trip itself failed (eg. we're offline), so
+                # every request that didn't get an answer failed with it, and
+                # may be retried whatever the error was
+                for request_id, _ in chunk:
+                    results.setdefault(request_id, (None, RoundTripError(e)))
+
+        chunks = [requests[start:start + self.BATCH_SIZE]
+                  for start in range(0, len(requests), self.BATCH_SIZE)]
+
+        if self.config['SyncWorkers'] > 1 and len(chunks) > 1:
+            # list() to wait for every chunk
+            list(self._get_executor().map(execute_chunk, chunks))
+        else:
+            for chunk in chunks:
+                execute_chunk(chunk)
+
+        return results
 
 
     def _get_all_task_ids_in_db(self):
         """Retrieve all task UUIDs in local database
-        
+
+        Deleted tasks are left out. Collisions can't happen since task_id
+        is unique in the task table.
+
         Returns:
             :type:`set` of all task UUIDs in local database
         """
-        id_set = set()
-        task_list = Task.select()
+        return self._task_repo.task_ids()
 
-        for t in task_list:
-            if t.task_id in id_set:
-                raise Exception('task UUID collision')
 
-            if t.deleted:
-                continue
+    def _iter_cloud_tasks(self, tasklist, **list_args):
+        """Streams the tasks present in a cloud list, page by page
 
-            id_set.add(t.task_id)
+        Pages are as large as the API allows and only hold the fields we
+        use (see :attr:`LIST_FIELDS`). The next page is fetched in the
+        background while the tasks of the current page are consumed.
 
-        return id_set
+        Args:
+            tasklist: the GTasks list to list
+            list_args: extra arguments passed to the GTasks list request
 
+        Yields:
+            task dictionaries
+        """
+        list_args.setdefault('maxResults', self.LIST_PAGE_SIZE)
+        list_args.setdefault('fields', self.LIST_FIELDS)
 
-    def _get_all_cloud_tasks(self):
-        """Gets a list of all tasks present in the cloud
+        def fetch_page(page_token):
+            if page_token:
+                list_args['pageToken'] = page_token
+            if self._stats:
+                self._stats.count_page()
+            return self._execute_request(self.service.tasks().list(tasklist=tasklist, **list_args))
 
-        Returns:
-            :type:`list` of task dictionaries
-        """
-        list_of_tasks = list()
-        tasks = self.service.tasks().list(tasklist=self.DEFAULT_TASK_LIST).execute()
+        tasks = fetch_page(None)
 
         while True:
-            [list_of_tasks.append(t) for t in tasks['items']]
-            
-            if 'nextPageToken' not in tasks:
+            next_page = None
+            if 'nextPageToken' in tasks:
+                next_page = self._get_page_executor().submit(fetch_page, tasks['nextPageToken'])
+
+            for t in tasks.get('items', list()):
+                yield t
+
+            if not next_page:
                 break
 
-            tasks = self.service.tasks().list(tasklist=self.DEFAULT_TASK_LIST,
-                                             pageToken=tasks['nextPageToken']).execute()
+            tasks = next_page.result()
 
-        return list_of_tasks
 
+    def _get_all_cloud_tasks(self, tasklist=None):
+        """Gets a list of all tasks present in the cloud
 
+        Hidden tasks (completed tasks that have been cleared) are included.
 
-    def _sync_local_to_cloud(self):
-        """Sync local changes to the GTasks cloud"""
-        # grab all actions that need to be performed
-        action_list = Action.select()
+        Args:
+            tasklist: the GTasks list to list (optional, defaults to every
+                list of the board)
 
-        for act in action_list:
-            if act.task_action == Action.TASKADD:
-                self._insert_task_to_gtasks(act.task_ident)
+        Returns:
+            :type:`list` of task dictionaries
+        """
+        if tasklist:
+            return list(self._iter_all_cloud_tasks(tasklist))
 
-            elif act.task_action == Action.TASKDEL:
-                self._delete_task_from_gtasks(act.task_ident)
+        list_of_tasks = list()
+        for tasklist in self._get_board_tasklists():
+            list_of_tasks.extend(self._iter_all_cloud_tasks(tasklist))
 
-            elif act.task_action == Action.TASKMOV:
-                # we only mark the task as completed in GTasks if the 
-                # destination stage is the final (right most) stage
-                if act.end_stage == self.get_stage_names()[-1]:
-                    self._update_task_to_done(act.task_ident)
+        return list_of_tasks
 
-                # else we mark the task as not completed 
-                else:
-                    self._update_task_to_notdone(act.task_ident)
 
-            # remove row from database since we don't want to run this action
-            # again on the next sync
-            act.delete_instance()
+    def _iter_all_cloud_tasks(self, tasklist):
+        """Streams every task of a cloud list, see :func:`_get_all_cloud_tasks`"""
+        return self._iter_cloud_tasks(tasklist, showHidden=True)
 
 
-    def _sync_cloud_to_local(self):
-        """Pull in any cloud changes to local database"""
-        cloud_task_list = self._get_all_cloud_tasks()
-        local_task_list = self.get_task_list()
-        local_uuid_set = self._get_all_task_ids_in_db()
+    def _iter_changed_cloud_tasks(self, tasklist, updated_min):
+        """Streams the tasks of a cloud list changed since :param:`updated_min`
 
-        # first look at any differences between the set(cloud) - set(local)
-        for t in cloud_task_list:
-            # add into local database any tasks not already present
-            if t['id'] not in local_uuid_set:
-                t_notes = t['notes'] if 'notes' in t else ""
+        Deleted tasks are included as tombstones, ie. task dictionaries
+        with 'deleted' set to True.
 
-                if 'due' in t:
-                    t_due = self._convert_str_to_iso3339(t['due']) 
-                else:
-                    t_due = datetime.today()
-                    t_due = t_due.replace(hour=0, minute=0, second=0, microsecond=0)
-
-                if t['status'] == Task.DONE:
-                    t_stage = self.get_stage_names()[-1] 
-                else: 
-                    t_stage = self.get_stage_names()[0]
-
-                self._new_task(t['title'],
-                              stage=t_stage,
-                              due=t_due,
-                              notes=t_notes,
-                              status=t['status'],
-                              task_id=t['id'],
-                              cloud_sync=False)
-
-            # if the task is set to DONE in the cloud and NOTDONE locally,
-            # it must mean that the task was changed in the cloud side, 
-            # since all stage changes made locally are queued up in the 
-            # Action table
-            elif t['id'] in local_uuid_set:
-                local_task = self._locate_task(t['id'])
-                if t['status'] != local_task.status:
-                    local_task.status = t['status']
-                    local_task.save()
-
-        # next look at a ny differences between set(local) - set(cloud)
-        for t in local_task_list:
-            # if we have a local copy, our Action table is empty, and the cloud
-            # doesn't possess a copy, we delete the local copy
-            found = False
-            for cloud_t in cloud_task_list:
-                if t.task_id == cloud_t['id']:
-                    found = True
-
-            action_queue = Action.select()
-            if not found and not len(action_queue):
-                t.delete_instance()
+        Args:
+            tasklist: the GTasks list to list
+            updated_min: RFC 3339 timestamp lower bound of the last modification time
 
+        Yields:
+            task dictionaries
+        """
+        return self._iter_cloud_tasks(tasklist,
+                                      updatedMin=updated_min,
+                                      showDeleted=True,
+                                      showHidden=True)
 
 
+    def _remap_task_id(self, local_id, cloud_id):
+        """Switches a task over from its local id to the id the cloud assigned it
 
-    def _new_task(self, title, stage, due, notes, status, task_id, cloud_sync):
-        """Internal new task creator
+        The task row and any queued action on it are rewritten in place, and
+        the mapping is recorded so that the local id keeps resolving.
 
         Args:
-            title: Title of the task 
-            stage: the stage name (type string) for the task to be inserted into 
-            due: :class:`Datetime.datetime` object of when the task is due
-            notes: Additional notes related to the task
-            status: Status of task. Either DONE or NOTDONE
-            task_id: GTasks compatible task id (42 character alphanum string)
-            cloud_sync: whether or not to sync this new task with GTasks cloud
-        
-        Returns:
-            The added :class:`Task`
+            local_id: id the task was created with locally
+            cloud_id: id of the task in the cloud
         """
-        t = Task.create(title=title,
-                        stage=stage,
-                        due=due, 
-                        notes=notes,
-                        status=status,
-                        task_id=task_id,
-                        deleted=False)
-        t.save()
+        Task.update(task_id=cloud_id).where(Task.task_id == local_id).execute()
+        Action.update(task_ident=cloud_id).where(Action.task_ident == local_id).execute()
+        DeadAction.update(task_ident=cloud_id).where(DeadAction.task_ident == local_id).execute()
+        IdMapping.record(local_id, cloud_id)
 
-        # create Action to be later updated to the cloud
-        if cloud_sync:
-            Action.create(task_ident=task_id,
-                          task_action=Action.TASKADD,
-                          start_stage='None',
-                          end_stage=stage).save()
-            self.sync()
 
-        return t
+    def _record_changes(self, changes):
+        """Gives the running transaction the next board version and logs its changes
 
+        Note: must be called inside the transaction making the changes.
 
+        Args:
+            changes: :type:`list` of (task_id, TaskChange.INSERT, UPDATE or
+                DELETE) tuples, see :func:`changes_since`
+        """
+        TaskChange.record(self._task_repo.bump_version(), changes)
 
-    def new_task(self, 
-                 title, 
-                 stage=None,
-                 due=None,
-                 notes=None,
-                 status=None,
-                 cloud_sync=True):
-        """Adds a task object into the board.
 
-        This is essentially a factory class for Task objects. It is
-        needed because of how unintuitive creating peewee objects are.
+    def _replay_round(self, action_list):
+        """Replays one round of actions against the cloud using batch requests
 
-        The returned object could be either be further manipulated or 
-        stored by the caller.
+        Note: at most one action per task may be present in :param:`action_list`
+        since the order of requests inside a batch is not guaranteed.
 
-        The caller must then use :func:`get_task_list` to find the task
-        that it inserted into the board if the caller wants to later manipulate
-        said task.
+        An action made of several requests (see :func:`_action_requests`) is
+        replayed in steps: the first request of every action shares a batch,
+        then the second request of the actions whose first request succeeded,
+        and so on.
 
         Args:
-            title: Title of the task 
-            stage: the stage name (type string) for the task to be inserted into (optional)
-            due: :class:`Datetime.datetime` object of when the task is due (optional)
-            notes: Additional notes related to the task (optional)
-            status: Status of task. Either DONE or NOTDONE (optional)
-        
+            action_list: :type:`list` of :class:`Action` to replay
+
         Returns:
-            The added :class:`Task`
+            :type:`dict` mapping the id of each :class:`Action` to a
+            (response, exception) tuple. exception is None if the action
+            was replayed successfully, response is the response to its
+            last request.
         """
-        if not title:
-            raise ValueError('no task title')
+        requests_by_id = dict()
+        results = dict()
+        for act in action_list:
+            try:
+                requests = self._action_requests(act)
+            except Exception as e:
+                # the local copy of the task is gone
+                results[act.id] = (None, e)
+                continue
 
-        if not stage:
-            stage = self.get_stage_names()[0]
-        elif stage.lower() not in self.get_stage_names():
-            raise KeyError('{0} not in list of stages'.format(stage))
+            if requests:
+                requests_by_id[act.id] = requests
+            else:
+                results[act.id] = (None, None)
 
-        if not due:
-            # default time is for a task to be due today (year, month, and date specifiers only)
-            due = datetime.today()
-            due = due.replace(hour=0, minute=0, second=0, microsecond=0)
+        step = 0
+        pending_ids = list(requests_by_id)
+        while pending_ids:
+            step_requests = [(str(act_id), requests_by_id[act_id][step])
+                             for act_id in pending_ids]
 
-        if not notes:
-            notes = ""
+            pending_ids = list()
+            for request_id, result in self._execute_batch(step_requests).items():
+                act_id = int(request_id)
+                results[act_id] = result
 
-        if not status:
-            status = Task.NOTDONE
+                if result[1] is None and step + 1 < len(requests_by_id[act_id]):
+                    pending_ids.append(act_id)
 
-        task_id = self._generate_uuid(Task.UUID_LENGTH)
+            step += 1
 
-        return self._new_task(title, stage, due, notes, status, task_id, cloud_sync)
+        return results
 
 
-    def move_task(self, task_id, dest_stage, cloud_sync=True):
-        """Move a specified task into :param:`dest_stage`.
+    def _replay_actions_batched(self, action_list, checkpoint):
+        """Replays actions against the cloud using batch requests
+
+        Actions are replayed in rounds. Each round holds at most one action
+        per task so that actions on the same task are applied in order, while
+        all the actions of a round share a handful of batch requests.
+
+        Rounds are sent CHECKPOINT_SIZE actions at a time, and the results of
+        each slice go through :param:`checkpoint` before the next slice is sent.
 
         Args:
-            task_id: a unique identifier string for the specifc task
-            dest_stage: the stage name (type string) for the task to be inserted
-                into
+            action_list: :type:`list` of :class:`Action` in queue order
+            checkpoint: function recording the results of a :type:`list` of
+                replayed :class:`Action`, see :func:`_record_push_results`
 
         Returns:
-            :type:`None`
+            :type:`dict` mapping the id of each attempted :class:`Action` to a
+            (response, exception) tuple. exception is None if the action was
+            replayed successfully. Actions queued behind a failed action on the
+            same task aren't attempted.
         """
-        t = self._locate_task(task_id)
-        old_stage = t.stage
-        t.stage = dest_stage
-        if dest_stage != self.get_stage_names()[-1]:
-            t.status = Task.NOTDONE
-        t.save()
+        results = dict()
+        failed_idents = set()
+        pending = action_list
+
+        while pending:
+            replay_round = list()
+            deferred = list()
+            round_idents = set()
+
+            for act in pending:
+                # don't run an action before an earlier action on the same task
+                if act.task_ident in failed_idents:
+                    continue
+                elif act.task_ident in round_idents:
+                    deferred.append(act)
+                else:
+                    round_idents.add(act.task_ident)
+                    replay_round.append(act)
 
-        # create Action to be later updated to the cloud
-        if cloud_sync:
-            Action.create(task_ident=task_id,
-                          task_action=Action.TASKMOV,
-                          start_stage=old_stage,
-                          end_stage=dest_stage).save()
+            remapped = dict()
+            for start in range(0, len(replay_round), self.CHECKPOINT_SIZE):
+                replay_slice = replay_round[start:start + self.CHECKPOINT_SIZE]
+                slice_results = self._replay_round(replay_slice)
+                results.update(slice_results)
+                failed_idents.update(act.task_ident for act in replay_slice
+                                     if slice_results[act.id][1] is not None)
+                remapped.update(checkpoint(replay_slice, slice_results))
 
-            self.sync()
+            # later actions on an uploaded task must use its cloud id
+            for act in deferred:
+                act.task_ident = remapped.get(act.task_ident, act.task_ident)
 
+            pending = deferred
+
+        return results
 
-    def delete_task(self, task_id, cloud_sync=True):
-        """Deletes a specified task from the board.
+
+    def _replay_action(self, act):
+        """Replays a single action against the cloud
 
         Args:
-            task_id: a unique identifier string for the specifc task
+            act: the :class:`Action` to replay
 
         Returns:
-            The deleted :class:`Task` object
+            The cloud's response to the last request of the action
         """
-        t = self._locate_task(task_id)
-        t.deleted = True
-        t.save()
-
-        # create Action to be later updated to the cloud
-        if cloud_sync:
-            Action.create(task_ident=task_id,
-                          task_action=Action.TASKDEL,
-                          start_stage=t.stage,
-                          end_stage='None').save()
+        response = None
+        for request in self._action_requests(act):
+            response = self._execute_request(request)
 
-            self.sync()
+        return response
 
 
-    def sync(self):
-        """Syncs local database with Google cloud.
+    def _replay_task_actions(self, action_list):
+        """Replays the actions of one task in order, stopping at the first failure
 
-        This function will first pull in any updates from the GTasks
-        cloud.
-        
-        Then this function will look inside the :class:`Action` table to
-        see what actions need to still be syned with the cloud.
+        Args:
+            action_list: :type:`list` of :class:`Action` of a single task
 
-        In the case that we are offline, we will do nothing and simply 
-        wait for the next invocation of this function.
-        
-        TODO: handle offline case
+        Returns:
+            :type:`dict` mapping the id of each attempted :class:`Action` to a
+            (response, exception) tuple. exception is None if the action was
+            replayed successfully.
         """
-        self._sync_local_to_cloud()
-        self._sync_cloud_to_local()
+        results = dict()
 
+        for act in action_list:
+            try:
+                response = self._replay_action(act)
+            except Exception as e:
+                results[act.id] = (None, e)
+                break
 
-    def get_task_list(self, stage=None, include_pending=True):
-        """Return the list of all tasks in our board.
+            results[act.id] = (response, None)
 
-        Note: include_pending isn't implemented in this release version
-        yet since it's usefulness is doubtful to me
+        return results
+
+
+    def _replay_actions_parallel(self, action_list, checkpoint):
+        """Replays actions against the cloud using a pool of workers
+
+        Each task's actions are replayed in order by a single worker, while
+        actions on different tasks run concurrently. Results go through
+        :param:`checkpoint` about every CHECKPOINT_SIZE actions.
 
         Args:
-            stage: Only tasks belonging to this stage will be returned
-            include_pending: Whether or not to include tasks that haven't
-                been synced to Google Tasks yet
+            action_list: :type:`list` of :class:`Action` in queue order
+            checkpoint: see :func:`_replay_actions_batched`
 
         Returns:
-            A list of :class:`Task` objects
+            :type:`dict` mapping the id of each attempted :class:`Action` to a
+            (response, exception) tuple. exception is None if the action was
+            replayed successfully.
         """
-        if not stage:
-            return list(Task.select())
+        actions_by_ident = OrderedDict()
+        for act in action_list:
+            actions_by_ident.setdefault(act.task_ident, list()).append(act)
 
-        elif stage and stage.lower() in self.get_stage_names():
-            return list(Task.select().where(Task.stage == stage))
+        results = dict()
+        unrecorded = list()
+        unrecorded_results = dict()
+        task_results_list = self._get_executor().map(self._replay_task_actions,
+                                                     actions_by_ident.values())
 
-        else:
-            raise KeyError('{0} not in list of stages'.format(stage))
+        for task_actions, task_results in zip(actions_by_ident.values(), task_results_list):
+            results.update(task_results)
+            unrecorded.extend(task_actions)
+            unrecorded_results.update(task_results)
 
+            if len(unrecorded_results) >= self.CHECKPOINT_SIZE:
+                checkpoint(unrecorded, unrecorded_results)
+                unrecorded = list()
+                unrecorded_results = dict()
 
-    def get_stage_names(self):
-        """Returns a list of all stage names"""
-        return list(self.config['stages'])
+        if unrecorded:
+            checkpoint(unrecorded, unrecorded_results)
 
-    
-    def __init__(self, kbb_dir=None):
-        if not kbb_dir:
-            home_dir = os.path.expanduser('~')
-            kbb_dir = os.path.join(home_dir, '.kbb/')
+        return results
 
-        # GTasks API boilerplate
-        credentials = self._get_credentials(kbb_dir)
-        http = credentials.authorize(httplib2.Http())
-        self.service = discovery.build('tasks', 'v1', http=http)
 
-        # setup config options
-        self.config = dict()
-        self._load_config(kbb_dir, self.config, 'config')
+    def _sync_local_to_cloud(self, stats):
+        """Sync local changes to the GTasks cloud
 
-        # setup the Task class' database
-        database_name = os.path.join(kbb_dir, 'kbbdb.db')
-        task.database.init(database_name)
-        if 'task' not in task.database.get_tables():
-            task.database.create_tables([Task])
+        Depending on the SyncMode config option, the queued actions are either
+        replayed through batch requests or through a pool of workers. Failed
+        actions stay queued until their retry is due, see :class:`Outbox`.
 
-        # setup the Action class' database
-        action.database.init(database_name)
-        if 'action' not in action.database.get_tables():
-            action.database.create_tables([action.Action])
+        The outcome of the replay is committed in checkpoints as it goes, so a
+        sync cut short only replays again the actions of its last slice.
 
-        # now check to see we can access the database
-        task.database.connect()
-        task.database.close()
+        Args:
+            stats: :class:`SyncStats` of the running sync
+        """
+        with stats.timed(SyncStats.PHASE_DB):
+            stats.calls_coalesced += self.compact_action_queue()
+
+            # grab all actions that need to be performed
+            action_list = self.outbox.due_actions()
+
+        def checkpoint(replayed, results):
+            stats.actions_replayed += len(results)
+            stats.actions_failed += sum(1 for _, e in results.values() if e is not None)
+
+            with stats.timed(SyncStats.PHASE_DB):
+                return self._record_push_results(replayed, results)
+
+        if self.config['SyncMode'] == self.SYNC_MODE_PARALLEL:
+            self._replay_actions_parallel(action_list, checkpoint)
+        else:
+            self._replay_actions_batched(action_list, checkpoint)
+
+        with stats.timed(SyncStats.PHASE_DB):
+            IdMapping.prune(self.ID_MAPPING_MAX_AGE)
+
+
+    def _record_push_results(self, action_list, results):
+        """Updates the action queue and the local tasks after a push
+
+        Everything is written in one transaction, so the queue and the tasks
+        always agree on what reached the cloud.
+
+        Args:
+            action_list: :type:`list` of the :class:`Action` that were replayed
+            results: results of the replay, see :func:`_replay_actions_batched`
+
+        Returns:
+            :type:`dict` mapping local id -> cloud id of the uploaded tasks
+        """
+        remapped = dict()
+        changes = list()
+
+        with database.atomic():
+            for act in self.outbox.record_results(action_list, results):
+                response = results[act.id][0]
+                task_ident = act.task_ident
+
+                # the cloud assigned its own id to the uploaded task
+                if act.task_action == Action.TASKADD and response:
+                    task_ident = response['id']
+                    self._remap_task_id(act.task_ident, task_ident)
+                    remapped[act.task_ident] = task_ident
+                    changes.append((act.task_ident, TaskChange.DELETE))
+                    changes.append((task_ident, TaskChange.INSERT))
+
+                # the task now lives in the list of its stage
+                if act.task_action in (Action.TASKADD, Action.TASKMOV):
+                    tasklist = self._get_stage_tasklist(act.end_stage)
+                    Task.update(tasklist=tasklist).where(Task.task_id == task_ident).execute()
+                    changes.append((task_ident, TaskChange.UPDATE))
+
+                # the cloud knows about the deletion, so the row has served its purpose
+                elif act.task_action == Action.TASKDEL:
+                    Task.delete().where((Task.task_id == task_ident) &
+                                        (Task.deleted == True)).execute()
+
+            if changes:
+                self._record_changes(changes)
+
+        self._task_repo.refresh(task_id for task_id, _ in changes)
+
+        return remapped
+
+
+    def _cloud_task_stage(self, t, tasklist):
+        """Returns the stage a cloud task belongs in
+
+        Completed tasks go to the final stage. Otherwise the task goes to the
+        stage mapped to its list, or the first stage if its list isn't mapped.
+
+        Args:
+            t: task dictionary pulled from the cloud
+            tasklist: the GTasks list the task lives in
+        """
+        if t['status'] == Task.DONE:
+            return self.get_stage_names()[-1]
+
+        return self._get_tasklist_stage(tasklist) or self.get_stage_names()[0]
+
+
+    def _get_cloud_completed(self, t):
+        """Returns when a cloud task was completed, None if it isn't done"""
+        if t['status'] != Task.DONE:
+            return None
+        elif 'completed' in t:
+            return self._convert_str_to_iso3339(t['completed'])
+
+        return datetime.now()
+
+
+    def _cloud_task_to_row(self, t, tasklist):
+        """Converts a cloud task dictionary into a local :class:`Task` row
+
+        Args:
+            t: task dictionary pulled from the cloud
+            tasklist: the GTasks list the task lives in
+
+        Returns:
+            :type:`dict` of :class:`Task` field values
+        """
+        t_notes = t['notes'] if 'notes' in t else ""
+
+        if 'due' in t:
+            t_due = self._convert_str_to_iso3339(t['due']) 
+        else:
+            t_due = datetime.today()
+            t_due = t_due.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        return {'title': t['title'],
+                'stage': self._cloud_task_stage(t, tasklist),
+                'due': t_due,
+                'notes': t_notes,
+                'status': t['status'],
+                'task_id': t['id'],
+                'deleted': False,
+                'tasklist': tasklist,
+                'completed': self._get_cloud_completed(t)}
+
+
+    def _apply_reconcile_plan(self, plan, cloud_tasklists):
+        """Applies a :class:`ReconcilePlan` to the local database
+
+        Every kind of change is applied with a handful of bulk statements
+        rather than one statement per task.
+
+        Args:
+            plan: the :class:`ReconcilePlan` to apply
+            cloud_tasklists: :type:`dict` mapping task_id -> the GTasks list
+                each live cloud task was found in
+        """
+        rows = [self._cloud_task_to_row(t, cloud_tasklists[t['id']]) for t in plan.inserts]
+        for start in range(0, len(rows), self.DB_CHUNK_SIZE):
+            Task.insert_many(rows[start:start + self.DB_CHUNK_SIZE]).execute()
+
+        # group status updates so each distinct status costs one statement per chunk
+        ids_by_status = dict()
+        for task_id, status in plan.updates.items():
+            ids_by_status.setdefault(status, list()).append(task_id)
+
+        for status, task_ids in ids_by_status.items():
+            completed = datetime.now() if status == Task.DONE else None
+            for start in range(0, len(task_ids), self.DB_CHUNK_SIZE):
+                chunk = task_ids[start:start + self.DB_CHUNK_SIZE]
+                Task.update(status=status, completed=completed).where(Task.task_id.in_(chunk)).execute()
+
+        deletes = list(plan.deletes)
+        for start in range(0, len(deletes), self.DB_CHUNK_SIZE):
+            chunk = deletes[start:start + self.DB_CHUNK_SIZE]
+            Task.delete().where(Task.task_id.in_(chunk)).execute()
+
+
+    def _get_pull_watermark_key(self, tasklist):
+        """Returns the :class:`SyncState` key of the pull watermark of :param:`tasklist`"""
+        if tasklist == self.DEFAULT_TASK_LIST:
+            return SyncState.LAST_PULL
+
+        return '{0}:{1}'.format(SyncState.LAST_PULL, tasklist)
+
+
+    def _relist_tasks(self, cloud_tasks, cloud_tasklists, local_tasklists, pending_idents):
+        """Follows tasks moved between lists on the cloud side
+
+        A task found in another list than the one we have it in moves to
+        the stage of its new list, unless we have queued changes of our own.
+
+        Args:
+            cloud_tasks: :type:`dict` mapping task_id -> live cloud task dictionary
+            cloud_tasklists: :type:`dict` mapping task_id -> the GTasks list
+                each live cloud task was found in
+            local_tasklists: :type:`dict` mapping task_id -> the GTasks list
+                of every local task
+            pending_idents: :type:`set` of task_ids that still have queued or dead actions
+
+        Returns:
+            :type:`list` of the ids of the moved tasks
+        """
+        ids_by_location = dict()
+        for task_id, tasklist in cloud_tasklists.items():
+            if task_id not in local_tasklists or task_id in pending_idents:
+                continue
+            if local_tasklists[task_id] == tasklist:
+                continue
+
+            stage = self._cloud_task_stage(cloud_tasks[task_id], tasklist)
+            ids_by_location.setdefault((tasklist, stage), list()).append(task_id)
+
+        for (tasklist, stage), task_ids in ids_by_location.items():
+            for start in range(0, len(task_ids), self.DB_CHUNK_SIZE):
+                chunk = task_ids[start:start + self.DB_CHUNK_SIZE]
+                Task.update(tasklist=tasklist, stage=stage).where(Task.task_id.in_(chunk)).execute()
+
+        return [task_id for task_ids in ids_by_location.values() for task_id in task_ids]
+
+
+    def _pull_archived_tasks(self, cloud_task_list, cloud_tasks):
+        """Applies the cloud changes of archived tasks to the archive
+
+        Archived tasks deleted on the cloud are dropped from the archive, and
+        those no longer done there are restored to the board, to be
+        reconciled like any other task. The other archived tasks are left
+        alone.
+
+        Args:
+            cloud_task_list: :type:`list` of pulled cloud task dictionaries
+            cloud_tasks: :type:`dict` mapping task_id -> live cloud task dictionary
+
+        Returns:
+            :param:`cloud_task_list` without the tasks left in the archive
+        """
+        archived = archive.find_archived(set(t['id'] for t in cloud_task_list))
+        if not archived:
+            return cloud_task_list
+
+        # a task moved between lists also leaves a tombstone in its old list
+        deleted = [task_id for task_id in archived if task_id not in cloud_tasks]
+        reopened = [task_id for task_id in archived
+                    if task_id in cloud_tasks and cloud_tasks[task_id]['status'] != Task.DONE]
+
+        with database.atomic():
+            archive.forget_archived(deleted)
+            restored = archive.restore_tasks(database, reopened)
+            if restored:
+                self._record_changes([(task_id, TaskChange.INSERT) for task_id in restored])
+
+        self._task_repo.refresh(restored)
+
+        archived.difference_update(restored)
+        return [t for t in cloud_task_list if t['id'] not in archived]
+
+
+    def _sync_cloud_to_local(self, stats, full_resync=False):
+        """Pull in any cloud changes to local database
+
+        Every list of the board is pulled concurrently. Only the tasks changed
+        since the last pull of a list are fetched, and cloud side deletions
+        are applied from the returned tombstones. If we have never pulled a
+        list before, or :param:`full_resync` is set, every task of the list is
+        fetched and local tasks of the list missing from the cloud are
+        deleted instead.
+
+        Args:
+            stats: :class:`SyncStats` of the running sync
+            full_resync: whether to ignore the last pull watermarks
+        """
+        watermarks = dict()
+        for tasklist in self._get_board_tasklists():
+            watermarks[tasklist] = None
+            if not full_resync:
+                watermarks[tasklist] = SyncState.get_value(self._get_pull_watermark_key(tasklist))
+
+        def pull_tasklist(tasklist):
+            if watermarks[tasklist]:
+                tasks = self._iter_changed_cloud_tasks(tasklist, watermarks[tasklist])
+            else:
+                tasks = self._iter_all_cloud_tasks(tasklist)
+
+            # index each page while the next one is on its way
+            pulled_tasks = list()
+            live_tasks = dict()
+            newest = watermarks[tasklist]
+            for t in tasks:
+                pulled_tasks.append(t)
+                if not t.get('deleted'):
+                    live_tasks[t['id']] = t
+                if 'updated' in t and (not newest or t['updated'] > newest):
+                    newest = t['updated']
+
+            return pulled_tasks, live_tasks, newest
+
+        # only the listings run on the workers, the database is ours
+        if len(watermarks) > 1 and self.config['SyncWorkers'] > 1:
+            pulled_lists = list(self._get_executor().map(pull_tasklist, watermarks))
+        else:
+            pulled_lists = [pull_tasklist(tasklist) for tasklist in watermarks]
+
+        cloud_task_list = list()
+        cloud_tasks = dict()
+        cloud_tasklists = dict()
+        for tasklist, (pulled_tasks, live_tasks, _) in zip(watermarks, pulled_lists):
+            cloud_task_list.extend(pulled_tasks)
+            cloud_tasks.update(live_tasks)
+            cloud_tasklists.update(dict.fromkeys(live_tasks, tasklist))
+
+        # archived tasks stay out of the reconciliation
+        with stats.timed(SyncStats.PHASE_DB):
+            cloud_task_list = self._pull_archived_tasks(cloud_task_list, cloud_tasks)
+
+        # read the local state and the action queue once
+        local_tasks = dict()
+        local_tasklists = dict()
+        for task_id, status, tasklist in Task.select(Task.task_id, Task.status, Task.tasklist).tuples():
+            local_tasks[task_id] = status
+            local_tasklists[task_id] = tasklist
+        pending_idents = set(act.task_ident for act in Action.select(Action.task_ident))
+
+        # the changes the cloud rejected may still be requeued, see requeue_dead_actions()
+        pending_idents.update(dead.task_ident for dead in DeadAction.select(DeadAction.task_ident))
+
+        # absence only means deletion for the lists we fetched whole
+        full_tasklists = set(tasklist for tasklist in watermarks if not watermarks[tasklist])
+        listed_ids = set(task_id for task_id, tasklist in local_tasklists.items()
+                         if tasklist in full_tasklists)
+
+        plan = reconcile(local_tasks, cloud_task_list, pending_idents,
+                         bool(full_tasklists), listed_ids)
+
+        # a single commit, so the watermarks never get ahead of the rows they cover
+        with stats.timed(SyncStats.PHASE_DB), database.atomic():
+            self._apply_reconcile_plan(plan, cloud_tasklists)
+            relisted = self._relist_tasks(cloud_tasks, cloud_tasklists,
+                                          local_tasklists, pending_idents)
+            stats.rows_changed += len(plan) + len(relisted)
+
+            # the next pull of a list only needs tasks changed after the newest one we have seen
+            for tasklist, (_, _, newest) in zip(watermarks, pulled_lists):
+                if newest and newest != watermarks[tasklist]:
+                    SyncState.set_value(self._get_pull_watermark_key(tasklist), newest)
+
+            changes = [(t['id'], TaskChange.INSERT) for t in plan.inserts]
+            changes.extend((task_id, TaskChange.UPDATE) for task_id in plan.updates)
+            changes.extend((task_id, TaskChange.DELETE) for task_id in plan.deletes)
+            changes.extend((task_id, TaskChange.UPDATE) for task_id in relisted)
+            if changes:
+                self._record_changes(changes)
+
+        self._task_repo.refresh(task_id for task_id, _ in changes)
+
+
+    def _new_task(self, title, stage, due, notes, status, task_id, cloud_sync):
+        """Internal new task creator
+
+        Args:
+            title: Title of the task 
+            stage: the stage name (type string) for the task to be inserted into 
+            due: :class:`Datetime.datetime` object of when the task is due
+            notes: Additional notes related to the task
+            status: Status of task. Either DONE or NOTDONE
+            task_id: GTasks compatible task id (42 character alphanum string)
+            cloud_sync: whether or not to sync this new task with GTasks cloud
+        
+        Returns:
+            The added :class:`Task`
+        """
+        with database.atomic():
+            t = Task.create(title=title,
+                            stage=stage,
+                            due=due,
+                            notes=notes,
+                            status=status,
+                            task_id=task_id,
+                            deleted=False,
+                            tasklist=self._get_stage_tasklist(stage),
+                            completed=datetime.now() if status == Task.DONE else None)
+
+            # create Action to be later updated to the cloud
+            if cloud_sync:
+                Action.create(task_ident=task_id,
+                              task_action=Action.TASKADD,
+                              start_stage='None',
+                              end_stage=stage)
+
+            self._record_changes([(task_id, TaskChange.INSERT)])
+
+        self._task_repo.put(t)
+
+        if cloud_sync:
+            self._request_sync()
+
+        return t
+
+
+
+    def new_task(self, 
+                 title, 
+                 stage=None,
+                 due=None,
+                 notes=None,
+                 status=None,
+                 cloud_sync=True):
+        """Adds a task object into the board.
+
+        This is essentially a factory class for Task objects. It is
+        needed because of how unintuitive creating peewee objects are.
+
+        The returned object could be either be further manipulated or 
+        stored by the caller.
+
+        The caller must then use :func:`get_task_list` to find the task
+        that it inserted into the board if the caller wants to later manipulate
+        said task.
+
+        Args:
+            title: Title of the task 
+            stage: the stage name (type string) for the task to be inserted into (optional)
+            due: :class:`Datetime.datetime` object of when the task is due (optional)
+            notes: Additional notes related to the task (optional)
+            status: Status of task. Either DONE or NOTDONE (optional)
+        
+        Returns:
+            The added :class:`Task`
+        """
+        if not title:
+            raise ValueError('no task title')
+
+        if not stage:
+            stage = self.get_stage_names()[0]
+        elif stage.lower() not in self.get_stage_names():
+            raise KeyError('{0} not in list of stages'.format(stage))
+
+        if not due:
+            # default time is for a task to be due today (year, month, and date specifiers only)
+            due = datetime.today()
+            due = due.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        if not notes:
+            notes = ""
+
+        if not status:
+            status = Task.NOTDONE
+
+        task_id = self._generate_uuid(Task.UUID_LENGTH)
+
+        return self._new_task(title, stage, due, notes, status, task_id, cloud_sync)
+
+
+    def move_task(self, task_id, dest_stage, cloud_sync=True):
+        """Move a specified task into :param:`dest_stage`.
+
+        Args:
+            task_id: a unique identifier string for the specifc task
+            dest_stage: the stage name (type string) for the task to be inserted
+                into
+
+        Returns:
+            :type:`None`
+        """
+        cached = self._locate_task(task_id)
+        final_stage = self.get_stage_names()[-1]
+
+        # the sync may switch the task over to its cloud id meanwhile, so the
+        # row is re-read under the write lock and only the moved columns are written
+        with database.atomic('IMMEDIATE'):
+            t = Task.get_by_id(cached.id)
+            changes = {Task.stage: dest_stage}
+            if dest_stage != final_stage:
+                changes.update({Task.status: Task.NOTDONE, Task.completed: None})
+            elif t.status != Task.DONE:
+                changes.update({Task.status: Task.DONE, Task.completed: datetime.now()})
+
+            Task.update(changes).where(Task.id == t.id).execute()
+
+            # create Action to be later updated to the cloud
+            if cloud_sync:
+                Action.create(task_ident=t.task_id,
+                              task_action=Action.TASKMOV,
+                              start_stage=t.stage,
+                              end_stage=dest_stage)
+
+            self._record_changes([(t.task_id, TaskChange.UPDATE)])
+
+        self._task_repo.refresh(set([cached.task_id, t.task_id]))
+
+        if cloud_sync:
+            self._request_sync()
+
+
+    def delete_task(self, task_id, cloud_sync=True):
+        """Deletes a specified task from the board.
+
+        Args:
+            task_id: a unique identifier string for the specifc task
+
+        Returns:
+            The deleted :class:`Task` object
+        """
+        cached = self._locate_task(task_id)
+
+        # see move_task(), only the deleted flag is written
+        with database.atomic('IMMEDIATE'):
+            t = Task.get_by_id(cached.id)
+            Task.update(deleted=True).where(Task.id == t.id).execute()
+
+            # create Action to be later updated to the cloud
+            if cloud_sync:
+                Action.create(task_ident=t.task_id,
+                              task_action=Action.TASKDEL,
+                              start_stage=t.stage,
+                              end_stage='None')
+
+            self._record_changes([(t.task_id, TaskChange.DELETE)])
+
+        self._task_repo.refresh(set([cached.task_id, t.task_id]))
+
+        if cloud_sync:
+            self._request_sync()
+
+
+    def _import_record_to_row(self, record, line_number, default_due):
+        """Validates an imported task record and converts it into a :class:`Task` row
+
+        Args:
+            record: task record read by :func:`taskio.read_records`
+            line_number: where the record was read from, for error messages
+            default_due: due date of records without one
+
+        Returns:
+            :type:`dict` of :class:`Task` field values
+        """
+        title = record.get('title')
+        if not title:
+            raise ValueError('no task title on line {0}'.format(line_number))
+
+        stage = (record.get('stage') or self.get_stage_names()[0]).lower()
+        if stage not in self.get_stage_names():
+            raise KeyError('{0} not in list of stages (line {1})'.format(stage, line_number))
+
+        due = default_due
+        if record.get('due'):
+            for due_format in taskio.DUE_FORMATS:
+                try:
+                    due = datetime.strptime(record['due'], due_format)
+                    break
+                except ValueError:
+                    pass
+            else:
+                raise ValueError('invalid due date on line {0}'.format(line_number))
+
+        status = record.get('status')
+        if not status:
+            status = Task.DONE if stage == self.get_stage_names()[-1] else Task.NOTDONE
+        elif status not in (Task.DONE, Task.NOTDONE):
+            raise ValueError('invalid status on line {0}'.format(line_number))
+
+        return {'title': title,
+                'stage': stage,
+                'due': due,
+                'notes': record.get('notes') or "",
+                'status': status,
+                'task_id': self._generate_uuid(Task.UUID_LENGTH),
+                'deleted': False,
+                'tasklist': self._get_stage_tasklist(stage),
+                'completed': datetime.now() if status == Task.DONE else None}
+
+
+    def import_tasks(self, path, fmt=None, cloud_sync=True):
+        """Adds every task of a JSON Lines or CSV file into the board
+
+        Records need a title. stage, due, notes and status are optional,
+        like for :func:`new_task`. Every imported task is a new task, so
+        task_id is ignored.
+
+        The file is read in chunks, and all tasks are inserted along with
+        their queued uploads in a single transaction, so either every task
+        is imported or none is. The uploads are pushed by a single sync.
+
+        Args:
+            path: path of the file to import
+            fmt: taskio.FORMAT_JSONL or taskio.FORMAT_CSV (optional,
+                guessed from the file extension)
+            cloud_sync: whether or not to sync the new tasks with GTasks cloud
+
+        Returns:
+            Number of imported tasks
+        """
+        if not fmt:
+            fmt = taskio.guess_format(path)
+
+        default_due = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
+        imported_count = 0
+
+        with open(path, newline='') as f:
+            records = taskio.read_records(f, fmt)
+
+            with database.atomic():
+                while True:
+                    rows = [self._import_record_to_row(record, line_number, default_due)
+                            for line_number, record in islice(records, self.DB_CHUNK_SIZE)]
+                    if not rows:
+                        break
+
+                    Task.insert_many(rows).execute()
+                    imported_count += len(rows)
+
+                    if cloud_sync:
+                        Action.insert_many([{'task_ident': row['task_id'],
+                                             'task_action': Action.TASKADD,
+                                             'start_stage': 'None',
+                                             'end_stage': row['stage']} for row in rows]).execute()
+
+                if imported_count:
+                    TaskChange.record_newest_tasks(self._task_repo.bump_version(), imported_count)
+
+        # cheaper than reading back the imported rows one chunk at a time
+        self._task_repo.invalidate()
+
+        if cloud_sync and imported_count:
+            self._request_sync()
+
+        return imported_count
+
+
+    def _export_row_to_record(self, row):
+        """Converts a (title, stage, due, notes, status, task_id) row into a task record"""
+        title, stage, due, notes, status, task_id = row
+        return {'title': title,
+                'stage': stage,
+                'due': due.isoformat() if isinstance(due, datetime) else due,
+                'notes': notes,
+                'status': status,
+                'task_id': task_id}
+
+
+    def export_tasks(self, path, fmt=None, stage=None):
+        """Writes every task of the board into a JSON Lines or CSV file
+
+        Rows are streamed from the database straight into the file, so the
+        whole board is never held in memory.
+
+        Args:
+            path: path of the file to write
+            fmt: taskio.FORMAT_JSONL or taskio.FORMAT_CSV (optional,
+                guessed from the file extension)
+            stage: only tasks belonging to this stage are exported (optional)
+
+        Returns:
+            Number of exported tasks
+        """
+        if not fmt:
+            fmt = taskio.guess_format(path)
+
+        query = (Task.select(Task.title, Task.stage, Task.due, Task.notes, Task.status, Task.task_id)
+                     .where(Task.deleted == False)
+                     .order_by(Task.id))
+
+        if stage:
+            if stage.lower() not in self.get_stage_names():
+                raise KeyError('{0} not in list of stages'.format(stage))
+            query = query.where(Task.stage == stage.lower())
+
+        with open(path, 'w', newline='') as f:
+            records = (self._export_row_to_record(row) for row in query.tuples().iterator())
+            return taskio.write_records(f, records, fmt)
+
+
+    def _action_call_cost(self, act):
+        """Returns the number of API calls replaying :param:`act` takes"""
+        if act.task_action not in Action.ACTIONS:
+            return 0
+
+        # a move into another list that changes the status takes a patch and a move
+        final_stage = self.get_stage_names()[-1]
+        if (act.task_action == Action.TASKMOV
+                and self._get_stage_tasklist(act.start_stage) != self._get_stage_tasklist(act.end_stage)
+                and (act.start_stage == final_stage) != (act.end_stage == final_stage)):
+            return 2
+
+        return 1
+
+
+    def compact_action_queue(self):
+        """Rewrites the :class:`Action` queue into its minimal equivalent
+
+        See :func:`Action.coalesce` for the folding rules. This is run before
+        every replay of the queue.
+
+        Returns:
+            Number of API calls removed from the next replay
+        """
+        action_list = list(Action.select().order_by(Action.id))
+        calls_before = sum(self._action_call_cost(act) for act in action_list)
+        original_stages = {act.id: (act.start_stage, act.end_stage) for act in action_list}
+
+        kept, removed = Action.coalesce(action_list)
+
+        with database.atomic():
+            for act in kept:
+                if (act.start_stage, act.end_stage) != original_stages[act.id]:
+                    act.save()
+
+            removed_ids = [act.id for act in removed]
+            for start in range(0, len(removed_ids), self.DB_CHUNK_SIZE):
+                chunk = removed_ids[start:start + self.DB_CHUNK_SIZE]
+                Action.delete().where(Action.id.in_(chunk)).execute()
+
+        return calls_before - sum(self._action_call_cost(act) for act in kept)
+
+
+    def _collect_garbage_if_due(self):
+        """Collects garbage if the last collection is more than GcRate hours old"""
+        if not self.config['GcRate']:
+            return
+
+        last_gc = SyncState.get_value(SyncState.LAST_GC)
+        if last_gc:
+            last_gc = datetime.strptime(last_gc, self.TIMESTAMP_FORMAT)
+            if datetime.now() - last_gc < timedelta(hours=self.config['GcRate']):
+                return
+
+        if self.config['ArchiveAge']:
+            self.archive_completed_tasks()
+        self.collect_garbage()
+
+
+    def archive_completed_tasks(self, days=None):
+        """Moves the tasks completed more than :param:`days` days ago to the archive
+
+        Archived tasks are left out of :func:`get_task_list` and of syncs,
+        but can still be found with :func:`search` and brought back with
+        :func:`restore_task`. Tasks with queued actions aren't archived until
+        those reach the cloud. This runs on its own along with the garbage
+        collection, with the ArchiveAge config option.
+
+        Args:
+            days: age of the tasks to archive (optional, defaults to ArchiveAge)
+
+        Returns:
+            Number of archived tasks
+        """
+        if days is None:
+            days = self.config['ArchiveAge']
+
+        with self._sync_lock:
+            with database.atomic():
+                archived = archive.archive_tasks(database, datetime.now() - timedelta(days=days))
+                if archived:
+                    self._record_changes([(task_id, TaskChange.DELETE) for task_id in archived])
+
+            self._task_repo.refresh(archived)
+
+        return len(archived)
+
+
+    def restore_task(self, task_id):
+        """Moves a task back from the archive to the board
+
+        The task counts as completed now, so it stays on the board for
+        another ArchiveAge days.
+
+        Args:
+            task_id: a unique identifier string for the archived task
+
+        Returns:
+            The restored :class:`Task`
+        """
+        with self._sync_lock:
+            with database.atomic():
+                if not archive.restore_tasks(database, [task_id]):
+                    raise KeyError('{0} not in the archive'.format(task_id))
+
+                Task.update(completed=datetime.now()).where(Task.task_id == task_id).execute()
+                self._record_changes([(task_id, TaskChange.INSERT)])
+
+            self._task_repo.refresh([task_id])
+
+        return self._locate_task(task_id)
+
+
+    def collect_garbage(self, vacuum=True):
+        """Purges deleted tasks and shrinks the database file
+
+        Deleted tasks are purged once their deletion has reached the cloud,
+        see :func:`garbage.purge_deleted_tasks`. This runs on its own after
+        a sync every GcRate hours (see the config file).
+
+        Args:
+            vacuum: whether to also give free pages back to the file system
+
+        Returns:
+            (number of purged tasks, number of bytes freed) tuple
+        """
+        with self._sync_lock:
+            with database.atomic():
+                purged = garbage.purge_deleted_tasks()
+                SyncState.set_value(SyncState.LAST_GC,
+                                    datetime.now().strftime(self.TIMESTAMP_FORMAT))
+
+            freed = garbage.vacuum(database) if vacuum else 0
+
+        return purged, freed
+
+
+    def requeue_dead_actions(self):
+        """Gives the actions the cloud rejected another try
+
+        Every :class:`DeadAction` goes back to the end of the action queue
+        with its retry bookkeeping reset, to be replayed by the next sync.
+
+        Returns:
+            Number of requeued actions
+        """
+        with self._sync_lock:
+            with database.atomic():
+                return self.outbox.requeue_dead_actions()
+
+
+    def sync(self, full_resync=False):
+        """Syncs local database with Google cloud.
+
+        This function will first look inside the :class:`Action` table to
+        see what actions need to still be syned with the cloud.
+
+        Then this function will pull in any updates from the GTasks
+        cloud. Only tasks changed since the last sync are pulled unless
+        :param:`full_resync` is set.
+
+        In the case that we are offline, we will do nothing and simply 
+        wait for the next invocation of this function. Queued actions that
+        failed are retried with backoff on later invocations.
+        
+        This function is safe to call while a background sync is running,
+        the two syncs will simply run one after the other.
+        """
+        with self._sync_lock:
+            stats = self._stats = SyncStats()
+
+            try:
+                with stats.timed(SyncStats.PHASE_PUSH):
+                    self._sync_local_to_cloud(stats)
+
+                try:
+                    with stats.timed(SyncStats.PHASE_PULL):
+                        self._sync_cloud_to_local(stats, full_resync)
+                except Exception as e:
+                    if not Outbox.is_transient(e):
+                        raise e
+                    stats.error = repr(e)
+
+                with stats.timed(SyncStats.PHASE_DB):
+                    self._collect_garbage_if_due()
+
+            except Exception as e:
+                stats.error = repr(e)
+                raise e
+
+            finally:
+                self._stats = None
+                self._record_sync_stats(stats)
+
+
+    def _record_sync_stats(self, stats):
+        """Keeps the :class:`SyncStats` of a finished sync
+
+        The stats go to the in-memory history, and are appended to the
+        MetricsFile (see the config file) if one is configured.
+        """
+        self._sync_history.append(stats)
+
+        if self.config['MetricsFile']:
+            try:
+                append_metrics(os.path.join(self._kbb_dir, self.config['MetricsFile']), stats)
+            except OSError:
+                # metrics are best effort, they must never fail a sync
+                pass
+
+
+    def get_sync_stats(self):
+        """Returns the stats of the most recent syncs
+
+        At most :attr:`SYNC_HISTORY` syncs are kept, in memory only.
+
+        Returns:
+            :type:`list` of :class:`SyncStats`, oldest first
+        """
+        return list(self._sync_history)
+
+
+    def _request_sync(self):
+        """Syncs after a local change
+
+        With background sync running the sync is debounced onto the background
+        thread, otherwise we sync right away.
+        """
+        if self._scheduler:
+            self._scheduler.request_sync()
+        else:
+            self.sync()
+
+
+    def start_background_sync(self):
+        """Starts syncing on a background thread
+
+        A sync then runs every SyncRate seconds (see the config file), and
+        shortly after local changes instead of blocking the caller.
+        """
+        if self._scheduler:
+            return
+
+        self._scheduler = SyncScheduler(self.sync, self.config['SyncRate'], self.SYNC_DEBOUNCE)
+        self._scheduler.start()
+
+
+    def stop_background_sync(self, timeout=None):
+        """Stops syncing on a background thread
+
+        Pending changes are not synced, use :func:`flush_sync` first for that.
+
+        Args:
+            timeout: maximum number of seconds to wait for a running sync (optional)
+        """
+        if not self._scheduler:
+            return
+
+        self._scheduler.stop(timeout)
+        self._scheduler = None
+
+
+    def wait_for_sync(self, timeout=None):
+        """Waits until all local changes made so far have been synced
+
+        Args:
+            timeout: maximum number of seconds to wait (optional)
+
+        Returns:
+            True if nothing is left to sync
+        """
+        if not self._scheduler:
+            return True
+
+        return self._scheduler.wait(timeout)
+
+
+    def flush_sync(self, timeout=None):
+        """Syncs right away, skipping the background sync debounce delay
+
+        Args:
+            timeout: maximum number of seconds to wait (optional)
+
+        Returns:
+            True if the sync finished
+        """
+        if not self._scheduler:
+            self.sync()
+            return True
+
+        return self._scheduler.flush(timeout)
+
+
+    def has_credentials(self):
+        """Whether credentials have been stored by an earlier authorization
+
+        If not, the first sync runs the interactive OAuth2 flow.
+        """
+        return self.backend.has_credentials()
+
+
+    def authorize(self):
+        """Authorizes kbb with the cloud right away instead of on the first sync
+
+        This runs the interactive OAuth2 flow if no valid credentials are stored.
+        """
+        self._authorize()
+
+
+    def close(self):
+        """Releases everything the board holds
+
+        Background sync is stopped, the sync workers are shut down and the
+        database connection of the calling thread is closed. Pending changes
+        are not synced, use :func:`flush_sync` first for that.
+        """
+        self.stop_background_sync()
+
+        with self._executor_lock:
+            for executor in (self._executor, self._page_executor):
+                if executor:
+                    executor.shutdown()
+            self._executor = None
+            self._page_executor = None
+
+        if not database.is_closed():
+            database.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def get_task_list(self, stage=None, include_pending=True, due_from=None, due_to=None):
+        """Return the list of all tasks in our board.
+
+        Note: include_pending isn't implemented in this release version
+        yet since it's usefulness is doubtful to me
+
+        Args:
+            stage: Only tasks belonging to this stage will be returned
+            include_pending: Whether or not to include tasks that haven't
+                been synced to Google Tasks yet
+            due_from: Only tasks due at or after this :class:`datetime` will
+                be returned (optional)
+            due_to: Only tasks due at or before this :class:`datetime` will
+                be returned (optional)
+
+        Returns:
+            A list of :class:`Task` objects, in the order they were added
+        """
+        if stage and stage.lower() not in self.get_stage_names():
+            raise KeyError('{0} not in list of stages'.format(stage))
+
+        # served from memory, see TaskRepository
+        task_list = self._task_repo.tasks(stage or None)
+
+        if due_from:
+            task_list = [t for t in task_list if t.due >= due_from]
+        if due_to:
+            task_list = [t for t in task_list if t.due <= due_to]
+
+        return task_list
+
+
+    def get_task_snapshots(self, stage, due_from=None, due_to=None, limit=None):
+        """Returns compact read-only copies of the tasks of :param:`stage`
+
+        Like :func:`get_task_list`, but meant for drawing the board: the
+        snapshots only hold what a task is drawn from, and are reused until
+        a task of the stage changes.
+
+        Args:
+            stage: the stage name the tasks belong to
+            due_from: Only tasks due at or after this :class:`datetime` will
+                be returned (optional)
+            due_to: Only tasks due at or before this :class:`datetime` will
+                be returned (optional)
+            limit: max number of tasks returned (optional)
+
+        Returns:
+            A list of :class:`TaskSnapshot`, in the order the tasks were added
+        """
+        if stage.lower() not in self.get_stage_names():
+            raise KeyError('{0} not in list of stages'.format(stage))
+
+        snapshots = list()
+        for snapshot in self._task_repo.snapshots(stage):
+            if limit is not None and len(snapshots) >= limit:
+                break
+            if due_from and snapshot.due < due_from:
+                continue
+            if due_to and snapshot.due > due_to:
+                continue
+            snapshots.append(snapshot)
+
+        return snapshots
+
+
+    def search(self, text, limit=SEARCH_LIMIT, archived=False):
+        """Finds the tasks whose title or notes have every word of :param:`text`
+
+        Words match the start of the task's words, ignoring letter case and
+        accents. Without FTS5 they match anywhere instead, see :mod:`kbb.search`.
+        Deleted tasks are never found.
+
+        Args:
+            text: what to look for, eg. 'readme upd'
+            limit: max number of tasks returned (optional)
+            archived: whether to search the archive instead of the board
+                (optional), see :func:`archive_completed_tasks`
+
+        Returns:
+            :type:`list` of :class:`Task`, or :class:`ArchivedTask` if
+            :param:`archived` is set, best matches first
+        """
+        words = search.get_words(text)
+        if not words:
+            return list()
+
+        if self._search_indexed:
+            return search.search_index(words, limit, archived)
+        else:
+            return search.search_scan(words, limit, archived)
+
+
+    def changes_since(self, version):
+        """Returns what changed in the board after :param:`version`
+
+        Every change made through :class:`Kbb`, locally or by a sync, moves
+        the board to a new version. A caller keeping a copy of the tasks can
+        remember the version it has and later only read the changed tasks
+        back with :func:`get_task_list`.
+
+        Args:
+            version: board version the caller is up to date with, 0 if none
+
+        Returns:
+            (current version, changes) tuple. changes is an
+            :class:`OrderedDict` mapping task_id -> TaskChange.INSERT, UPDATE
+            or DELETE, see :func:`TaskChange.since`. It is None if
+            :param:`version` is too old for the changelog, in which case the
+            whole board must be read again.
+        """
+        # one read transaction, so the version matches the changes
+        with database.atomic():
+            current = self.get_board_version()
+            return current, TaskChange.since(version)
+
+
+    def get_board_version(self):
+        """Returns the current board version, see :func:`changes_since`
+
+        A single lookup, cheap enough to poll before every redraw.
+        """
+        return int(SyncState.get_value(SyncState.TASKS_VERSION, 0))
+
+
+    def invalidate_tasks(self):
+        """Reloads the tasks :func:`get_task_list` serves from the database
+
+        Changes made by other kbb processes are picked up on their own, this
+        is only needed after changing the database by other means.
+        """
+        self._task_repo.invalidate()
+
+
+    def get_stage_names(self):
+        """Returns a list of all stage names"""
+        return list(self.config['stages'])
+
+    
+    def __init__(self, kbb_dir=None, backend=None):
+        """Init
+
+        Args:
+            kbb_dir: root directory of kbb files (optional, defaults to the
+                KBB_DIR environment variable, then ~/.kbb)
+            backend: the :class:`Backend` to sync with (optional, defaults to
+                the one selected by the Backend config option)
+        """
+        if not kbb_dir:
+            kbb_dir = os.environ.get('KBB_DIR')
+        if not kbb_dir:
+            home_dir = os.path.expanduser('~')
+            kbb_dir = os.path.join(home_dir, '.kbb/')
+
+        # GTasks API boilerplate. Nothing is loaded until we first talk
+        # to the cloud, so the board opens instantly and offline
+        self._kbb_dir = kbb_dir
+        self._thread_local = threading.local()
+        self._executor = None
+        self._page_executor = None
+        self._executor_lock = threading.Lock()
+        self._authorized = False
+        self._service = None
+        self._service_lock = threading.RLock()
+
+        # background sync is only started on request
+        self._sync_lock = threading.RLock()
+        self._scheduler = None
+
+        # instrumentation of the running sync and the syncs before it
+        self._stats = None
+        self._sync_history = deque(maxlen=self.SYNC_HISTORY)
+
+        # setup config options
+        self.config = dict()
+        self._load_config(kbb_dir, self.config, 'config')
+        self.backend = backend if backend is not None else self._create_backend()
+
+        # setup the database shared by every model. The connection of the
+        # calling thread stays open until close()
+        database.init(os.path.join(kbb_dir, 'kbbdb.db'))
+        database.set_pragmas(self.config['pragmas'])
+        database.connect()
+
+        tables = database.get_tables()
+        for table_name, model in (('task', Task),
+                                  ('action', Action),
+                                  ('deadaction', DeadAction),
+                                  ('idmapping', IdMapping),
+                                  ('syncstate', SyncState),
+                                  ('taskchange', TaskChange),
+                                  ('archivedtask', ArchivedTask)):
+            if table_name not in tables:
+                database.create_tables([model])
+
+        # bring tables created by older versions of kbb up to date
+        upgrade_schema(database)
+        self._search_indexed = 'task_fts' in database.get_tables()
+
+        self.outbox = Outbox(self.config['MaxAttempts'])
+
+        # live tasks are read from memory, see TaskRepository
+        self._task_repo = TaskRepository()
@@ -0,0 +1,147 @@
+"""Schema upgrades for databases created by older versions of kbb
+
+peewee only creates missing tables, so columns added to existing models
+have to be added to existing tables by hand.
+"""
+
+
+def get_column_names(database, table):
+    """Returns the :type:`set` of column names of :param:`table`"""
+    cursor = database.execute_sql('PRAGMA table_info("{0}")'.format(table))
+    return set(row[1] for row in cursor.fetchall())
+
+
+def add_column(database, table, column, definition):
+    """Adds a column to a table unless it's already there
+
+    Args:
+        database: :class:`peewee.SqliteDatabase` holding the table
+        table: name of the table
+        column: name of the column
+        definition: SQL type and constraints of the column
+    """
+    if column not in get_column_names(database, table):
+        database.execute_sql('ALTER TABLE "{0}" ADD COLUMN "{1}" {2}'.format(table, column, definition))
+
+
+def get_index_names(database, table):
+    """Returns the :type:`set` of index names of :param:`table`"""
+    cursor = database.execute_sql('PRAGMA index_list("{0}")'.format(table))
+    return set(row[1] for row in cursor.fetchall())
+
+
+def add_index(database, table, name, columns, unique=False):
+    """Adds an index to a table unless it's already there
+
+    Args:
+        database: :class:`peewee.SqliteDatabase` holding the table
+        table: name of the table
+        name: name of the index, as peewee would name it
+        columns: :type:`list` of the indexed column names
+        unique: whether the index is a unique constraint
+    """
+    database.execute_sql('CREATE {0}INDEX IF NOT EXISTS "{1}" ON "{2}" ({3})'.format(
+                         'UNIQUE ' if unique else '',
+                         name,
+                         table,
+                         ', '.join('"{0}"'.format(column) for column in columns)))
+
+
+def delete_duplicate_rows(database, table, column, order='id'):
+    """Deletes every row of :param:`table` but one for each value of :param:`column`
+
+    Args:
+        database: :class:`peewee.SqliteDatabase` holding the table
+        table: name of the table
+        column: name of the column whose values must be unique
+        order: SQL ordering of the rows sharing a value, the first one is
+            kept (optional, defaults to keeping the oldest row)
+    """
+    # only values found more than once are looked at, the table has no index yet
+    duplicated = 'SELECT "{1}" FROM "{0}" GROUP BY "{1}" HAVING COUNT(*) > 1'.format(table, column)
+
+    database.execute_sql('DELETE FROM "{0}" WHERE "{1}" IN ({2}) AND id NOT IN ('
+                         'SELECT (SELECT id FROM "{0}" AS kept WHERE kept."{1}" = duplicated."{1}" '
+                         'ORDER BY {3} LIMIT 1) '
+                         'FROM ({2}) AS duplicated)'.format(table, column, duplicated, order))
+
+
+def has_fts5(database):
+    """Whether the SQLite library :param:`database` runs on was built with FTS5"""
+    cursor = database.execute_sql('PRAGMA compile_options')
+    return 'ENABLE_FTS5' in set(row[0] for row in cursor.fetchall())
+
+
+def add_search_index(database, table='task'):
+    """Adds the full text index over task titles and notes, see :mod:`kbb.search`
+
+    The index reads its text from :param:`table` and triggers keep it in
+    step with every write to the table. Tasks already there are indexed
+    when the index is created.
+
+    Args:
+        database: :class:`peewee.SqliteDatabase` holding the table
+        table: name of the indexed table, task or archivedtask. The index
+            is named after it, eg. task_fts
+
+    Returns:
+        Whether the index exists, which needs SQLite built with FTS5
+    """
+    index = '{0}_fts'.format(table)
+    if index in database.get_tables():
+        return True
+    elif not has_fts5(database):
+        return False
+
+    with database.atomic():
+        database.execute_sql("CREATE VIRTUAL TABLE {0} USING fts5("
+                             "title, notes, content='{1}', content_rowid='id', prefix='2 3', "
+                             "tokenize='unicode61 remove_diacritics 2')".format(index, table))
+
+        database.execute_sql("CREATE TRIGGER IF NOT EXISTS {0}_insert AFTER INSERT ON {1} BEGIN "
+                             "INSERT INTO {0} (rowid, title, notes) VALUES (new.id, new.title, new.notes); "
+                             "END".format(index, table))
+        database.execute_sql("CREATE TRIGGER IF NOT EXISTS {0}_delete AFTER DELETE ON {1} BEGIN "
+                             "INSERT INTO {0} ({0}, rowid, title, notes) "
+                             "VALUES ('delete', old.id, old.title, old.notes); "
+                             "END".format(index, table))
+        database.execute_sql("CREATE TRIGGER IF NOT EXISTS {0}_update AFTER UPDATE OF title, notes ON {1} BEGIN "
+                             "INSERT INTO {0} ({0}, rowid, title, notes) "
+                             "VALUES ('delete', old.id, old.title, old.notes); "
+                             "INSERT INTO {0} (rowid, title, notes) VALUES (new.id, new.title, new.notes); "
+                             "END".format(index, table))
+
+        database.execute_sql("INSERT INTO {0} ({0}) VALUES ('rebuild')".format(index))
+
+    return True
+
+
+def upgrade_schema(database):
+    """Brings every kbb table of :param:`database` up to date
+
+    Every step must be idempotent since this runs on every startup.
+    """
+    # retry bookkeeping of the outbox
+    add_column(database, 'action', 'attempts', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(database, 'action', 'next_retry', 'DATETIME')
+    add_column(database, 'action', 'last_error', 'TEXT')
+
+    # boards spanning several GTasks lists
+    add_column(database, 'task', 'tasklist', "VARCHAR(255) NOT NULL DEFAULT '@default'")
+
+    # ageing of completed tasks into the archive
+    add_column(database, 'task', 'completed', 'DATETIME')
+
+    # indexes keeping lookups logarithmic as the board grows
+    if 'task_task_id' not in get_index_names(database, 'task'):
+        # a unique index can't be built over duplicated ids, so keep the oldest
+        # live copy. A deleted copy kept instead would hide the task for good
+        delete_duplicate_rows(database, 'task', 'task_id', order='deleted, id')
+    add_index(database, 'task', 'task_task_id', ['task_id'], unique=True)
+    add_index(database, 'task', 'task_stage_due', ['stage', 'due'])
+    add_index(database, 'action', 'action_task_ident', ['task_ident'])
+    add_index(database, 'deadaction', 'deadaction_task_ident', ['task_ident'])
+
+    # full text search, where SQLite supports it
+    add_search_index(database, 'task')
+    add_search_index(database, 'archivedtask')
@@ -0,0 +1,191 @@
+import random
+import socket
+from datetime import datetime
+from datetime import timedelta
+
+from kbb.action import Action as Action
+from kbb.action import DeadAction as DeadAction
+
+
+class RoundTripError(Exception):
+    """The round trip carrying a request failed before the request got an answer
+
+    Wraps the original error, eg. an OAuth token refresh failure failing a
+    whole batch. The cloud never judged the request itself, so it is
+    worth retrying.
+    """
+
+
+class Outbox(object):
+    """Durable queue of :class:`Action` waiting to be replayed to the cloud
+
+    Actions that fail with a transient error (network trouble, rate limiting,
+    server errors) are retried with exponential backoff. Actions that fail
+    permanently, or too many times in a row, are moved to the
+    :class:`DeadAction` table.
+    """
+
+    RETRY_BASE_SECONDS = 2
+    RETRY_MAX_SECONDS = 60 * 60
+
+    # HTTP statuses worth retrying
+    TRANSIENT_STATUSES = (408, 429, 500, 502, 503, 504)
+    TRANSIENT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+    # HTTP statuses meaning the task is already gone from the cloud
+    GONE_STATUSES = (404, 410)
+
+
+    @staticmethod
+    def _http_status(error):
+        """Returns the HTTP status of a GTasks API error, or None"""
+        resp = getattr(error, 'resp', None)
+        status = getattr(resp, 'status', None)
+        return int(status) if status is not None else None
+
+
+    @staticmethod
+    def is_transient(error):
+        """Whether retrying the request that raised :param:`error` could succeed"""
+        import httplib2
+
+        if isinstance(error, (socket.error, httplib2.HttpLib2Error, RoundTripError)):
+            return True
+
+        status = Outbox._http_status(error)
+        if status in Outbox.TRANSIENT_STATUSES:
+            return True
+
+        # GTasks reports rate limiting as 403s
+        if status == 403:
+            content = getattr(error, 'content', b'')
+            if isinstance(content, bytes):
+                content = content.decode('utf-8', 'replace')
+            return any(reason in content for reason in Outbox.TRANSIENT_REASONS)
+
+        return False
+
+
+    def _backoff(self, attempts):
+        """Returns the :class:`timedelta` to wait before attempt number :param:`attempts` + 1"""
+        delay = min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+        # jitter so that failed actions don't all retry at the same moment
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+    def due_actions(self, now=None):
+        """Returns the actions that may be replayed now, in queue order
+
+        An action waiting for its retry also holds back every later action
+        on the same task.
+
+        Args:
+            now: :class:`datetime` to consider as the current time (optional)
+
+        Returns:
+            :type:`list` of :class:`Action`
+        """
+        now = now or datetime.now()
+        waiting_idents = set()
+        due = list()
+
+        for act in Action.select().order_by(Action.id):
+            if act.task_ident in waiting_idents:
+                continue
+            elif act.next_retry and act.next_retry > now:
+                waiting_idents.add(act.task_ident)
+            else:
+                due.append(act)
+
+        return due
+
+
+    def record_results(self, action_list, results):
+        """Records the outcome of a replay
+
+        Args:
+            action_list: :type:`list` of replayed :class:`Action`
+            results: :type:`dict` mapping the id of every :class:`Action` that
+                was attempted to a (response, exception) tuple. exception is
+                None if the action succeeded. Actions missing from it weren't
+                attempted.
+
+        Returns:
+            :type:`list` of the :class:`Action` that reached the cloud. They
+            have been removed from the queue.
+        """
+        now = datetime.now()
+        acked = list()
+
+        for act in action_list:
+            if act.id not in results:
+                continue
+
+            error = results[act.id][1]
+
+            # deleting a task that is already gone is a success
+            if error is not None and act.task_action == Action.TASKDEL:
+                if Outbox._http_status(error) in Outbox.GONE_STATUSES:
+                    error = None
+
+            if error is None:
+                act.delete_instance()
+                acked.append(act)
+                continue
+
+            act.attempts += 1
+            act.last_error = repr(error)
+
+            if Outbox.is_transient(error) and act.attempts < self.max_attempts:
+                act.next_retry = now + self._backoff(act.attempts)
+                act.save()
+            else:
+                self._bury(act, now)
+
+        return acked
+
+
+    def _bury(self, act, now):
+        """Moves an action to the dead letter table"""
+        DeadAction.create(task_ident=act.task_ident,
+                          task_action=act.task_action,
+                          start_stage=act.start_stage,
+                          end_stage=act.end_stage,
+                          attempts=act.attempts,
+                          last_error=act.last_error,
+                          failed_at=now)
+        act.delete_instance()
+
+
+    def dead_actions(self):
+        """Returns the :type:`list` of :class:`DeadAction`, oldest first"""
+        return list(DeadAction.select().order_by(DeadAction.id))
+
+
+    def requeue_dead_actions(self):
+        """Moves every dead action back into the queue for another try
+
+        Returns:
+            Number of requeued actions
+        """
+        dead_list = self.dead_actions()
+
+        for dead in dead_list:
+            Action.create(task_ident=dead.task_ident,
+                          task_action=dead.task_action,
+                          start_stage=dead.start_stage,
+                          end_stage=dead.end_stage)
+            dead.delete_instance()
+
+        return len(dead_list)
+
+
+    def __init__(self, max_attempts):
+        """Init
+
+        Args:
+            max_attempts: number of failed attempts after which an action
+                is given up on
+        """
+        self.max_attempts = max_attempts
@@ -0,0 +1,72 @@
+class ReconcilePlan(object):
+    """Struct class for the local changes needed to catch up with the cloud
+
+    inserts: :type:`list` of cloud task dictionaries missing locally
+    updates: :type:`dict` mapping task_id -> new status
+    deletes: :type:`set` of task_ids to delete locally
+    """
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+    def __init__(self):
+        self.inserts = list()
+        self.updates = dict()
+        self.deletes = set()
+
+
+def reconcile(local_tasks, cloud_tasks, pending_idents, full_resync, listed_ids=None):
+    """Computes the changes that bring the local database in line with the cloud
+
+    Every input is indexed by task id, so the cost is linear in the number
+    of local and cloud tasks.
+
+    Args:
+        local_tasks: :type:`dict` mapping task_id -> status of every local
+            task, including soft deleted ones
+        cloud_tasks: iterable of task dictionaries pulled from the cloud.
+            Tombstones (deleted tasks) are task dictionaries with 'deleted' set.
+            A task moved between lists leaves a tombstone in its old list, so
+            a live copy of a task wins over its tombstone.
+        pending_idents: :type:`set` of task_ids that still have queued or dead actions.
+            Local changes to these tasks haven't reached the cloud yet, so
+            they win over whatever the cloud says.
+        full_resync: whether :param:`cloud_tasks` holds every task in the cloud,
+            in which case local tasks absent from the cloud are deleted
+        listed_ids: task_ids of the local tasks :param:`cloud_tasks` covers
+            when :param:`full_resync` is set (optional, defaults to every
+            local task). Only these are deleted when absent from the cloud.
+
+    Returns:
+        :class:`ReconcilePlan`
+    """
+    plan = ReconcilePlan()
+    cloud_by_id = dict()
+    for t in cloud_tasks:
+        if not t.get('deleted') or t['id'] not in cloud_by_id:
+            cloud_by_id[t['id']] = t
+
+    for task_id, t in cloud_by_id.items():
+        # the task was deleted in the cloud, so delete our local copy
+        if t.get('deleted'):
+            if task_id in local_tasks:
+                plan.deletes.add(task_id)
+
+        # add into local database any tasks not already present
+        elif task_id not in local_tasks:
+            plan.inserts.append(t)
+
+        # if the status differs and we have no queued change of our own, the
+        # task must have been changed on the cloud side
+        elif task_id not in pending_idents and t['status'] != local_tasks[task_id]:
+            plan.updates[task_id] = t['status']
+
+    # absence only means deletion if we fetched the whole cloud
+    if full_resync:
+        if listed_ids is None:
+            listed_ids = local_tasks.keys()
+        absent = set(listed_ids) - cloud_by_id.keys()
+        plan.deletes.update(absent - pending_idents)
+
+    return plan
@@ -0,0 +1,127 @@
+import threading
+import time
+
+
+class SyncScheduler(object):
+    """Runs a sync function on a background thread
+
+    A sync runs every :attr:`interval` seconds, and :attr:`debounce` seconds
+    after the latest call to :func:`request_sync`, so a burst of requests
+    only costs one sync.
+    """
+
+    def _next_deadline(self):
+        """Returns the monotonic time the next sync is due at"""
+        deadline = self._next_periodic
+        if self._requested_at is not None:
+            deadline = min(deadline, self._requested_at + self.debounce)
+
+        return deadline
+
+
+    def _run(self):
+        """Body of the background thread"""
+        while True:
+            with self._cond:
+                while not self._stopped and time.monotonic() < self._next_deadline():
+                    self._cond.wait(self._next_deadline() - time.monotonic())
+
+                if self._stopped:
+                    return
+
+                generation = self._requested
+                self._requested_at = None
+
+            try:
+                self._sync_fn()
+                error = None
+            except Exception as e:
+                # keep the thread alive, the next sync will try again
+                error = e
+
+            with self._cond:
+                self.last_error = error
+                self._completed = generation
+                self._next_periodic = time.monotonic() + self.interval
+                self._cond.notify_all()
+
+
+    def start(self):
+        """Starts the background thread"""
+        self._thread = threading.Thread(target=self._run, name='kbb-sync', daemon=True)
+        self._thread.start()
+
+
+    def stop(self, timeout=None):
+        """Stops the background thread, waiting for any running sync to finish
+
+        Args:
+            timeout: maximum number of seconds to wait (optional)
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout)
+
+
+    def request_sync(self):
+        """Asks for a sync once no more requests arrive for :attr:`debounce` seconds"""
+        with self._cond:
+            self._requested += 1
+            self._requested_at = time.monotonic()
+            self._cond.notify_all()
+
+
+    def wait(self, timeout=None):
+        """Waits until every sync requested so far has run
+
+        Args:
+            timeout: maximum number of seconds to wait (optional)
+
+        Returns:
+            True if no requested sync is pending anymore
+        """
+        with self._cond:
+            target = self._requested
+            self._cond.wait_for(lambda: self._completed >= target or self._stopped, timeout)
+            return self._completed >= target
+
+
+    def flush(self, timeout=None):
+        """Runs a sync right away and waits for it to finish
+
+        Args:
+            timeout: maximum number of seconds to wait (optional)
+
+        Returns:
+            True if the sync finished
+        """
+        with self._cond:
+            self._requested += 1
+            self._requested_at = time.monotonic() - self.debounce
+            self._cond.notify_all()
+
+        return self.wait(timeout)
+
+
+    def __init__(self, sync_fn, interval, debounce):
+        """Init
+
+        Args:
+            sync_fn: function run to sync
+            interval: seconds between two periodic syncs
+            debounce: seconds to wait after a sync request before syncing
+        """
+        self.interval = interval
+        self.debounce = debounce
+        self.last_error = None
+        self._sync_fn = sync_fn
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._requested = 0
+        self._completed = 0
+        self._requested_at = None
+        self._next_periodic = time.monotonic() + interval
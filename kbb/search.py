@@ -0,0 +1,67 @@
+"""Full text search over the titles and notes of tasks
+
+The task_fts index (see :func:`kbb.migrations.add_search_index`) answers
+searches with SQLite FTS5, ranked by relevance. Without FTS5 every task is
+scanned instead: words then match anywhere in the text, accents count and
+tasks come in the order they were added.
+
+The archive (see :mod:`kbb.archive`) has an index of its own, archivedtask_fts,
+and is searched separately.
+"""
+import re
+
+from kbb.task import Task as Task
+from kbb.archive import ArchivedTask as ArchivedTask
+
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# bm25 weights of the indexed columns: a match in the title counts the most
+TITLE_WEIGHT = 10.0
+NOTES_WEIGHT = 1.0
+
+
+def get_words(text):
+    """Returns the :type:`list` of words of :param:`text`, lowercased"""
+    return [word.lower() for word in WORD_PATTERN.findall(text)]
+
+
+def match_query(words):
+    """Builds the FTS5 query matching tasks having every one of :param:`words`
+
+    Words are matched as prefixes, so a task is found while its words are
+    still being typed. Quoting them keeps FTS5 operators from being parsed.
+    """
+    return ' '.join('"{0}"*'.format(word) for word in words)
+
+
+def search_index(words, limit, archived=False):
+    """Searches with the task_fts index
+
+    Args:
+        words: :type:`list` of words every match must have
+        limit: max number of tasks returned
+        archived: whether to search the archive, with the archivedtask_fts
+            index, instead
+
+    Returns:
+        :type:`list` of live :class:`Task`, or :class:`ArchivedTask` if
+        :param:`archived` is set, best matches first
+    """
+    model, table = (ArchivedTask, 'archivedtask') if archived else (Task, 'task')
+
+    return list(model.raw('SELECT {0}.* FROM {0}_fts JOIN {0} ON {0}.id = {0}_fts.rowid '
+                          'WHERE {0}_fts MATCH ? AND {0}.deleted = 0 '
+                          'ORDER BY bm25({0}_fts, ?, ?) LIMIT ?'.format(table),
+                          match_query(words), TITLE_WEIGHT, NOTES_WEIGHT, limit))
+
+
+def search_scan(words, limit, archived=False):
+    """Searches by scanning the task table, see :func:`search_index`"""
+    model = ArchivedTask if archived else Task
+    query = model.select().where(model.deleted == False)
+
+    for word in words:
+        query = query.where(model.title.contains(word) | model.notes.contains(word))
+
+    return list(query.order_by(model.id).limit(limit))
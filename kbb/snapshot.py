@@ -0,0 +1,29 @@
+from collections import namedtuple
+
+from kbb.task import Task as Task
+
+
+class TaskSnapshot(namedtuple('TaskSnapshot', ('id', 'task_id', 'title', 'stage', 'due', 'status'))):
+    """Compact read-only copy of a :class:`Task`, for rendering
+
+    Only the small fields a board is drawn from are kept, in a tuple rather
+    than a model instance. notes, which can be arbitrarily large, is read
+    from the database when asked for.
+
+    Snapshots aren't updated: :func:`Kbb.get_task_snapshots` hands out new
+    ones once the tasks change.
+    """
+
+    __slots__ = ()
+
+
+    @staticmethod
+    def from_task(task):
+        """Returns the :class:`TaskSnapshot` of a :class:`Task`"""
+        return TaskSnapshot(task.id, task.task_id, task.title, task.stage, task.due, task.status)
+
+
+    @property
+    def notes(self):
+        """Notes of the task, read from the database"""
+        return Task.select(Task.notes).where(Task.task_id == self.task_id).scalar()
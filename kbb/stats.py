@@ -0,0 +1,139 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class SyncStats(object):
+    """Struct class for the measurements of a single sync
+
+    started_at: :class:`datetime` the sync started at
+    phases: :type:`dict` mapping phase name -> wall time in seconds. The db
+        phase overlaps the push and pull phases.
+    api_calls: :type:`dict` mapping API method (eg. 'tasks.insert') -> number
+        of calls, whether sent alone or inside a batch
+    round_trips: number of HTTP round trips, a batch being a single one
+    pages: number of task listing pages fetched
+    bytes_received: size of the JSON payloads received
+    actions_replayed: number of queued actions sent to the cloud
+    actions_failed: number of those that failed
+    calls_coalesced: number of API calls saved by compacting the action
+        queue before the replay
+    rows_changed: number of local task rows written by the pull
+    error: description of the error that ended the sync, if any
+
+    Counters may be bumped from several sync workers at once, so they
+    must be updated through the methods below.
+    """
+
+    PHASE_PUSH = 'push'
+    PHASE_PULL = 'pull'
+    PHASE_DB = 'db'
+
+
+    @contextmanager
+    def timed(self, phase):
+        """Adds the wall time of the wrapped block to :param:`phase`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+
+    def count_call(self, method, response, batched=False):
+        """Records one API call
+
+        Args:
+            method: API method of the call, eg. 'tasks.insert'
+            response: the call's response, None if it failed
+            batched: whether the call was sent inside a batch, whose round
+                trip is counted by :func:`count_round_trip`
+        """
+        size = len(json.dumps(response)) if response else 0
+
+        with self._lock:
+            self.api_calls[method] = self.api_calls.get(method, 0) + 1
+            self.bytes_received += size
+            if not batched:
+                self.round_trips += 1
+
+
+    def count_round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+
+
+    def count_page(self):
+        with self._lock:
+            self.pages += 1
+
+
+    def total_calls(self):
+        """Returns the number of API calls made"""
+        return sum(self.api_calls.values())
+
+
+    def duration(self):
+        """Returns the wall time of the whole sync in seconds"""
+        return self.phases.get(SyncStats.PHASE_PUSH, 0.0) + self.phases.get(SyncStats.PHASE_PULL, 0.0)
+
+
+    def summary(self):
+        """Returns a one line, human readable summary"""
+        line = '{0:.2f}s (push {1:.2f}s, pull {2:.2f}s, db {3:.2f}s), {4} calls, {5} trips, {6} pages, {7} KB, {8} actions, {9} coalesced, {10} rows'.format(
+               self.duration(),
+               self.phases.get(SyncStats.PHASE_PUSH, 0.0),
+               self.phases.get(SyncStats.PHASE_PULL, 0.0),
+               self.phases.get(SyncStats.PHASE_DB, 0.0),
+               self.total_calls(),
+               self.round_trips,
+               self.pages,
+               self.bytes_received // 1024,
+               self.actions_replayed,
+               self.calls_coalesced,
+               self.rows_changed)
+
+        if self.error:
+            line += ', failed: ' + self.error
+
+        return line
+
+
+    def to_dict(self):
+        """Returns the measurements as a JSON serializable :type:`dict`"""
+        return {'started_at': self.started_at.isoformat(),
+                'phases': dict(self.phases),
+                'api_calls': dict(self.api_calls),
+                'round_trips': self.round_trips,
+                'pages': self.pages,
+                'bytes_received': self.bytes_received,
+                'actions_replayed': self.actions_replayed,
+                'actions_failed': self.actions_failed,
+                'calls_coalesced': self.calls_coalesced,
+                'rows_changed': self.rows_changed,
+                'error': self.error}
+
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.phases = dict()
+        self.api_calls = dict()
+        self.round_trips = 0
+        self.pages = 0
+        self.bytes_received = 0
+        self.actions_replayed = 0
+        self.actions_failed = 0
+        self.calls_coalesced = 0
+        self.rows_changed = 0
+        self.error = None
+        self._lock = threading.Lock()
+
+
+def append_metrics(path, stats):
+    """Appends :param:`stats` as one JSON line to the metrics file at :param:`path`"""
+    with open(path, 'a') as f:
+        f.write(json.dumps(stats.to_dict()) + '\n')
@@ -0,0 +1,66 @@
+import peewee
+
+from kbb.database import database as database
+
+class SyncState(peewee.Model):
+    """Class representation of a piece of persistent sync bookkeeping
+
+    Each row is a simple key/value pair, for example the watermark of the
+    last cloud pull.
+    """
+
+    LAST_PULL = "lastpull"  # latest cloud 'updated' timestamp we have pulled
+    LAST_GC = "lastgc"  # local time of the last garbage collection
+    TASKS_VERSION = "tasksversion"  # bumped by every write to the task table
+
+
+    key = peewee.CharField(unique=True)
+    value = peewee.TextField()
+
+
+    @staticmethod
+    def get_value(key, default=None):
+        """Returns the value stored under :param:`key`, or :param:`default`"""
+        result = SyncState.select().where(SyncState.key == key)
+
+        if not result:
+            return default
+
+        return result[0].value
+
+
+    @staticmethod
+    def set_value(key, value):
+        """Stores :param:`value` under :param:`key`"""
+        updated = SyncState.update(value=value).where(SyncState.key == key).execute()
+
+        if not updated:
+            SyncState.create(key=key, value=value)
+
+
+    @staticmethod
+    def increment_value(key):
+        """Adds one to the counter stored under :param:`key`, which starts at 0
+
+        Returns:
+            The new value of the counter
+        """
+        # a single statement, so concurrent writers can't lose an increment
+        updated = (SyncState.update(value=peewee.SQL('CAST(value AS INTEGER) + 1'))
+                            .where(SyncState.key == key)
+                            .execute())
+
+        if not updated:
+            SyncState.create(key=key, value='1')
+
+        return int(SyncState.get_value(key))
+
+
+    @staticmethod
+    def clear_value(key):
+        """Removes the value stored under :param:`key`"""
+        SyncState.delete().where(SyncState.key == key).execute()
+
+
+    class Meta:
+        database = database
@@ -1,8 +1,6 @@
 import peewee
 
-# This un-initialized database should be initialized before
-# any instance Task is created
-database = peewee.SqliteDatabase(None) 
+from kbb.database import database as database
 
 class Task(peewee.Model):
     """Class representation of a single task
@@ -14,12 +12,18 @@ class Task(peewee.Model):
 
         What actually happens in kbb is that when a new task is created locally, the
         local task gets put into the local database, then the local task is synced up
-        to the cloud. The cloud then generates a new id. When we sync the cloud back to 
-        the local database, the local task gets deleted and a new local task is created
-        with the data from the cloud.
+        to the cloud. The cloud then generates a new id. The local task and any queued
+        action on it are then rewritten in place to use the cloud's id, and the
+        local -> cloud id mapping is recorded in :class:`kbb.idmap.IdMapping`.
 
-        So essentially, any task_id reference before a cloud sync does not point to 
-        anything.
+        So a task_id reference taken before a cloud sync keeps working through
+        :class:`Kbb`, but it won't match the task_id of the task anymore.
+
+        tasklist is the GTasks list the task lives in (or will be uploaded to).
+        It only changes once a move to another list has reached the cloud.
+
+        completed is when the task was last marked DONE, None if it isn't
+        done. Tasks completed by older versions of kbb don't have it.
     """
 
     UUID_LENGTH = 44
@@ -33,8 +37,10 @@ class Task(peewee.Model):
     due = peewee.DateTimeField()
     notes = peewee.TextField()
     status = peewee.CharField()
-    task_id = peewee.TextField()
+    task_id = peewee.TextField(unique=True)
     deleted = peewee.BooleanField()
+    tasklist = peewee.CharField(default='@default')
+    completed = peewee.DateTimeField(null=True)
 
 
     @staticmethod
@@ -56,3 +62,6 @@ class Task(peewee.Model):
 
     class Meta:
         database = database # This model uses the "people.db" database.
+        indexes = (
+            (('stage', 'due'), False),  # tasks of a stage in a due date range
+        )
@@ -0,0 +1,89 @@
+"""Reading and writing tasks as JSON Lines or CSV
+
+Records are plain :type:`dict` of strings keyed by :attr:`FIELDS`, one per
+task. Both directions stream, so files of any size are handled one record
+at a time.
+"""
+import csv
+import json
+import os
+
+
+FORMAT_JSONL = 'jsonl'
+FORMAT_CSV = 'csv'
+FORMATS = (FORMAT_JSONL, FORMAT_CSV)
+
+FIELDS = ('title', 'stage', 'due', 'notes', 'status', 'task_id')
+
+DUE_FORMATS = ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+
+def guess_format(path):
+    """Returns the format of :param:`path` from its extension
+
+    Raises:
+        ValueError: if the extension isn't known
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+
+    if extension in ('jsonl', 'json', 'ndjson'):
+        return FORMAT_JSONL
+    elif extension == 'csv':
+        return FORMAT_CSV
+    else:
+        raise ValueError('unknown task file format {0}'.format(extension))
+
+
+def read_records(f, fmt):
+    """Reads task records from an open file
+
+    Args:
+        f: file opened for reading text (with newline='' for CSV)
+        fmt: FORMAT_JSONL or FORMAT_CSV
+
+    Yields:
+        (line number, record) tuples. Blank lines are skipped.
+    """
+    if fmt == FORMAT_JSONL:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+
+    elif fmt == FORMAT_CSV:
+        # line 1 is the header
+        for line_number, record in enumerate(csv.DictReader(f), start=2):
+            yield line_number, record
+
+    else:
+        raise ValueError('unknown task file format {0}'.format(fmt))
+
+
+def write_records(f, records, fmt):
+    """Writes task records to an open file
+
+    Args:
+        f: file opened for writing text (with newline='' for CSV)
+        records: iterable of task records
+        fmt: FORMAT_JSONL or FORMAT_CSV
+
+    Returns:
+        Number of records written
+    """
+    count = 0
+
+    if fmt == FORMAT_JSONL:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+            count += 1
+
+    elif fmt == FORMAT_CSV:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+
+    else:
+        raise ValueError('unknown task file format {0}'.format(fmt))
+
+    return count
@@ -0,0 +1,214 @@
+import threading
+
+from kbb.database import database as database
+from kbb.task import Task as Task
+from kbb.syncstate import SyncState as SyncState
+from kbb.snapshot import TaskSnapshot as TaskSnapshot
+
+
+class TaskRepository(object):
+    """In-memory index of the live (not deleted) tasks of a board
+
+    Tasks are loaded from the database on the first read, then kept up to
+    date by whoever writes to the task table: the write is committed first,
+    then written through with :func:`put`, :func:`discard` or :func:`refresh`.
+
+    Every transaction writing to the task table also calls
+    :func:`bump_version`. Once SQLite reports a commit from another
+    connection (PRAGMA data_version), reads compare the stored version with
+    the one we know of. Changes committed by another process are noticed
+    that way and the whole index is reloaded. :func:`invalidate` forces
+    that reload.
+
+    The GUI draws from :func:`snapshots`, which are built once per change
+    of a stage rather than on every frame.
+
+    The index is shared by the GUI and the background sync, so every
+    method is thread safe.
+    """
+
+    def _put(self, task):
+        self._discard(task.task_id)
+
+        if task.deleted:
+            return
+
+        self._tasks[task.task_id] = task
+        self._task_stages[task.task_id] = task.stage
+        self._snapshots.pop(task.stage, None)
+        stage_tasks = self._stages.setdefault(task.stage, dict())
+
+        # tasks are kept in the order they were added, ie. by row id
+        if stage_tasks and task.id < next(reversed(stage_tasks.values())).id:
+            self._unsorted.add(task.stage)
+        stage_tasks[task.task_id] = task
+
+
+    def _discard(self, task_id):
+        # the cached instance may have been changed already, so don't trust its stage
+        if self._tasks.pop(task_id, None) is not None:
+            stage = self._task_stages.pop(task_id)
+            del self._stages[stage][task_id]
+            self._snapshots.pop(stage, None)
+
+
+    def _load(self):
+        """Reads every live task from the database"""
+        self._stale = False
+        self._tasks = dict()
+        self._task_stages = dict()
+        self._stages = dict()
+        self._unsorted = set()
+        self._snapshots = dict()
+        self._version = int(SyncState.get_value(SyncState.TASKS_VERSION, 0))
+
+        for task in Task.select().where(Task.deleted == False).order_by(Task.id):
+            self._put(task)
+
+
+    def _check_version(self):
+        """Reloads the index if another process wrote to the task table"""
+        if self._stale:
+            self._load()
+
+        # only a commit from another connection can change the version
+        data_version = database.execute_sql('PRAGMA data_version').fetchone()[0]
+        if data_version == getattr(self._seen, 'data_version', None):
+            return
+        self._seen.data_version = data_version
+
+        if int(SyncState.get_value(SyncState.TASKS_VERSION, 0)) != self._version:
+            self._load()
+
+
+    def _stage_tasks(self, stage):
+        """Returns the tasks of :param:`stage` in the order they were added"""
+        stage_tasks = self._stages.get(stage, dict())
+
+        if stage in self._unsorted:
+            stage_tasks = dict((task.task_id, task) for task in
+                               sorted(stage_tasks.values(), key=lambda task: task.id))
+            self._stages[stage] = stage_tasks
+            self._unsorted.discard(stage)
+
+        return list(stage_tasks.values())
+
+
+    def bump_version(self):
+        """Records a write to the task table
+
+        Note: must be called inside the transaction doing the write.
+
+        Returns:
+            The new version of the task table
+        """
+        with self._lock:
+            self._version = SyncState.increment_value(SyncState.TASKS_VERSION)
+            return self._version
+
+
+    def get(self, task_id):
+        """Returns the live :class:`Task` with :param:`task_id`, or None"""
+        with self._lock:
+            self._check_version()
+            return self._tasks.get(task_id)
+
+
+    def task_ids(self):
+        """Returns the :type:`set` of the ids of every live task"""
+        with self._lock:
+            self._check_version()
+            return set(self._tasks)
+
+
+    def tasks(self, stage=None):
+        """Returns the live tasks, in the order they were added
+
+        Args:
+            stage: only return the tasks of this stage (optional)
+
+        Returns:
+            :type:`list` of :class:`Task`
+        """
+        with self._lock:
+            self._check_version()
+
+            if stage is not None:
+                return self._stage_tasks(stage)
+
+            task_list = list()
+            for stage_name in list(self._stages):
+                task_list.extend(self._stage_tasks(stage_name))
+
+            return sorted(task_list, key=lambda task: task.id)
+
+
+    def snapshots(self, stage):
+        """Returns :class:`TaskSnapshot` copies of the live tasks of :param:`stage`
+
+        The snapshots are kept until a task of the stage changes, so reading
+        an unchanged stage again costs nothing.
+
+        Returns:
+            :type:`tuple` of :class:`TaskSnapshot`, in the order the tasks
+            were added
+        """
+        with self._lock:
+            self._check_version()
+
+            if stage not in self._snapshots:
+                self._snapshots[stage] = tuple(TaskSnapshot.from_task(task)
+                                               for task in self._stage_tasks(stage))
+
+            return self._snapshots[stage]
+
+
+    def put(self, task):
+        """Writes through a :class:`Task` that was just saved"""
+        with self._lock:
+            if not self._stale:
+                self._put(task)
+
+
+    def discard(self, task_id):
+        """Writes through the deletion of the task with :param:`task_id`"""
+        with self._lock:
+            if not self._stale:
+                self._discard(task_id)
+
+
+    def refresh(self, task_ids, chunk_size=100):
+        """Re-reads the given tasks from the database
+
+        Used after bulk writes, where rewriting the rows in memory would
+        duplicate the write. Ids no longer found are dropped.
+
+        Args:
+            task_ids: iterable of task ids
+            chunk_size: max number of tasks read by one query
+        """
+        with self._lock:
+            # the next read loads everything anyway
+            if self._stale:
+                return
+
+            task_ids = list(task_ids)
+            for task_id in task_ids:
+                self._discard(task_id)
+
+            for start in range(0, len(task_ids), chunk_size):
+                chunk = task_ids[start:start + chunk_size]
+                for task in Task.select().where(Task.task_id.in_(chunk) & (Task.deleted == False)):
+                    self._put(task)
+
+
+    def invalidate(self):
+        """Makes the next read reload every task from the database"""
+        with self._lock:
+            self._stale = True
+
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._seen = threading.local()  # data_version of each thread's connection
+        self._stale = True
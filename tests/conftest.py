@@ -0,0 +1,20 @@
+import pytest
+
+
+TEST_CONFIG = """[General]
+SyncRate = 60
+Backend = fake
+
+[Stages]
+todo = true
+doing = true
+done = true
+"""
+
+
+@pytest.fixture(autouse=True)
+def kbb_dir(tmpdir, monkeypatch):
+    """Points every :class:`kbb.Kbb` at a fresh board synced with the fake backend"""
+    tmpdir.join('config').write(TEST_CONFIG)
+    monkeypatch.setenv('KBB_DIR', str(tmpdir))
+    return str(tmpdir)
@@ -0,0 +1,67 @@
+from kbb.action import Action as Action
+
+
+def make_action(action_id, task_ident, task_action, start_stage, end_stage):
+    return Action(id=action_id,
+                  task_ident=task_ident,
+                  task_action=task_action,
+                  start_stage=start_stage,
+                  end_stage=end_stage)
+
+
+def test_coalesce_add_then_delete():
+    action_list = [make_action(1, 'a', Action.TASKADD, 'None', 'todo'),
+                   make_action(2, 'a', Action.TASKMOV, 'todo', 'doing'),
+                   make_action(3, 'a', Action.TASKMOV, 'doing', 'done'),
+                   make_action(4, 'a', Action.TASKDEL, 'done', 'None')]
+    kept, removed = Action.coalesce(action_list)
+
+    assert kept == []
+    assert len(removed) == 4
+
+
+def test_coalesce_add_then_moves():
+    action_list = [make_action(1, 'a', Action.TASKADD, 'None', 'todo'),
+                   make_action(2, 'a', Action.TASKMOV, 'todo', 'done')]
+    kept, removed = Action.coalesce(action_list)
+
+    assert [act.id for act in kept] == [1]
+    assert kept[0].end_stage == 'done'
+
+
+def test_coalesce_consecutive_moves():
+    stages = ['todo', 'doing', 'done', 'doing', 'todo', 'done']
+    action_list = [make_action(idx + 1, 'a', Action.TASKMOV, start, end)
+                   for idx, (start, end) in enumerate(zip(stages, stages[1:]))]
+    kept, removed = Action.coalesce(action_list)
+
+    assert len(removed) == 4
+    assert [act.id for act in kept] == [5]
+    assert kept[0].start_stage == 'todo'
+    assert kept[0].end_stage == 'done'
+
+
+def test_coalesce_moves_back_to_start():
+    action_list = [make_action(1, 'a', Action.TASKMOV, 'todo', 'done'),
+                   make_action(2, 'a', Action.TASKMOV, 'done', 'todo')]
+    kept, removed = Action.coalesce(action_list)
+
+    assert kept == []
+
+
+def test_coalesce_moves_then_delete():
+    action_list = [make_action(1, 'a', Action.TASKMOV, 'todo', 'done'),
+                   make_action(2, 'a', Action.TASKDEL, 'done', 'None')]
+    kept, removed = Action.coalesce(action_list)
+
+    assert [act.id for act in kept] == [2]
+
+
+def test_coalesce_keeps_queue_order():
+    action_list = [make_action(1, 'a', Action.TASKADD, 'None', 'todo'),
+                   make_action(2, 'b', Action.TASKMOV, 'todo', 'done'),
+                   make_action(3, 'a', Action.TASKMOV, 'todo', 'done'),
+                   make_action(4, 'c', Action.TASKDEL, 'todo', 'None')]
+    kept, removed = Action.coalesce(action_list)
+
+    assert [act.id for act in kept] == [1, 2, 4]
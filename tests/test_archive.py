@@ -0,0 +1,75 @@
+from datetime import datetime
+from datetime import timedelta
+
+import kbb
+from kbb.task import Task as Task
+from kbb.archive import ArchivedTask as ArchivedTask
+from kbb.changelog import TaskChange as TaskChange
+
+
+def complete_task(k, title, days_ago, cloud_sync=False):
+    """Adds a task to the board, completed :param:`days_ago` days ago"""
+    k.new_task(title, stage=k.get_stage_names()[-1], status=Task.DONE, cloud_sync=cloud_sync)
+    task = k.get_task_list()[-1]
+    Task.update(completed=datetime.now() - timedelta(days=days_ago)).where(Task.task_id == task.task_id).execute()
+    k.invalidate_tasks()
+    return task.task_id
+
+
+def test_archive_old_completed_tasks():
+    k = kbb.Kbb()
+    old_id = complete_task(k, 'old done task', 40)
+    complete_task(k, 'recent done task', 1)
+    k.new_task('old todo task', due=datetime.now() - timedelta(days=40), cloud_sync=False)
+    version, _ = k.changes_since(0)
+
+    assert k.archive_completed_tasks() == 1
+    assert [t.title for t in k.get_task_list()] == ['recent done task', 'old todo task']
+    assert k.changes_since(version)[1] == {old_id: TaskChange.DELETE}
+
+    assert k.search('old done') == []
+    archived = k.search('old done', archived=True)
+    assert [(t.title, t.task_id) for t in archived] == [('old done task', old_id)]
+    assert archived[0].archived_at
+
+
+def test_archive_keeps_unpushed_tasks():
+    k = kbb.Kbb()
+    k.service.fail_next(10, status=503)
+    complete_task(k, 'unpushed task', 40, cloud_sync=True)
+
+    assert k.archive_completed_tasks() == 0
+    assert ArchivedTask.select().count() == 0
+
+
+def test_restore_task():
+    k = kbb.Kbb()
+    task_id = complete_task(k, 'restored task', 40)
+    k.archive_completed_tasks()
+
+    task = k.restore_task(task_id)
+
+    assert task.title == 'restored task'
+    assert [t.task_id for t in k.get_task_list()] == [task_id]
+    assert ArchivedTask.select().count() == 0
+    assert k.archive_completed_tasks() == 0  # restored tasks count as just completed
+
+
+def test_sync_leaves_archive_alone():
+    k = kbb.Kbb()
+    kept_id = complete_task(k, 'kept task', 40, cloud_sync=True)
+    reopened_id = complete_task(k, 'reopened task', 40, cloud_sync=True)
+    deleted_id = complete_task(k, 'deleted task', 40, cloud_sync=True)
+    assert k.archive_completed_tasks() == 3
+
+    # a full pull doesn't bring archived tasks back
+    k.sync(full_resync=True)
+    assert k.get_task_list() == []
+
+    k.service.tasks().patch(tasklist='@default', task=reopened_id,
+                            body={'status': Task.NOTDONE, 'completed': None}).execute()
+    k.service.tasks().delete(tasklist='@default', task=deleted_id).execute()
+    k.sync()
+
+    assert [(t.task_id, t.status) for t in k.get_task_list()] == [(reopened_id, Task.NOTDONE)]
+    assert [t.task_id for t in ArchivedTask.select()] == [kept_id]
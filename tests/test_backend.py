@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import time
+
+import httplib2
+
+from kbb.backend import GTasksBackend as GTasksBackend
+
+
+def write_cached_document(kbb_dir, document, age):
+    cache_path = os.path.join(kbb_dir, 'cache/tasks-v1-discovery.json')
+    os.makedirs(os.path.dirname(cache_path))
+    with open(cache_path, 'w') as f:
+        f.write(document)
+
+    mtime = time.time() - age
+    os.utime(cache_path, (mtime, mtime))
+
+
+def record_fetches(monkeypatch, fail):
+    """Returns the :type:`list` the URI of every discovery document fetch gets appended to"""
+    fetches = list()
+
+    def request(self, uri, *args, **kwargs):
+        fetches.append(uri)
+        if fail:
+            raise httplib2.ServerNotFoundError('offline')
+        return httplib2.Response({'status': 200}), b'{"fresh": true}'
+
+    monkeypatch.setattr(httplib2.Http, 'request', request)
+    return fetches
+
+
+def test_startup_skips_cloud_libraries(kbb_dir):
+    script = ('import sys, kbb\n'
+              'kbb.Kbb().get_task_list()\n'
+              'print(sorted(m for m in ("apiclient", "oauth2client", "httplib2") if m in sys.modules))\n')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=root,
+                                     env=dict(os.environ, KBB_DIR=kbb_dir))
+
+    assert output.decode().strip() == '[]'
+
+
+def test_fresh_discovery_document_not_fetched(kbb_dir, monkeypatch):
+    write_cached_document(kbb_dir, '{"cached": true}', 60)
+    fetches = record_fetches(monkeypatch, fail=False)
+
+    assert GTasksBackend(kbb_dir)._get_discovery_document() == '{"cached": true}'
+    assert fetches == []
+
+
+def test_stale_discovery_document_refreshed(kbb_dir, monkeypatch):
+    write_cached_document(kbb_dir, '{"cached": true}', GTasksBackend.DISCOVERY_MAX_AGE + 60)
+    fetches = record_fetches(monkeypatch, fail=False)
+    backend = GTasksBackend(kbb_dir)
+
+    assert backend._get_discovery_document() == '{"fresh": true}'
+    assert fetches == [GTasksBackend.DISCOVERY_URI]
+
+    # the refreshed copy is cached
+    assert backend._get_discovery_document() == '{"fresh": true}'
+    assert len(fetches) == 1
+
+
+def test_stale_discovery_document_used_offline(kbb_dir, monkeypatch):
+    write_cached_document(kbb_dir, '{"cached": true}', GTasksBackend.DISCOVERY_MAX_AGE + 60)
+    fetches = record_fetches(monkeypatch, fail=True)
+
+    assert GTasksBackend(kbb_dir)._get_discovery_document() == '{"cached": true}'
+    assert fetches == [GTasksBackend.DISCOVERY_URI]
@@ -0,0 +1,80 @@
+import os
+import json
+
+import kbb
+from kbb.task import Task as Task
+from kbb.changelog import TaskChange as TaskChange
+
+
+def test_local_changes():
+    k = kbb.Kbb()
+    start, changes = k.changes_since(0)
+    assert changes == {}
+
+    kept = k.new_task('kept task', cloud_sync=False)
+    gone = k.new_task('gone task', cloud_sync=False)
+    version, changes = k.changes_since(start)
+
+    assert version == start + 2
+    assert list(changes.items()) == [(kept.task_id, TaskChange.INSERT),
+                                     (gone.task_id, TaskChange.INSERT)]
+
+    k.move_task(kept.task_id, k.get_stage_names()[1], cloud_sync=False)
+    k.delete_task(gone.task_id, cloud_sync=False)
+
+    # folded since the start, only the delta since the last look
+    assert list(k.changes_since(start)[1].items()) == [(kept.task_id, TaskChange.INSERT),
+                                                       (gone.task_id, TaskChange.DELETE)]
+    assert list(k.changes_since(version)[1].items()) == [(kept.task_id, TaskChange.UPDATE),
+                                                         (gone.task_id, TaskChange.DELETE)]
+
+
+def test_sync_changes():
+    k = kbb.Kbb()
+    version, _ = k.changes_since(0)
+
+    local_task = k.new_task('uploaded task')  # syncs right away
+    cloud_id = k.get_task_list()[0].task_id
+    version, changes = k.changes_since(version)
+
+    # the cloud gave the task a new id
+    assert changes == {local_task.task_id: TaskChange.DELETE, cloud_id: TaskChange.INSERT}
+
+    cloud_task = k.service.tasks().insert(tasklist='@default',
+                                          body={'title': 'cloud task',
+                                                'status': Task.NOTDONE,
+                                                'due': '2020-01-01T00:00:00.000Z'}).execute()
+    k.service.tasks().patch(tasklist='@default', task=cloud_id, body={'status': Task.DONE}).execute()
+    k.sync()
+
+    assert k.changes_since(version)[1] == {cloud_task['id']: TaskChange.INSERT,
+                                           cloud_id: TaskChange.UPDATE}
+
+
+def test_import_changes(kbb_dir):
+    path = os.path.join(kbb_dir, 'tasks.jsonl')
+    with open(path, 'w') as f:
+        for i in range(250):
+            f.write(json.dumps({'title': 'imported task {0}'.format(i)}) + '\n')
+
+    k = kbb.Kbb()
+    version, _ = k.changes_since(0)
+    k.import_tasks(path, cloud_sync=False)
+
+    new_version, changes = k.changes_since(version)
+    assert new_version == version + 1
+    assert len(changes) == 250
+    assert set(changes.values()) == {TaskChange.INSERT}
+
+
+def test_changelog_bounded(monkeypatch):
+    monkeypatch.setattr(TaskChange, 'MAX_ROWS', 10)
+    k = kbb.Kbb()
+
+    for i in range(15):
+        k.new_task('bounded task {0}'.format(i), cloud_sync=False)
+    version, _ = k.changes_since(0)
+
+    assert TaskChange.select().count() == 10
+    assert k.changes_since(0)[1] is None
+    assert len(k.changes_since(version - 9)[1]) == 9
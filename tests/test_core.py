@@ -1,12 +1,13 @@
 import datetime
 
+import httplib2
 import pytest
+from apiclient.errors import HttpError
 
 import kbb
 from kbb.task import Task as Task
-
-
-#TODO: make the tests not use the actual user's kbb environment
+from kbb.action import Action as Action
+from kbb.idmap import IdMapping as IdMapping
 
 
 def test_add_task_increment_offline():
@@ -142,20 +143,21 @@ def test_move_task_online_two_way():
     if not new_task_id:
         assert False
 
-    # move task to done
+    # move task to done, with a single patch
+    k.service.calls.clear()
     k.move_task(new_task_id, k.get_stage_names()[-1])
+    assert k.service.calls.get('tasks.patch') == 1
+    assert not {'tasks.insert', 'tasks.update', 'tasks.delete'} & set(k.service.calls)
     assert k._locate_task(new_task_id).stage == k.get_stage_names()[-1]
     assert k._locate_task(new_task_id).status == Task.DONE
 
     
-    # move task to not done
+    # move task to not done, which keeps the task id
+    k.service.calls.clear()
     k.move_task(new_task_id, k.get_stage_names()[0])
-
-    # find new task id
-    new_task_id = None
-    for t in k.get_task_list():
-        if t.title == task_name:
-            new_task_id = t.task_id
+    assert k.service.calls.get('tasks.patch') == 1
+    assert not {'tasks.insert', 'tasks.update', 'tasks.delete'} & set(k.service.calls)
+    assert [t.task_id for t in k.get_task_list() if t.title == task_name] == [new_task_id]
 
     assert k._locate_task(new_task_id).stage == k.get_stage_names()[0]
     assert k._locate_task(new_task_id).status == Task.NOTDONE
@@ -163,3 +165,104 @@ def test_move_task_online_two_way():
     # clean up
     k.delete_task(new_task_id)
     assert new_len - old_len == 1
+
+
+def test_sync_crash_keeps_checkpointed_actions(monkeypatch):
+    k = kbb.Kbb()
+    k.CHECKPOINT_SIZE = 2
+    for i in range(5):
+        task = k.new_task('checkpoint task {0}'.format(i), cloud_sync=False)
+        Action.create(task_ident=task.task_id,
+                      task_action=Action.TASKADD,
+                      start_stage='None',
+                      end_stage=task.stage)
+
+    # the sync dies while sending the third slice of actions
+    replay_round = k._replay_round
+    replayed = list()
+
+    def crashing_replay_round(action_list):
+        if len(replayed) == 2:
+            raise RuntimeError('crash')
+        replayed.append(action_list)
+        return replay_round(action_list)
+
+    monkeypatch.setattr(k, '_replay_round', crashing_replay_round)
+    with pytest.raises(RuntimeError):
+        k.sync()
+
+    assert Action.select().count() == 1
+    assert k.service.calls['tasks.insert'] == 4
+
+    # only the action that never reached the cloud is replayed
+    monkeypatch.undo()
+    k.sync()
+
+    assert Action.select().count() == 0
+    assert k.service.calls['tasks.insert'] == 5
+    assert len(k.service.tasks().list(tasklist='@default').execute()['items']) == 5
+
+
+def test_parallel_sync_fault_keeps_failed_actions(monkeypatch):
+    k = kbb.Kbb()
+    k.config['SyncMode'] = kbb.Kbb.SYNC_MODE_PARALLEL
+    k.config['SyncWorkers'] = 4
+    k.CHECKPOINT_SIZE = 2
+    local_ids = list()
+    for i in range(6):
+        task = k.new_task('parallel task {0}'.format(i), cloud_sync=False)
+        local_ids.append(task.task_id)
+        Action.create(task_ident=task.task_id,
+                      task_action=Action.TASKADD,
+                      start_stage='None',
+                      end_stage=task.stage)
+
+    # the uploads of the tasks sent in the second slice fail
+    failing_ids = local_ids[2:4]
+    replay_task_actions = k._replay_task_actions
+
+    def faulty_replay_task_actions(action_list):
+        if action_list[0].task_ident in failing_ids:
+            return {action_list[0].id: (None, HttpError(httplib2.Response({'status': 503}), b''))}
+        return replay_task_actions(action_list)
+
+    record_push_results = k._record_push_results
+    checkpoints = list()
+
+    def recording_push_results(action_list, results):
+        remapped = record_push_results(action_list, results)
+        checkpoints.append(remapped)
+        return remapped
+
+    monkeypatch.setattr(k, '_replay_task_actions', faulty_replay_task_actions)
+    monkeypatch.setattr(k, '_record_push_results', recording_push_results)
+    before_sync = datetime.datetime.now()
+    k.sync()
+
+    # the failed uploads stay queued, waiting for their retry
+    failed = list(Action.select().order_by(Action.id))
+    assert [act.task_ident for act in failed] == failing_ids
+    for act in failed:
+        assert act.attempts == 1
+        assert act.next_retry > before_sync
+        assert '503' in act.last_error
+
+    # every slice was checkpointed, remapping the uploads that went through
+    assert [sorted(remapped) for remapped in checkpoints] == [
+        sorted(local_ids[0:2]), [], sorted(local_ids[4:6])]
+    cloud_ids = [t['id'] for t in k.service.tasks().list(tasklist='@default').execute()['items']]
+    assert len(cloud_ids) == 4
+    for local_id in local_ids[0:2] + local_ids[4:6]:
+        cloud_id = IdMapping.resolve(local_id)
+        assert cloud_id in cloud_ids
+        assert k._locate_task(cloud_id).title.startswith('parallel task')
+    assert sorted(t.task_id for t in Task.select()) == sorted(cloud_ids + failing_ids)
+
+    # once due, the failed uploads go through
+    monkeypatch.undo()
+    Action.update(next_retry=None).execute()
+    k.sync()
+
+    assert Action.select().count() == 0
+    assert k.service.calls['tasks.insert'] == 6
+    assert len(k.service.tasks().list(tasklist='@default').execute()['items']) == 6
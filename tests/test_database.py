@@ -0,0 +1,61 @@
+import os
+import threading
+
+import pytest
+
+import kbb
+from kbb.task import Task as Task
+from kbb.database import database as database
+
+
+def pragma(name):
+    return database.execute_sql('PRAGMA {0}'.format(name)).fetchone()[0]
+
+
+def test_default_pragmas():
+    kbb.Kbb()
+
+    assert pragma('journal_mode') == 'wal'
+    assert pragma('synchronous') == 1  # NORMAL
+    assert pragma('cache_size') == -16000
+
+
+def test_configured_pragmas(kbb_dir):
+    with open(os.path.join(kbb_dir, 'config'), 'a') as f:
+        f.write('\n[Database]\ncache_size = -1000\n')
+    kbb.Kbb()
+
+    assert pragma('cache_size') == -1000
+    assert pragma('journal_mode') == 'wal'
+
+
+def test_invalid_pragma():
+    with pytest.raises(ValueError):
+        database.set_pragmas({'cache_size': '1; DROP TABLE task'})
+
+
+def test_close():
+    with kbb.Kbb() as k:
+        k.new_task('close test', cloud_sync=False)
+        assert not database.is_closed()
+
+    assert database.is_closed()
+
+
+def test_connect_during_transaction():
+    k = kbb.Kbb()
+    results = list()
+
+    def count_tasks():
+        results.append(Task.select().count())
+        database.close()
+
+    # a worker thread opens its connection while the writer holds the lock
+    with database.atomic():
+        k.new_task('pending task', cloud_sync=False)
+        worker = threading.Thread(target=count_tasks)
+        worker.start()
+        worker.join()
+
+    assert results == [0]
+    assert pragma('auto_vacuum') == 2  # INCREMENTAL
@@ -0,0 +1,99 @@
+import pytest
+from apiclient.errors import HttpError
+
+from kbb.fakegtasks import FakeGTasksService
+
+
+def insert_tasks(service, count, tasklist='@default'):
+    return [service.tasks().insert(tasklist=tasklist,
+                                   body={'title': 'task {0}'.format(idx),
+                                         'status': 'needsAction'}).execute()
+            for idx in range(count)]
+
+
+def test_fake_insert_assigns_ids():
+    service = FakeGTasksService()
+    tasks = insert_tasks(service, 3)
+
+    assert len(set(t['id'] for t in tasks)) == 3
+    assert all(t['updated'] for t in tasks)
+    assert service.tasks().get(tasklist='@default', task=tasks[0]['id']).execute()['title'] == 'task 0'
+
+
+def test_fake_list_pagination():
+    service = FakeGTasksService()
+    insert_tasks(service, 250)
+
+    page = service.tasks().list(tasklist='@default', maxResults=1000).execute()
+    assert len(page['items']) == FakeGTasksService.MAX_PAGE_SIZE
+
+    listed = page['items']
+    while 'nextPageToken' in page:
+        page = service.tasks().list(tasklist='@default', maxResults=1000,
+                                    pageToken=page['nextPageToken']).execute()
+        listed.extend(page['items'])
+
+    assert len(listed) == 250
+    assert service.calls['tasks.list'] == 3
+
+
+def test_fake_list_fields():
+    service = FakeGTasksService()
+    insert_tasks(service, 1)
+
+    page = service.tasks().list(tasklist='@default', fields='items(id,title)').execute()
+    assert set(page['items'][0]) == {'id', 'title'}
+
+
+def test_fake_delete_tombstone():
+    service = FakeGTasksService()
+    task_id = insert_tasks(service, 1)[0]['id']
+    service.tasks().delete(tasklist='@default', task=task_id).execute()
+
+    assert not service.tasks().list(tasklist='@default').execute()['items']
+    tombstones = service.tasks().list(tasklist='@default', showDeleted=True).execute()['items']
+    assert tombstones[0]['deleted']
+
+    with pytest.raises(HttpError):
+        service.tasks().get(tasklist='@default', task=task_id).execute()
+
+
+def test_fake_patch_status():
+    service = FakeGTasksService()
+    task_id = insert_tasks(service, 1)[0]['id']
+
+    t = service.tasks().patch(tasklist='@default', task=task_id,
+                              body={'status': 'completed'}).execute()
+    assert t['status'] == 'completed' and t['completed']
+
+    t = service.tasks().patch(tasklist='@default', task=task_id,
+                              body={'status': 'needsAction', 'completed': None}).execute()
+    assert t['status'] == 'needsAction' and 'completed' not in t
+
+
+def test_fake_fault_injection():
+    service = FakeGTasksService()
+    service.fail_next(1, status=503)
+
+    with pytest.raises(HttpError) as e:
+        insert_tasks(service, 1)
+    assert e.value.resp.status == 503
+
+    insert_tasks(service, 1)
+
+
+def test_fake_batch():
+    service = FakeGTasksService()
+    results = dict()
+
+    def callback(request_id, response, exception):
+        results[request_id] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=callback)
+    batch.add(service.tasks().insert(tasklist='@default', body={'title': 'a'}), request_id='1')
+    batch.add(service.tasks().get(tasklist='@default', task='missing'), request_id='2')
+    batch.execute()
+
+    assert results['1'][0]['title'] == 'a' and results['1'][1] is None
+    assert results['2'][0] is None and results['2'][1].resp.status == 404
+    assert service.round_trips == 1
@@ -0,0 +1,72 @@
+import kbb
+from kbb.task import Task as Task
+from kbb.action import Action as Action
+from kbb.syncstate import SyncState as SyncState
+from kbb.database import database as database
+
+
+def test_deleted_task_hidden():
+    k = kbb.Kbb()
+    task = k.new_task('hidden task', cloud_sync=False)
+    k.delete_task(task.task_id, cloud_sync=False)
+
+    assert task.task_id not in [t.task_id for t in k.get_task_list()]
+
+
+def test_acknowledged_delete_purges_row():
+    k = kbb.Kbb()
+    k.new_task('purged task')  # syncs right away
+    task_id = k.get_task_list()[-1].task_id
+
+    k.delete_task(task_id)
+
+    assert Task.select().where(Task.task_id == task_id).count() == 0
+    assert Action.select().count() == 0
+
+
+def test_gc_keeps_unpushed_delete():
+    k = kbb.Kbb()
+    k.config['GcRate'] = 0
+    k.new_task('unpushed task')
+    task_id = k.get_task_list()[-1].task_id
+
+    # the deletion can't reach the cloud yet
+    k.service.fail_next(10, status=503)
+    k.delete_task(task_id)
+    purged, _ = k.collect_garbage()
+
+    assert purged == 0
+    assert Task.select().where(Task.task_id == task_id).count() == 1
+
+
+def test_gc_purges_and_vacuums():
+    k = kbb.Kbb()
+    for i in range(200):
+        task = k.new_task('garbage task {0}'.format(i), notes='x' * 1000, cloud_sync=False)
+        k.delete_task(task.task_id, cloud_sync=False)
+
+    purged, freed = k.collect_garbage()
+
+    assert purged == 200
+    assert freed > 0
+    assert Task.select().count() == 0
+    assert database.execute_sql('PRAGMA auto_vacuum').fetchone()[0] == 2  # INCREMENTAL
+
+
+def test_gc_runs_on_schedule():
+    k = kbb.Kbb()
+    k.sync()
+    assert SyncState.get_value(SyncState.LAST_GC)
+    SyncState.clear_value(SyncState.LAST_GC)
+
+    task = k.new_task('scheduled task', cloud_sync=False)
+    k.delete_task(task.task_id, cloud_sync=False)
+
+    k._collect_garbage_if_due()  # never collected yet
+    assert Task.select().count() == 0
+
+    task = k.new_task('scheduled task', cloud_sync=False)
+    k.delete_task(task.task_id, cloud_sync=False)
+
+    k._collect_garbage_if_due()  # not due again for GcRate hours
+    assert Task.select().count() == 1
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import pytest
+
+import kbb
+from kbb.task import Task as Task
+from kbb.action import Action as Action
+from kbb.action import DeadAction as DeadAction
+from kbb.idmap import IdMapping as IdMapping
+from kbb.database import database as database
+
+
+def test_upload_keeps_task_in_place(monkeypatch):
+    k = kbb.Kbb()
+
+    # keep the move from being folded into the upload
+    monkeypatch.setattr(k, 'compact_action_queue', lambda: 0)
+
+    # the upload fails, so the move is queued on the local id
+    k.service.fail_next(1, status=503)
+    local_id = k.new_task('mapped task').task_id
+    k.move_task(local_id, k.get_stage_names()[-1])
+    DeadAction.create(task_ident=local_id, task_action=Action.TASKMOV, start_stage='todo',
+                      end_stage='doing', attempts=8, last_error='gave up', failed_at=datetime.now())
+    assert [act.task_ident for act in Action.select()] == [local_id, local_id]
+
+    # retry right away, while another move gets queued on the local id mid-sync
+    Action.update(next_retry=None).execute()
+    k.service.calls.clear()
+    replay_round = k._replay_round
+
+    replayed = list()
+
+    def queueing_replay_round(action_list):
+        results = replay_round(action_list)
+        replayed.append(action_list)
+        if len(replayed) == 1:
+            Action.create(task_ident=local_id, task_action=Action.TASKMOV,
+                          start_stage=k.get_stage_names()[-1], end_stage='doing')
+        return results
+
+    monkeypatch.setattr(k, '_replay_round', queueing_replay_round)
+    k.sync()
+
+    assert k.service.calls['tasks.insert'] == 1
+    assert k.service.calls['tasks.patch'] == 1
+
+    cloud_tasks = k.service.tasks().list(tasklist='@default').execute()['items']
+    assert [(t['title'], t['status']) for t in cloud_tasks] == [('mapped task', Task.DONE)]
+    cloud_id = cloud_tasks[0]['id']
+
+    # the row and every action on the task were rewritten to the cloud id
+    assert [t.task_id for t in Task.select()] == [cloud_id]
+    assert [act.task_ident for act in Action.select()] == [cloud_id]
+    assert [dead.task_ident for dead in DeadAction.select()] == [cloud_id]
+    assert IdMapping.resolve(local_id) == cloud_id
+
+    # the local id still finds the task
+    assert k._locate_task(local_id).task_id == cloud_id
+    assert k._locate_task(local_id).stage == k.get_stage_names()[-1]
+
+
+
+@pytest.mark.parametrize('change', ['move', 'delete'])
+def test_change_during_upload_keeps_cloud_id(monkeypatch, change):
+    k = kbb.Kbb()
+    monkeypatch.setattr(k, '_request_sync', lambda: None)
+    local_id = k.new_task('racing task', cloud_sync=False).task_id
+    locate_task = k._locate_task
+
+    def uploading_locate_task(task_id):
+        t = locate_task(task_id)
+        # the background sync uploads the task right after it was looked up
+        if not IdMapping.resolve(local_id):
+            with database.atomic():
+                k._remap_task_id(local_id, 'cloudid')
+        return t
+
+    monkeypatch.setattr(k, '_locate_task', uploading_locate_task)
+    if change == 'move':
+        k.move_task(local_id, 'doing')
+    else:
+        k.delete_task(local_id)
+
+    assert [(t.task_id, t.stage, t.deleted) for t in Task.select()] == [
+        ('cloudid', 'doing' if change == 'move' else 'todo', change == 'delete')]
+    assert [act.task_ident for act in Action.select()] == ['cloudid']
+    assert [t.task_id for t in k.get_task_list()] == (['cloudid'] if change == 'move' else [])
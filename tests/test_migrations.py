@@ -0,0 +1,66 @@
+import os
+import sqlite3
+
+import pytest
+
+import kbb
+import kbb.task as task
+from kbb.migrations import get_index_names as get_index_names
+
+
+def create_old_database(kbb_dir):
+    """Creates a kbbdb.db the way kbb did before the indexes existed"""
+    connection = sqlite3.connect(os.path.join(kbb_dir, 'kbbdb.db'))
+    connection.execute('CREATE TABLE task (id INTEGER PRIMARY KEY, title TEXT NOT NULL, '
+                       'stage VARCHAR(255) NOT NULL, due DATETIME NOT NULL, notes TEXT NOT NULL, '
+                       'status VARCHAR(255) NOT NULL, task_id TEXT NOT NULL, deleted SMALLINT NOT NULL)')
+    connection.execute('CREATE TABLE action (id INTEGER PRIMARY KEY, task_ident TEXT NOT NULL, '
+                       'task_action VARCHAR(255) NOT NULL, start_stage VARCHAR(255) NOT NULL, '
+                       'end_stage VARCHAR(255) NOT NULL)')
+    for title, task_id, deleted in (('first', 'a', 0), ('copy', 'a', 0), ('other', 'b', 0),
+                                    ('gone', 'c', 1), ('live', 'c', 0)):
+        connection.execute("INSERT INTO task (title, stage, due, notes, status, task_id, deleted) "
+                           "VALUES (?, 'todo', '2020-01-01 00:00:00', '', 'needsAction', ?, ?)",
+                           (title, task_id, deleted))
+    connection.commit()
+    connection.close()
+
+
+def test_upgrade_adds_indexes(kbb_dir):
+    create_old_database(kbb_dir)
+    k = kbb.Kbb()
+
+    assert {'task_task_id', 'task_stage_due'} <= get_index_names(task.database, 'task')
+    assert 'action_task_ident' in get_index_names(task.database, 'action')
+
+    # duplicated ids keep their oldest live copy
+    assert sorted(t.title for t in k.get_task_list()) == ['first', 'live', 'other']
+    assert task.Task.select().count() == 3
+    assert k.get_task_list()[0].tasklist == '@default'
+
+
+def test_upgrade_is_idempotent(kbb_dir):
+    create_old_database(kbb_dir)
+    kbb.Kbb()
+    k = kbb.Kbb()
+
+    assert len(k.get_task_list()) == 3
+
+
+def test_upgrade_indexes_existing_tasks_for_search(kbb_dir):
+    create_old_database(kbb_dir)
+    k = kbb.Kbb()
+
+    assert [t.title for t in k.search('oth')] == ['other']
+
+
+@pytest.mark.parametrize('query', [
+    'SELECT * FROM task WHERE task_id = ?',
+    'SELECT * FROM task WHERE stage = ? AND due >= ?',
+    'SELECT * FROM action WHERE task_ident = ?',
+])
+def test_lookups_use_indexes(query):
+    kbb.Kbb()
+    plan = task.database.execute_sql('EXPLAIN QUERY PLAN ' + query, ('x',) * query.count('?')).fetchall()
+
+    assert 'USING INDEX' in ' '.join(str(row[-1]) for row in plan)
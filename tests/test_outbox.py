@@ -0,0 +1,115 @@
+import socket
+from datetime import datetime
+from datetime import timedelta
+
+import httplib2
+from apiclient.errors import HttpError
+
+import kbb
+from kbb.action import Action as Action
+from kbb.action import DeadAction as DeadAction
+from kbb.outbox import Outbox as Outbox
+
+
+def http_error(status, content=b''):
+    return HttpError(httplib2.Response({'status': status}), content)
+
+
+def test_transient_network_errors():
+    assert Outbox.is_transient(socket.timeout('timed out'))
+    assert Outbox.is_transient(ConnectionResetError())
+    assert Outbox.is_transient(httplib2.ServerNotFoundError('no dns'))
+
+
+def test_transient_http_errors():
+    assert Outbox.is_transient(http_error(503))
+    assert Outbox.is_transient(http_error(429))
+    assert Outbox.is_transient(http_error(403, b'{"reason": "userRateLimitExceeded"}'))
+
+
+def test_permanent_errors():
+    assert not Outbox.is_transient(http_error(400))
+    assert not Outbox.is_transient(http_error(404))
+    assert not Outbox.is_transient(http_error(403, b'{"reason": "forbidden"}'))
+    assert not Outbox.is_transient(ValueError('bad task'))
+
+
+def test_backoff_grows_and_caps():
+    outbox = Outbox(8)
+
+    assert outbox._backoff(1).total_seconds() <= Outbox.RETRY_BASE_SECONDS
+    assert outbox._backoff(4).total_seconds() >= Outbox.RETRY_BASE_SECONDS * 4
+    assert outbox._backoff(100).total_seconds() <= Outbox.RETRY_MAX_SECONDS
+
+
+def test_waiting_action_holds_back_its_task():
+    kbb.Kbb()
+    now = datetime.now()
+    waiting = Action.create(task_ident='a', task_action=Action.TASKMOV, start_stage='todo',
+                            end_stage='doing', attempts=1, next_retry=now + timedelta(minutes=1))
+    held = Action.create(task_ident='a', task_action=Action.TASKDEL, start_stage='doing',
+                         end_stage='None')
+    other = Action.create(task_ident='b', task_action=Action.TASKDEL, start_stage='todo',
+                          end_stage='None')
+
+    outbox = Outbox(8)
+
+    assert [act.id for act in outbox.due_actions(now)] == [other.id]
+    assert ([act.id for act in outbox.due_actions(now + timedelta(minutes=2))] ==
+            [waiting.id, held.id, other.id])
+
+
+def test_requeue_dead_actions():
+    k = kbb.Kbb()
+
+    # the cloud rejects the upload for good
+    k.service.fail_next(1, status=400)
+    k.new_task('rejected task')
+
+    assert Action.select().count() == 0
+    assert [dead.attempts for dead in DeadAction.select()] == [1]
+
+    # the task stays on the board, since the pull knows it may be requeued
+    assert [t.title for t in k.get_task_list()] == ['rejected task']
+
+    assert k.requeue_dead_actions() == 1
+    assert DeadAction.select().count() == 0
+    assert [(act.task_action, act.attempts, act.last_error) for act in Action.select()] == [
+        (Action.TASKADD, 0, None)]
+
+    k.sync()
+
+    assert Action.select().count() == 0
+    cloud_tasks = k.service.tasks().list(tasklist='@default').execute()['items']
+    assert [t['title'] for t in cloud_tasks] == ['rejected task']
+    assert [t.task_id for t in k.get_task_list()] == [cloud_tasks[0]['id']]
+
+
+def test_failed_batch_is_retried(monkeypatch):
+    k = kbb.Kbb()
+    k.outbox.max_attempts = 2
+    new_batch_http_request = k.service.new_batch_http_request
+
+    def failing_batch(callback=None):
+        batch = new_batch_http_request(callback)
+
+        def execute(http=None):
+            raise ValueError('token refresh failed')
+
+        batch.execute = execute
+        return batch
+
+    # a failure of the whole batch isn't the cloud rejecting the actions in it
+    monkeypatch.setattr(k.service, 'new_batch_http_request', failing_batch)
+    k.new_task('unlucky task')
+
+    assert DeadAction.select().count() == 0
+    assert [(act.attempts, act.next_retry is not None) for act in Action.select()] == [(1, True)]
+    assert 'token refresh failed' in Action.get().last_error
+
+    # it still counts towards MaxAttempts
+    Action.update(next_retry=None).execute()
+    k.sync()
+
+    assert Action.select().count() == 0
+    assert [dead.attempts for dead in DeadAction.select()] == [2]
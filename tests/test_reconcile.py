@@ -0,0 +1,79 @@
+from kbb.reconcile import reconcile as reconcile
+
+
+def cloud_task(task_id, status='needsAction', deleted=False):
+    t = {'id': task_id, 'title': task_id, 'status': status}
+    if deleted:
+        t['deleted'] = True
+    return t
+
+
+def test_reconcile_insert_missing():
+    plan = reconcile({'a': 'needsAction'},
+                     [cloud_task('a'), cloud_task('b')],
+                     set(),
+                     False)
+
+    assert [t['id'] for t in plan.inserts] == ['b']
+    assert not plan.updates
+    assert not plan.deletes
+
+
+def test_reconcile_update_status():
+    plan = reconcile({'a': 'needsAction'},
+                     [cloud_task('a', status='completed')],
+                     set(),
+                     False)
+
+    assert plan.updates == {'a': 'completed'}
+
+
+def test_reconcile_pending_wins():
+    plan = reconcile({'a': 'needsAction'},
+                     [cloud_task('a', status='completed')],
+                     {'a'},
+                     False)
+
+    assert not plan.updates
+
+
+def test_reconcile_tombstone():
+    plan = reconcile({'a': 'needsAction', 'b': 'needsAction'},
+                     [cloud_task('a', deleted=True), cloud_task('c', deleted=True)],
+                     set(),
+                     False)
+
+    assert plan.deletes == {'a'}
+    assert not plan.inserts
+
+
+def test_reconcile_absence_incremental():
+    plan = reconcile({'a': 'needsAction'}, [], set(), False)
+    assert len(plan) == 0
+
+
+def test_reconcile_absence_full_resync():
+    plan = reconcile({'a': 'needsAction', 'b': 'needsAction', 'c': 'needsAction'},
+                     [cloud_task('a')],
+                     {'c'},
+                     True)
+
+    assert plan.deletes == {'b'}
+
+
+def test_reconcile_absence_listed_ids():
+    plan = reconcile({'a': 'needsAction', 'b': 'needsAction', 'c': 'needsAction'},
+                     [cloud_task('a')],
+                     set(),
+                     True,
+                     listed_ids={'a', 'b'})
+
+    assert plan.deletes == {'b'}
+
+
+def test_reconcile_moved_between_lists():
+    # the tombstone left in the old list must not delete the moved task
+    for cloud_tasks in ([cloud_task('a', deleted=True), cloud_task('a')],
+                        [cloud_task('a'), cloud_task('a', deleted=True)]):
+        plan = reconcile({'a': 'needsAction'}, cloud_tasks, set(), False)
+        assert len(plan) == 0
@@ -0,0 +1,83 @@
+import time
+import threading
+
+import kbb
+from kbb.action import Action as Action
+from kbb.scheduler import SyncScheduler as SyncScheduler
+
+
+def test_scheduler_debounces_requests():
+    calls = list()
+    scheduler = SyncScheduler(lambda: calls.append(time.monotonic()), 60, 0.2)
+    scheduler.start()
+
+    for _ in range(10):
+        scheduler.request_sync()
+
+    assert scheduler.wait(5)
+    scheduler.stop()
+
+    assert len(calls) == 1
+
+
+def test_scheduler_flush_skips_debounce():
+    calls = list()
+    scheduler = SyncScheduler(lambda: calls.append(time.monotonic()), 60, 60)
+    scheduler.start()
+
+    scheduler.request_sync()
+    assert scheduler.flush(5)
+    scheduler.stop()
+
+    assert len(calls) == 1
+
+
+def test_scheduler_periodic():
+    ran = threading.Event()
+    scheduler = SyncScheduler(ran.set, 0.1, 60)
+    scheduler.start()
+
+    assert ran.wait(5)
+    scheduler.stop()
+
+
+def test_scheduler_survives_sync_error():
+    def broken_sync():
+        raise ValueError('offline')
+
+    scheduler = SyncScheduler(broken_sync, 60, 0)
+    scheduler.start()
+
+    assert scheduler.flush(5)
+    assert isinstance(scheduler.last_error, ValueError)
+    assert scheduler.flush(5)
+    scheduler.stop()
+
+
+def test_background_sync_flush():
+    with kbb.Kbb() as k:
+        k.SYNC_DEBOUNCE = 60
+        k.start_background_sync()
+
+        # the change is only queued, the caller doesn't wait for the cloud
+        k.new_task('background task')
+        assert 'tasks.insert' not in k.service.calls
+        assert Action.select().count() == 1
+
+        assert k.flush_sync(5)
+        assert k.service.calls['tasks.insert'] == 1
+        assert Action.select().count() == 0
+
+
+def test_background_sync_wait():
+    with kbb.Kbb() as k:
+        k.SYNC_DEBOUNCE = 0.1
+        k.start_background_sync()
+
+        k.new_task('background task')
+
+        assert k.wait_for_sync(5)
+        assert k.service.calls['tasks.insert'] == 1
+        assert Action.select().count() == 0
+        assert k.get_task_list()[0].task_id == k.service.tasks().list(
+            tasklist='@default').execute()['items'][0]['id']
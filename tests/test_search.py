@@ -0,0 +1,49 @@
+import kbb
+from kbb.database import database as database
+
+
+def titles(tasks):
+    return [t.title for t in tasks]
+
+
+def test_search_ranks_titles_first():
+    k = kbb.Kbb()
+    k.new_task('buy milk', notes='and the readme', cloud_sync=False)
+    k.new_task('Update README.md', notes='for kbb', cloud_sync=False)
+    k.new_task('unrelated', cloud_sync=False)
+
+    assert titles(k.search('readme')) == ['Update README.md', 'buy milk']
+    assert titles(k.search('upd read')) == ['Update README.md']
+    assert titles(k.search('README kbb')) == ['Update README.md']
+    assert k.search('nothing') == []
+
+
+def test_search_ignores_accents_and_operators():
+    k = kbb.Kbb()
+    k.new_task('Café réunion', cloud_sync=False)
+
+    assert titles(k.search('cafe reunion')) == ['Café réunion']
+    assert k.search('"') == []
+    assert k.search('cafe AND OR NOT (') == []
+
+
+def test_search_follows_writes():
+    k = kbb.Kbb()
+    task = k.new_task('gone soon', cloud_sync=False)
+    k.delete_task(task.task_id, cloud_sync=False)
+
+    assert k.search('gone') == []
+
+    # purging the row drops it from the index
+    k.collect_garbage(vacuum=False)
+    assert database.execute_sql("SELECT COUNT(*) FROM task_fts WHERE task_fts MATCH 'gone'").fetchone()[0] == 0
+
+
+def test_search_without_index():
+    k = kbb.Kbb()
+    k.new_task('buy milk', notes='and the readme', cloud_sync=False)
+    k.new_task('Update README.md', cloud_sync=False)
+    k._search_indexed = False
+
+    assert titles(k.search('readme')) == ['buy milk', 'Update README.md']
+    assert titles(k.search('upd read')) == ['Update README.md']
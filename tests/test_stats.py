@@ -0,0 +1,66 @@
+import os
+import json
+
+import kbb
+from kbb.action import Action as Action
+from kbb.stats import SyncStats as SyncStats
+
+
+def test_sync_stats_counts_calls():
+    k = kbb.Kbb()
+    k.new_task('stats task')  # syncs right away
+
+    stats = k.get_sync_stats()[-1]
+    assert stats.api_calls == {'tasks.insert': 1, 'tasks.list': 1}
+    assert stats.round_trips == 2
+    assert stats.pages == 1
+    assert stats.bytes_received > 0
+    assert stats.actions_replayed == 1
+    assert stats.actions_failed == 0
+    assert stats.error is None
+    assert set(stats.phases) == {SyncStats.PHASE_PUSH, SyncStats.PHASE_PULL, SyncStats.PHASE_DB}
+
+
+def test_sync_stats_counts_coalesced_calls():
+    k = kbb.Kbb()
+    k.service.fail_next(1, status=503)
+    task = k.new_task('coalesced task')  # the upload fails and stays queued
+    k.move_task(task.task_id, k.get_stage_names()[1])
+
+    # the move is folded into the queued upload
+    stats = k.get_sync_stats()[-1]
+    assert stats.calls_coalesced == 1
+    assert Action.select().count() == 1
+    assert stats.to_dict()['calls_coalesced'] == 1
+    assert '1 coalesced' in stats.summary()
+
+
+def test_sync_stats_history_bounded():
+    k = kbb.Kbb()
+
+    for _ in range(k.SYNC_HISTORY + 5):
+        k.sync()
+
+    assert len(k.get_sync_stats()) == k.SYNC_HISTORY
+
+
+def test_sync_stats_records_transient_pull_error():
+    k = kbb.Kbb()
+    k.service.fail_next(1, status=503)
+    k.sync()
+
+    assert '503' in k.get_sync_stats()[-1].error
+
+
+def test_sync_stats_metrics_file(kbb_dir):
+    k = kbb.Kbb()
+    k.config['MetricsFile'] = 'metrics.jsonl'
+
+    k.sync()
+    k.sync()
+
+    with open(os.path.join(kbb_dir, 'metrics.jsonl')) as f:
+        lines = [json.loads(line) for line in f]
+
+    assert len(lines) == 2
+    assert lines[0]['api_calls'] == {'tasks.list': 1}
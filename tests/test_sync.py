@@ -0,0 +1,161 @@
+import kbb
+from kbb.task import Task as Task
+from kbb.action import Action as Action
+from kbb.syncstate import SyncState as SyncState
+from kbb.fakegtasks import _TasksResource as _TasksResource
+
+
+def record_list_calls(monkeypatch):
+    """Returns the :type:`list` the arguments of every tasks.list request get appended to"""
+    list_calls = list()
+    list_tasks = _TasksResource.list
+
+    def recording_list(self, tasklist, **kwargs):
+        list_calls.append(dict(kwargs, tasklist=tasklist))
+        return list_tasks(self, tasklist, **kwargs)
+
+    monkeypatch.setattr(_TasksResource, 'list', recording_list)
+    return list_calls
+
+
+def cloud_ids(k):
+    return [t['id'] for t in k.service.tasks().list(tasklist='@default').execute()['items']]
+
+
+def test_unchanged_sync_lists_once(monkeypatch):
+    k = kbb.Kbb()
+    k.new_task('synced task')  # syncs right away
+    list_calls = record_list_calls(monkeypatch)
+    k.service.calls.clear()
+
+    k.sync()
+
+    assert k.service.calls == {'tasks.list': 1}
+    assert list_calls[0]['updatedMin'] == SyncState.get_value(SyncState.LAST_PULL)
+    assert list_calls[0]['showDeleted']
+
+
+def test_cloud_delete_removes_local_task():
+    k = kbb.Kbb()
+    k.new_task('doomed task')
+    task_id = cloud_ids(k)[0]
+
+    k.service.tasks().delete(tasklist='@default', task=task_id).execute()
+    k.sync()
+
+    assert k.get_task_list() == []
+    assert Task.select().where(Task.task_id == task_id).count() == 0
+
+
+def test_full_resync_drops_tasks_gone_from_cloud():
+    k = kbb.Kbb()
+    k.new_task('purged task')
+    k.new_task('kept task')
+    purged_id, kept_id = cloud_ids(k)
+
+    # the cloud forgot about the task, tombstone included
+    del k.service._lists['@default'][purged_id]
+
+    # the upload of this one is waiting for its retry
+    k.service.fail_next(1, status=503)
+    pending_id = k.new_task('pending task').task_id
+
+    k.sync()
+    assert len(k.get_task_list()) == 3
+
+    k.sync(full_resync=True)
+
+    assert [t.task_id for t in k.get_task_list()] == [kept_id, pending_id]
+    assert [act.task_ident for act in Action.select()] == [pending_id]
+
+
+def queue_offline_tasks(k, count):
+    """Adds :param:`count` tasks without syncing and queues their uploads"""
+    task_ids = list()
+    for i in range(count):
+        task = k.new_task('queued task {0}'.format(i), cloud_sync=False)
+        Action.create(task_ident=task.task_id,
+                      task_action=Action.TASKADD,
+                      start_stage='None',
+                      end_stage=task.stage)
+        task_ids.append(task.task_id)
+
+    return task_ids
+
+
+def test_replay_costs_one_round_trip_per_batch():
+    k = kbb.Kbb()
+    count = 2 * kbb.Kbb.BATCH_SIZE + 1
+    queue_offline_tasks(k, count)
+
+    k.sync()
+
+    # every call but the uploads is a request of its own
+    batches = -(-count // kbb.Kbb.BATCH_SIZE)
+    assert k.service.calls['tasks.insert'] == count
+    assert k.service.round_trips == batches + k.service.total_calls() - count
+    assert Action.select().count() == 0
+
+
+def test_failed_batch_item_stays_queued():
+    k = kbb.Kbb()
+    task_ids = queue_offline_tasks(k, 5)
+
+    # the first upload of the batch fails
+    k.service.fail_next(1, status=503)
+    k.sync()
+
+    assert [(act.task_ident, act.attempts) for act in Action.select()] == [(task_ids[0], 1)]
+    assert len(cloud_ids(k)) == 4
+
+
+def test_pulls_use_large_projected_pages(monkeypatch):
+    k = kbb.Kbb()
+    for i in range(2 * kbb.Kbb.LIST_PAGE_SIZE + 1):
+        k.service.tasks().insert(tasklist='@default', body={'title': 'cloud task {0}'.format(i)}).execute()
+    list_calls = record_list_calls(monkeypatch)
+
+    k.sync()
+
+    assert len(list_calls) == 3
+    assert all(call['maxResults'] == 100 for call in list_calls)
+    assert all(call['fields'] == kbb.Kbb.LIST_FIELDS for call in list_calls)
+    assert len(k.get_task_list()) == 2 * kbb.Kbb.LIST_PAGE_SIZE + 1
+
+
+def test_pull_projection_keeps_used_fields():
+    k = kbb.Kbb()
+    tasks = k.service.tasks()
+    done = tasks.insert(tasklist='@default', body={'title': 'done task', 'notes': 'some notes',
+                                                   'due': '2020-01-02T00:00:00.000Z',
+                                                   'status': Task.DONE}).execute()
+    gone = tasks.insert(tasklist='@default', body={'title': 'gone task'}).execute()
+    tasks.delete(tasklist='@default', task=gone['id']).execute()
+
+    full = tasks.list(tasklist='@default', showDeleted=True).execute()['items']
+    projected = tasks.list(tasklist='@default', showDeleted=True,
+                           fields=kbb.Kbb.LIST_FIELDS).execute()['items']
+
+    # the rows built from the projection are the same as without it
+    assert (k._cloud_task_to_row(projected[0], '@default') ==
+            k._cloud_task_to_row(full[0], '@default'))
+    assert projected[0]['id'] == done['id']
+
+    # so are the fields the reconciliation and the watermarks need
+    assert projected[1]['deleted']
+    assert [t['updated'] for t in projected] == [t['updated'] for t in full]
+
+
+def test_pull_streams_pages():
+    k = kbb.Kbb()
+    for i in range(2 * kbb.Kbb.LIST_PAGE_SIZE + 1):
+        k.service.tasks().insert(tasklist='@default', body={'title': 'cloud task {0}'.format(i)}).execute()
+
+    cloud_tasks = k._iter_cloud_tasks('@default')
+    next(cloud_tasks)
+
+    # only the first page and the prefetch of the second one were fetched
+    assert k.service.calls['tasks.list'] <= 2
+
+    assert len(list(cloud_tasks)) == 2 * kbb.Kbb.LIST_PAGE_SIZE
+    assert k.service.calls['tasks.list'] == 3
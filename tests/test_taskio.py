@@ -0,0 +1,94 @@
+import os
+import json
+from datetime import datetime
+
+import pytest
+
+import kbb
+from kbb.task import Task as Task
+from kbb.action import Action as Action
+import kbb.taskio as taskio
+
+
+def write_jsonl(path, records):
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def test_guess_format():
+    assert taskio.guess_format('tasks.jsonl') == taskio.FORMAT_JSONL
+    assert taskio.guess_format('tasks.CSV') == taskio.FORMAT_CSV
+
+    with pytest.raises(ValueError):
+        taskio.guess_format('tasks.txt')
+
+
+def test_import_offline(kbb_dir):
+    k = kbb.Kbb()
+    path = os.path.join(kbb_dir, 'tasks.jsonl')
+    write_jsonl(path, [{'title': 'a'},
+                       {'title': 'b', 'stage': 'Done', 'due': '2020-01-02', 'notes': 'n'}])
+
+    assert k.import_tasks(path, cloud_sync=False) == 2
+    assert Action.select().count() == 0
+
+    tasks = {t.title: t for t in k.get_task_list()}
+    assert tasks['a'].stage == 'todo' and tasks['a'].status == Task.NOTDONE
+    assert tasks['b'].stage == 'done' and tasks['b'].status == Task.DONE
+    assert tasks['b'].due.day == 2 and tasks['b'].notes == 'n'
+
+
+def test_import_single_sync(kbb_dir):
+    k = kbb.Kbb()
+    path = os.path.join(kbb_dir, 'tasks.jsonl')
+    write_jsonl(path, [{'title': 'task {0}'.format(idx)} for idx in range(120)])
+
+    assert k.import_tasks(path) == 120
+    assert len(k.get_sync_stats()) == 1
+    assert k.get_sync_stats()[0].api_calls['tasks.insert'] == 120
+    assert Action.select().count() == 0
+    assert len(k._get_all_cloud_tasks()) == 120
+
+
+def test_import_invalid_is_atomic(kbb_dir):
+    k = kbb.Kbb()
+    path = os.path.join(kbb_dir, 'tasks.jsonl')
+    write_jsonl(path, [{'title': 'task {0}'.format(idx)} for idx in range(150)] + [{'notes': 'no title'}])
+
+    with pytest.raises(ValueError):
+        k.import_tasks(path)
+
+    assert len(k.get_task_list()) == 0
+    assert Action.select().count() == 0
+
+
+@pytest.mark.parametrize('extension', ['jsonl', 'csv'])
+def test_export_import_round_trip(kbb_dir, extension):
+    k = kbb.Kbb()
+    k.new_task('first, with a comma', notes='line\nbreak', cloud_sync=False)
+    k.new_task('second', stage='doing', cloud_sync=False)
+    k.new_task('exact due', due=datetime(2020, 1, 2, 3, 4, 5, 678901), cloud_sync=False)
+    deleted = k.new_task('deleted', cloud_sync=False)
+    k.delete_task(deleted.task_id, cloud_sync=False)
+
+    path = os.path.join(kbb_dir, 'tasks.' + extension)
+    assert k.export_tasks(path) == 3
+
+    for t in k.get_task_list():
+        t.delete_instance()
+    assert k.import_tasks(path, cloud_sync=False) == 3
+
+    tasks = {t.title: t for t in k.get_task_list()}
+    assert tasks['first, with a comma'].notes == 'line\nbreak'
+    assert tasks['second'].stage == 'doing'
+    assert tasks['exact due'].due == datetime(2020, 1, 2, 3, 4, 5, 678901)
+
+
+def test_export_stage(kbb_dir):
+    k = kbb.Kbb()
+    k.new_task('a', cloud_sync=False)
+    k.new_task('b', stage='doing', cloud_sync=False)
+
+    path = os.path.join(kbb_dir, 'tasks.jsonl')
+    assert k.export_tasks(path, stage='doing') == 1
@@ -0,0 +1,82 @@
+import os
+
+import kbb
+from kbb.task import Task as Task
+from kbb.syncstate import SyncState as SyncState
+from kbb.backend import FakeBackend as FakeBackend
+from kbb.fakegtasks import FakeGTasksService as FakeGTasksService
+
+
+def multi_list_board(kbb_dir):
+    """Returns a :class:`kbb.Kbb` keeping its doing stage in a GTasks list of its own, and that list"""
+    service = FakeGTasksService()
+    doing_list = service.tasklists().insert(body={'title': 'doing'}).execute()['id']
+
+    with open(os.path.join(kbb_dir, 'config'), 'a') as f:
+        f.write('\n[TaskLists]\ndoing = {0}\n'.format(doing_list))
+
+    return kbb.Kbb(backend=FakeBackend(service)), doing_list
+
+
+def cloud_tasks(k, tasklist):
+    return k.service.tasks().list(tasklist=tasklist, showDeleted=True).execute()['items']
+
+
+def test_move_between_lists(kbb_dir):
+    k, doing_list = multi_list_board(kbb_dir)
+    k.new_task('travelling task')  # syncs right away
+    task_id = k.get_task_list()[-1].task_id
+
+    # into another list, the status stays
+    k.move_task(task_id, 'doing')
+
+    assert k.service.calls.get('tasks.move') == 1
+    assert 'tasks.patch' not in k.service.calls
+    assert k._locate_task(task_id).tasklist == doing_list
+    assert [(t['id'], t['status']) for t in cloud_tasks(k, doing_list)] == [(task_id, Task.NOTDONE)]
+    assert cloud_tasks(k, '@default')[0].get('deleted')
+
+    # into the final stage of the default list: the status is patched first
+    k.move_task(task_id, 'done')
+
+    assert k.service.calls['tasks.patch'] == 1
+    assert k.service.calls['tasks.move'] == 2
+    assert k._locate_task(task_id).tasklist == '@default'
+    assert [(t['id'], t['status']) for t in cloud_tasks(k, '@default')] == [(task_id, Task.DONE)]
+    assert cloud_tasks(k, doing_list)[0].get('deleted')
+
+
+def test_pull_follows_cloud_moves(kbb_dir):
+    k, doing_list = multi_list_board(kbb_dir)
+    k.new_task('moved elsewhere')
+    task_id = k.get_task_list()[-1].task_id
+
+    k.service.tasks().move(tasklist='@default', task=task_id, destinationTasklist=doing_list).execute()
+
+    # the live copy wins over the tombstone left in the default list
+    k.sync()
+    task = k._locate_task(task_id)
+    assert (task.stage, task.tasklist) == ('doing', doing_list)
+
+    k.sync(full_resync=True)
+    assert [(t.task_id, t.stage) for t in k.get_task_list()] == [(task_id, 'doing')]
+
+
+def test_watermark_per_list(kbb_dir):
+    k, doing_list = multi_list_board(kbb_dir)
+    k.new_task('todo task')
+    k.new_task('doing task', stage='doing')
+
+    default_watermark = SyncState.get_value(k._get_pull_watermark_key('@default'))
+    doing_watermark = SyncState.get_value(k._get_pull_watermark_key(doing_list))
+    assert k._get_pull_watermark_key('@default') == SyncState.LAST_PULL
+    assert default_watermark == max(t['updated'] for t in cloud_tasks(k, '@default'))
+    assert doing_watermark == max(t['updated'] for t in cloud_tasks(k, doing_list))
+
+    # only the list that changed moves its watermark
+    doing_id = cloud_tasks(k, doing_list)[0]['id']
+    k.service.tasks().patch(tasklist=doing_list, task=doing_id, body={'title': 'renamed'}).execute()
+    k.sync()
+
+    assert SyncState.get_value(k._get_pull_watermark_key('@default')) == default_watermark
+    assert SyncState.get_value(k._get_pull_watermark_key(doing_list)) > doing_watermark
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+
+import kbb
+from kbb.task import Task as Task
+from kbb.syncstate import SyncState as SyncState
+
+
+def other_process_connection(kbb_dir):
+    return sqlite3.connect(os.path.join(kbb_dir, 'kbbdb.db'))
+
+
+def test_moves_keep_add_order():
+    k = kbb.Kbb()
+    first_stage, second_stage = k.get_stage_names()[:2]
+    tasks = [k.new_task('order task {0}'.format(i), cloud_sync=False) for i in range(3)]
+
+    k.move_task(tasks[2].task_id, second_stage, cloud_sync=False)
+    k.move_task(tasks[0].task_id, second_stage, cloud_sync=False)
+    k.move_task(tasks[2].task_id, first_stage, cloud_sync=False)
+
+    assert [t.title for t in k.get_task_list(first_stage)] == ['order task 1', 'order task 2']
+    assert [t.title for t in k.get_task_list(second_stage)] == ['order task 0']
+    assert [t.title for t in k.get_task_list()] == ['order task 0', 'order task 1', 'order task 2']
+
+
+def test_sync_writes_through():
+    k = kbb.Kbb()
+    task = k.new_task('uploaded task')  # syncs right away
+
+    cloud_ids = k._get_all_task_ids_in_db()
+    assert task.task_id not in cloud_ids
+    assert cloud_ids == set(t.task_id for t in Task.select())
+
+    # the cloud completes the task and another one shows up
+    cloud_id = cloud_ids.pop()
+    k.service.tasks().patch(tasklist='@default', task=cloud_id, body={'status': Task.DONE}).execute()
+    k.service.tasks().insert(tasklist='@default', body={'title': 'cloud task', 'status': Task.NOTDONE,
+                                                        'due': '2020-01-01T00:00:00.000Z'}).execute()
+    k.sync()
+
+    assert [(t.title, t.status) for t in k.get_task_list()] == [('uploaded task', Task.DONE),
+                                                                ('cloud task', Task.NOTDONE)]
+
+
+def test_other_process_changes_reload(kbb_dir):
+    k = kbb.Kbb()
+    task = k.new_task('local title', cloud_sync=False)
+    assert k.get_task_list()[0].title == 'local title'
+
+    connection = other_process_connection(kbb_dir)
+    with connection:
+        connection.execute("UPDATE task SET title = 'other title' WHERE task_id = ?", (task.task_id,))
+        connection.execute("UPDATE syncstate SET value = CAST(value AS INTEGER) + 1 WHERE key = ?",
+                           (SyncState.TASKS_VERSION,))
+    connection.close()
+
+    assert k.get_task_list()[0].title == 'other title'
+
+
+def test_invalidate(kbb_dir):
+    k = kbb.Kbb()
+    task = k.new_task('local title', cloud_sync=False)
+    assert k.get_task_list()[0].title == 'local title'
+
+    # a writer that doesn't bump the version goes unnoticed until invalidated
+    connection = other_process_connection(kbb_dir)
+    with connection:
+        connection.execute("UPDATE task SET title = 'other title' WHERE task_id = ?", (task.task_id,))
+    connection.close()
+
+    assert k.get_task_list()[0].title == 'local title'
+    k.invalidate_tasks()
+    assert k.get_task_list()[0].title == 'other title'
+
+
+def test_snapshots_follow_changes():
+    k = kbb.Kbb()
+    first_stage, second_stage = k.get_stage_names()[:2]
+    task = k.new_task('snapshot task', notes='long notes', cloud_sync=False)
+    k.new_task('other task', cloud_sync=False)
+
+    snapshots = k.get_task_snapshots(first_stage)
+    assert [s.title for s in snapshots] == ['snapshot task', 'other task']
+    assert snapshots[0].notes == 'long notes'
+    assert k.get_task_snapshots(first_stage, limit=1) == snapshots[:1]
+
+    # unchanged stages hand out the same snapshots
+    assert k._task_repo.snapshots(first_stage) is k._task_repo.snapshots(first_stage)
+
+    k.move_task(task.task_id, second_stage, cloud_sync=False)
+
+    assert [s.title for s in k.get_task_snapshots(first_stage)] == ['other task']
+    assert [(s.title, s.stage) for s in k.get_task_snapshots(second_stage)] == [('snapshot task', second_stage)]